@@ -0,0 +1,223 @@
+# bench_queries.py
+# Frontend'ning sekin ro'yxat ekranlaridagi so'rov shakllari (QUERIES) bo'yicha o'qish benchmark'i:
+# - har bir shakl PB API orqali BENCH_REPEAT marta (namunaviy qiymatlar seed qilingan ma'lumotdan) —
+#   p50/p95/max latency va totalItems
+# - --scales 1,5,20: har bir bosqichdan oldin baza seed_pb_from_schema.py bilan jami shu ko'paytiruvchiga
+#   yetkaziladi (SEED_SCALE = farq), natija — har bir so'rov uchun hajm bo'yicha latency egri chizig'i
+# - PB_DATA (pb_data/data.db) bo'lsa har bir shaklning SQL ekvivalenti (PB qiladigan SELECT ... LIMIT va
+#   totalItems uchun COUNT(*)) EXPLAIN QUERY PLAN bilan tekshiriladi: to'liq jadval skani yoki ORDER BY
+#   uchun vaqtinchalik B-tree bo'lsa — pb_schema.json'ga qo'shish mumkin bo'lgan indeks taklif qilinadi
+# Baza faqat o'qiladi (mode=ro). BENCH_OUT=fayl.json — to'liq hisobot.
+# Ishlatish: python bench_queries.py [--scales 1,5,20]
+
+import os, sys, json, time, random, sqlite3, subprocess
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import requests
+
+PB_BASE = os.getenv("PB_BASE", "http://127.0.0.1:8090")
+PB_TOKEN = os.getenv("PB_TOKEN", "")
+PB_DATA = os.getenv("PB_DATA", os.path.join("maxdoors_backend", "pb_data", "data.db"))
+REPEAT = max(1, int(os.getenv("BENCH_REPEAT", "20")))
+OUT_FILE = os.getenv("BENCH_OUT", "")
+SEEDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_pb_from_schema.py")
+
+session = requests.Session()
+if PB_TOKEN:
+    session.headers.update({"Authorization": f"Bearer {PB_TOKEN}"})
+
+@dataclass
+class Query:
+    """Ro'yxat so'rovi shakli: eq maydonlari = qiymat, rng maydoni [bugun - days, ertaga) oralig'ida."""
+    name: str
+    coll: str
+    eq: list = field(default_factory=list)
+    rng: str = ""
+    days: int = 30
+    sort: str = ""              # "-created" — kamayish tartibi
+    expand: str = ""
+    per_page: int = 30
+    fields: str = ""
+
+    def window(self, now):
+        lo = (now - timedelta(days=self.days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        hi = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        return [d.strftime("%Y-%m-%d %H:%M:%S.000Z") for d in (lo, hi)]
+
+    def params(self, sample, now):
+        conds = [f'{f} = "{sample[f]}"' for f in self.eq]
+        if self.rng:
+            lo, hi = self.window(now)
+            conds += [f'{self.rng} >= "{lo}"', f'{self.rng} < "{hi}"']
+        p = {"perPage": self.per_page, "page": 1}
+        if conds:
+            p["filter"] = " && ".join(conds)
+        for k, v in (("sort", self.sort), ("expand", self.expand), ("fields", self.fields)):
+            if v:
+                p[k] = v
+        return p
+
+    def sql(self):
+        """PB bu so'rov uchun bajaradigan SQL shakli: (SELECT ... LIMIT, COUNT(*)), parametrlar soni."""
+        where = [f"`{f}` = ?" for f in self.eq] + ([f"`{self.rng}` >= ?", f"`{self.rng}` < ?"] if self.rng else [])
+        w = f" WHERE {' AND '.join(where)}" if where else ""
+        order = f" ORDER BY `{self.sort.lstrip('-')}` {'DESC' if self.sort.startswith('-') else 'ASC'}" if self.sort else ""
+        return [f"SELECT * FROM `{self.coll}`{w}{order} LIMIT ?", f"SELECT COUNT(*) FROM `{self.coll}`{w}"], len(where)
+
+    def index_cols(self):
+        """Nomzod indeks: tenglik maydonlari, keyin diapazon yoki saralash maydoni."""
+        cols = list(self.eq)
+        for f in (self.rng, self.sort.lstrip("-")):
+            if f and f not in cols:
+                cols.append(f)
+                break
+        return cols
+
+QUERIES = [
+    Query("orders_by_status_date", "orders", eq=["status"], rng="created", sort="-created",
+          expand="dealer,region,manager"),
+    # orders.beforeCreate (nextDailySeq): har bir yangi buyurtmada kun bo'yicha COUNT
+    Query("orders_daily_seq", "orders", rng="created", days=0, sort="-created", per_page=1, fields="id"),
+    Query("order_items_by_order", "order_items", eq=["order"], expand="product", per_page=200),
+    Query("payments_by_dealer_date", "payments", eq=["dealer"], rng="date", days=90, sort="-date"),
+    Query("stock_log_by_product", "stock_log", eq=["product"], sort="-ts"),
+]
+
+def pb_get(coll, params):
+    t0 = time.perf_counter()
+    r = session.get(f"{PB_BASE}/api/collections/{coll}/records", params=params, timeout=120)
+    secs = time.perf_counter() - t0
+    if r.status_code != 200:
+        raise RuntimeError(f"[GET {coll}] {r.status_code} {r.text[:200]}")
+    return r.json(), secs
+
+def samples(q):
+    """So'rov uchun tenglik qiymatlari — mavjud yozuvlardan (natija bo'sh bo'lmasligi uchun)."""
+    if not q.eq:
+        return [{}]
+    data, _ = pb_get(q.coll, {"perPage": 200, "fields": ",".join(q.eq), "skipTotal": 1})
+    rows = [r for r in data.get("items", []) if all(r.get(f) for f in q.eq)]
+    return rows or [{f: "" for f in q.eq}]
+
+def pct(vals, p):
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(p * len(vals)))]
+
+def run_queries():
+    now = datetime.now(timezone.utc)
+    out = {}
+    for q in QUERIES:
+        try:
+            pool = samples(q)
+            times, total = [], 0
+            for _ in range(REPEAT):
+                data, secs = pb_get(q.coll, q.params(random.choice(pool), now))
+                times.append(secs * 1000)
+                total = max(total, data.get("totalItems") or 0)
+        except RuntimeError as e:
+            out[q.name] = {"error": str(e)}
+            continue
+        out[q.name] = {"p50_ms": round(pct(times, 0.5), 2), "p95_ms": round(pct(times, 0.95), 2),
+                       "max_ms": round(max(times), 2), "total_items": total}
+    return out
+
+def counts():
+    out = {}
+    for coll in sorted({q.coll for q in QUERIES}):
+        try:
+            out[coll] = pb_get(coll, {"perPage": 1, "fields": "id"})[0].get("totalItems", 0)
+        except RuntimeError:
+            out[coll] = None
+    return out
+
+def seed(scale):
+    """Bazaga yana scale * COUNTS yozuv qo'shadi (seeder alohida jarayonda)."""
+    env = dict(os.environ, SEED_SCALE=str(scale))
+    for k in ("SEED_SNAPSHOT", "SEED_LOAD", "SEED_OUT", "SEED_REPLAY", "SEED_RESUME"):
+        env.pop(k, None)
+    t0 = time.perf_counter()
+    r = subprocess.run([sys.executable, SEEDER], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if r.returncode != 0:
+        raise SystemExit(f"Seed (SEED_SCALE={scale}) yiqildi:\n{r.stderr[-2000:]}")
+    return time.perf_counter() - t0
+
+def existing_indexes(db, table):
+    """[(nom, [ustunlar])] — jadvaldagi indekslar."""
+    out = []
+    for row in db.execute(f"PRAGMA index_list(`{table}`)"):
+        name = row[1]
+        out.append((name, [c[2] for c in db.execute(f"PRAGMA index_info(`{name}`)")]))
+    return out
+
+def explain(db_path):
+    """Har bir so'rov shakli uchun reja, muammolar va nomzod indeks."""
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    out = {}
+    try:
+        for q in QUERIES:
+            sqls, n = q.sql()
+            plans, issues = [], []
+            for i, sql in enumerate(sqls):
+                args = ["0"] * n + ([q.per_page] if i == 0 else [])
+                try:
+                    detail = [r[3] for r in db.execute("EXPLAIN QUERY PLAN " + sql, args)]
+                except sqlite3.Error as e:
+                    detail = [f"xato: {e}"]
+                    issues.append(detail[0])
+                plans.append({"sql": sql, "plan": detail})
+                issues += [d for d in detail if (d.startswith("SCAN ") and " USING " not in d) or "TEMP B-TREE" in d]
+            rec = {"plans": plans, "issues": issues}
+            cols = q.index_cols()
+            if issues and cols and not any(ic[:len(cols)] == cols for _, ic in existing_indexes(db, q.coll)):
+                name = f"idx_{q.coll}_{'_'.join(cols)}"
+                rec["suggest"] = (f"CREATE INDEX IF NOT EXISTS `{name}` ON `{q.coll}` "
+                                  f"({', '.join(f'`{c}`' for c in cols)})")
+            out[q.name] = rec
+    finally:
+        db.close()
+    return out
+
+def main(argv):
+    scales = []
+    if len(argv) == 3 and argv[1] == "--scales":
+        scales = [float(x) for x in argv[2].split(",") if x]
+    elif len(argv) != 1:
+        raise SystemExit("Ishlatish: python bench_queries.py [--scales 1,5,20]")
+    if scales != sorted(scales):
+        raise SystemExit("--scales o'suvchi tartibda bo'lishi kerak (har bir bosqich jami hajm)")
+
+    report = {"repeat": REPEAT, "runs": []}
+    done = 0.0
+    for scale in scales or [None]:
+        run = {"scale": scale}
+        if scale is not None and scale > done:
+            run["seed_s"] = round(seed(scale - done), 1)
+            done = scale
+        run["counts"] = counts()
+        run["queries"] = run_queries()
+        report["runs"].append(run)
+        label = "joriy" if scale is None else f"x{scale:g}"
+        print(f"\n[{label}] " + ", ".join(f"{k}: {v}" for k, v in run["counts"].items()))
+        for name, r in run["queries"].items():
+            if "error" in r:
+                print(f"  {name:<26} ❌ {r['error']}")
+            else:
+                print(f"  {name:<26} p50 {r['p50_ms']:>8.1f}ms  p95 {r['p95_ms']:>8.1f}ms  "
+                      f"max {r['max_ms']:>8.1f}ms  ({r['total_items']} ta)")
+
+    if os.path.exists(PB_DATA):
+        report["explain"] = explain(PB_DATA)
+        print(f"\nEXPLAIN QUERY PLAN ({PB_DATA}):")
+        for name, r in report["explain"].items():
+            print(f"  {name}: " + ("✅" if not r["issues"] else "⚠️  " + "; ".join(sorted(set(r["issues"])))))
+            if "suggest" in r:
+                print(f"    -> {r['suggest']}")
+    else:
+        print(f"\n{PB_DATA} topilmadi (PB_DATA) — EXPLAIN QUERY PLAN o'tkazib yuborildi")
+
+    if OUT_FILE:
+        with open(OUT_FILE, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+
+if __name__ == "__main__":
+    main(sys.argv)
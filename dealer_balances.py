@@ -0,0 +1,245 @@
+# dealer_balances.py
+# Dilerlar balansi (USD) va qarz yoshi (aging) — kolleksiyalar ustunli massivlarga oqim bilan yuklanib,
+# NumPy group-by (bincount/lexsort) bilan bir yo'la hisoblanadi:
+#   balans = boshlang'ich qoldiq + buyurtmalar - to'lovlar - qaytarishlar + tuzatishlar
+# - buyurtma: SUM(order_items.qty * unit_price_usd), keyin chegirma (percent / amount), manfiy emas;
+#   bekor qilinganlar (canceled/cancelled) hisobga olinmaydi; sanasi — created
+# - to'lov: USD bo'lsa amount, UZS bo'lsa amount / fx_rate; fx_rate yo'q bo'lsa fx_rates'dan to'lov
+#   sanasi bo'yicha as-of kurs (shu kun yoki undan oldingi eng yaqin)
+# - qaytarish: return_entry_items.qty * products.price_usd (joriy narx)
+# - dealer_balance_adjustments.amount_usd: musbat — qarzni oshiradi, manfiy — kamaytiradi
+# Aging: kreditlar (to'lov, qaytarish, manfiy tuzatish) debetlarni (qoldiq, buyurtma, musbat tuzatish)
+# sana bo'yicha FIFO yopadi; yopilmay qolgan debetlar yoshi bo'yicha 0-30 / 31-60 / 61-90 / 90+ kunga.
+# Natija BALANCE_STATE (JSON) ga yoziladi; keyingi ishga tushishda faqat shundan beri `updated`
+# o'zgargan yozuvlar tegadigan dilerlar qayta hisoblanadi (fx_rates o'zgargan bo'lsa — hammasi).
+# O'chirishlar va narx o'zgarishlari inkremental rejimda ko'rinmaydi — vaqti-vaqti bilan --full.
+# Talablar: pip install requests numpy
+# Ishlatish: python dealer_balances.py [--full] [--as-of YYYY-MM-DD]
+
+import os, sys, time
+from datetime import datetime, timezone
+from reconcile_stock import iter_records, id_filters, pb_datetime, load_state, save_state, CLOCK_SKEW
+
+try:
+    import numpy as np
+except ImportError:
+    raise SystemExit("dealer_balances.py uchun numpy kerak: pip install numpy")
+
+STATE_FILE = os.getenv("BALANCE_STATE", "dealer_balances.json")
+
+CANCELLED_STATUSES = ("canceled", "cancelled")
+AGING_DAYS = (30, 60, 90)  # chegaralar: 0-30, 31-60, 61-90, 90+
+AGING_LABELS = ("0-30", "31-60", "61-90", "90+")
+COMPONENTS = ("opening", "orders", "payments", "returns", "adjustments")
+
+def get_path(r, path):
+    for k in path:
+        r = r.get(k) if isinstance(r, dict) else None
+    return r
+
+def load_columns(coll, fields, flts=("",), expand=""):
+    """Yozuvlarni oqim bilan o'qib ustunlarga yig'adi: {maydon: list}; expand.x.y maydonlari ham."""
+    paths = {f: f.split(".") for f in fields.split(",")}
+    cols = {f: [] for f in paths}
+    for flt in flts:
+        for r in iter_records(coll, fields, flt, expand):
+            for f, p in paths.items():
+                cols[f].append(get_path(r, p))
+    return cols
+
+def num(vals):
+    return np.fromiter((float(v or 0) for v in vals), dtype=np.float64, count=len(vals))
+
+def days(vals, fallback=None):
+    """PB sana satrlari -> datetime64[D]; bo'sh bo'lsa fallback[i] (masalan created)."""
+    fb = fallback or [None] * len(vals)
+    return np.array([(v or f or "")[:10] or "NaT" for v, f in zip(vals, fb)], dtype="datetime64[D]")
+
+def codes(ids, index):
+    return np.fromiter((index.get(i, -1) for i in ids), dtype=np.int64, count=len(ids))
+
+class FxIndex:
+    """fx_rates'ning saralangan vaqt indeksi: as-of(sana) = shu kun yoki undan oldingi eng yaqin kurs."""
+
+    def __init__(self, dates, rates):
+        ok = ~np.isnat(dates) & (rates > 0)
+        order = np.argsort(dates[ok], kind="stable")
+        self.dates, self.rates = dates[ok][order], rates[ok][order]
+
+    @classmethod
+    def load(cls):
+        c = load_columns("fx_rates", "date,usd_to_uzs")
+        return cls(days(c["date"]), num(c["usd_to_uzs"]))
+
+    def asof(self, when):
+        """Har bir sana uchun kurs; birinchi kursdan oldingi sanalar uchun NaN."""
+        if not len(self.dates):
+            return np.full(len(when), np.nan)
+        i = np.searchsorted(self.dates, when, side="right") - 1
+        return np.where(i >= 0, self.rates[np.maximum(i, 0)], np.nan)
+
+def load_events(fx, dealers=None):
+    """Dilerlar va ularning pul harakatlari: (dealer_ids, names, {tur: (diler kodi, sana, usd)}, narxsizlar).
+    dealers None bo'lsa hammasi, aks holda faqat shu id'lar."""
+    by = lambda field: list(id_filters(field, dealers))
+    d = load_columns("dealers", "id,name,opening_balance_amount,opening_balance_date,created", by("id"))
+    ids = d["id"]
+    index = {rid: i for i, rid in enumerate(ids)}
+    ev = {"opening": (np.arange(len(ids)), days(d["opening_balance_date"], d["created"]),
+                      num(d["opening_balance_amount"]))}
+
+    o = load_columns("orders", "id,dealer,status,discount_type,discount_value,created", by("dealer"))
+    keep = np.array([s not in CANCELLED_STATUSES for s in o["status"]], dtype=bool)
+    oi = load_columns("order_items", "order,qty,unit_price_usd", by("order.dealer"))
+    oidx = codes(oi["order"], {rid: i for i, rid in enumerate(o["id"])})
+    m = oidx >= 0
+    total = np.bincount(oidx[m], weights=(num(oi["qty"]) * num(oi["unit_price_usd"]))[m], minlength=len(o["id"]))
+    dtype, dval = np.array(o["discount_type"], dtype=object), num(o["discount_value"])
+    total = np.where(dtype == "percent", total * (1 - dval / 100), total)
+    total = np.maximum(np.where(dtype == "amount", total - dval, total), 0)
+    dc = codes(o["dealer"], index)
+    m = keep & (dc >= 0)
+    ev["orders"] = (dc[m], days(o["created"])[m], total[m])
+
+    p = load_columns("payments", "dealer,date,created,amount,currency,fx_rate", by("dealer"))
+    when, amount, rate = days(p["date"], p["created"]), num(p["amount"]), num(p["fx_rate"])
+    uzs = np.array([c == "UZS" for c in p["currency"]], dtype=bool)
+    rate = np.where(rate > 0, rate, fx.asof(when))
+    usd = np.where(uzs, amount / np.where(uzs, rate, 1), amount)
+    unpriced = int(np.isnan(usd).sum())
+    dc = codes(p["dealer"], index)
+    m = (dc >= 0) & ~np.isnan(usd)
+    ev["payments"] = (dc[m], when[m], usd[m])
+
+    r = load_columns("return_entries", "id,dealer,date,created", by("dealer"))
+    ri = load_columns("return_entry_items", "entry,product,qty", by("entry.dealer"))
+    pr = load_columns("products", "id,price_usd")
+    pidx = codes(ri["product"], {rid: i for i, rid in enumerate(pr["id"])})
+    price = np.where(pidx >= 0, np.r_[num(pr["price_usd"]), 0.0][pidx], 0.0)  # -1 -> oxirgi (0) element
+    ridx = codes(ri["entry"], {rid: i for i, rid in enumerate(r["id"])})
+    m = ridx >= 0
+    value = np.bincount(ridx[m], weights=(num(ri["qty"]) * price)[m], minlength=len(r["id"]))
+    dc = codes(r["dealer"], index)
+    m = dc >= 0
+    ev["returns"] = (dc[m], days(r["date"], r["created"])[m], value[m])
+
+    a = load_columns("dealer_balance_adjustments", "dealer,date,created,amount_usd", by("dealer"))
+    dc = codes(a["dealer"], index)
+    m = dc >= 0
+    ev["adjustments"] = (dc[m], days(a["date"], a["created"])[m], num(a["amount_usd"])[m])
+    return ids, d["name"], ev, unpriced
+
+def open_debits(ev, n):
+    """FIFO: har bir diler kreditlari debetlarni sana tartibida yopadi. Yopilmagan (diler, sana, qoldiq)."""
+    signed = lambda k, s: (ev[k][0], ev[k][1], ev[k][2] * s)
+    debit = [signed("opening", 1), signed("orders", 1), signed("adjustments", 1), signed("payments", -1), signed("returns", -1)]
+    dc, dd, da = (np.concatenate(x) for x in zip(*debit))
+    credit = np.bincount(dc[da < 0], weights=-da[da < 0], minlength=n)
+    m = da > 0
+    dc, dd, da = dc[m], dd[m], da[m]
+    if not len(dc):
+        return dc, dd, da
+    order = np.lexsort((dd, dc))
+    dc, dd, da = dc[order], dd[order], da[order]
+    cum = np.cumsum(da)
+    starts = np.flatnonzero(np.r_[True, dc[1:] != dc[:-1]])
+    cum -= np.repeat((cum - da)[starts], np.diff(np.r_[starts, len(dc)]))  # diler ichidagi yig'indi
+    left = np.clip(cum - credit[dc], 0, da)
+    m = left > 1e-9
+    return dc[m], dd[m], left[m]
+
+def compute(fx, dealers=None):
+    """Dilerlar natijasi: {id: {name, opening, orders, payments, returns, adjustments, balance, open}}."""
+    ids, names, ev, unpriced = load_events(fx, dealers)
+    n = len(ids)
+    sums = {k: np.bincount(ev[k][0], weights=ev[k][2], minlength=n) for k in COMPONENTS}
+    balance = sums["opening"] + sums["orders"] - sums["payments"] - sums["returns"] + sums["adjustments"]
+    dc, dd, da = open_debits(ev, n)
+    open_by = [[] for _ in range(n)]
+    for c, day, amt in zip(dc.tolist(), dd.astype(str).tolist(), da.tolist()):
+        open_by[c].append([day, round(amt, 2)])
+    out = {}
+    for i, rid in enumerate(ids):
+        rec = {"name": names[i] or ""}
+        rec.update({k: round(float(sums[k][i]), 2) for k in COMPONENTS})
+        rec["balance"] = round(float(balance[i]), 2)
+        rec["open"] = open_by[i]
+        out[rid] = rec
+    return out, unpriced
+
+def touched_dealers(since):
+    """since'dan beri o'zgargan yozuvlar tegadigan dilerlar."""
+    changed = f'updated >= "{since}"'
+    dirty = {r["id"] for r in iter_records("dealers", "id", changed)}
+    for coll in ("orders", "payments", "return_entries", "dealer_balance_adjustments"):
+        dirty.update(r.get("dealer") for r in iter_records(coll, "dealer", changed))
+    for coll, rel in (("order_items", "order"), ("return_entry_items", "entry")):
+        dirty.update(get_path(r, ["expand", rel, "dealer"])
+                     for r in iter_records(coll, f"expand.{rel}.dealer", changed, expand=rel))
+    dirty.discard(None)
+    dirty.discard("")
+    return dirty
+
+def aging(results, as_of):
+    """Yopilmagan debetlarni as_of sanasiga nisbatan yosh bo'yicha taqsimlaydi: {id: [4 ta summa]}."""
+    ids = list(results)
+    rows = [(i, d, a) for i, rid in enumerate(ids) for d, a in results[rid]["open"]]
+    buckets = np.zeros((len(ids), len(AGING_LABELS)))
+    if rows:
+        dc, dd, da = zip(*rows)
+        age = (np.datetime64(as_of, "D") - np.array(dd, dtype="datetime64[D]")).astype(np.int64)
+        b = np.searchsorted(np.array(AGING_DAYS), age, side="left")
+        np.add.at(buckets, (np.array(dc), b), np.array(da))
+    return dict(zip(ids, buckets.round(2).tolist()))
+
+def main(argv):
+    args = argv[1:]
+    full = "--full" in args
+    as_of = datetime.now(timezone.utc).date().isoformat()
+    if "--as-of" in args:
+        i = args.index("--as-of")
+        as_of = args[i + 1] if i + 1 < len(args) else ""
+    if not as_of or any(a not in ("--full", "--as-of", as_of) for a in args):
+        raise SystemExit("Ishlatish: python dealer_balances.py [--full] [--as-of YYYY-MM-DD]")
+
+    started = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    state = {} if full else load_state(STATE_FILE)
+    since = state.get("since")
+    fx = FxIndex.load()
+    if since and next(iter_records("fx_rates", "id", f'updated >= "{since}"'), None) is not None:
+        print("fx_rates o'zgargan — to'liq qayta hisoblash")
+        since = None
+    if since:
+        dirty = touched_dealers(since)
+        print(f"Inkremental: {since} dan beri {len(dirty)} ta dilerga tegilgan")
+        results = dict(state.get("dealers", {}))
+        if dirty:
+            fresh, unpriced = compute(fx, dirty)
+            for rid in dirty:
+                results.pop(rid, None)  # o'chirilgan diler yangisida yo'q
+            results.update(fresh)
+        else:
+            unpriced = 0
+    else:
+        results, unpriced = compute(fx)
+    t1 = time.perf_counter()
+
+    buckets = aging(results, as_of)
+    rate = fx.asof(np.array([as_of], dtype="datetime64[D]"))[0]
+    total = sum(r["balance"] for r in results.values())
+    print(f"{len(results)} ta diler, jami balans ${total:,.2f}"
+          + (f" (~{total * rate:,.0f} UZS, kurs {rate:g})" if not np.isnan(rate) else "")
+          + f" — {t1 - t0:.1f}s")
+    if unpriced:
+        print(f"⚠️  {unpriced} ta UZS to'lov uchun kurs topilmadi — hisobga olinmadi")
+    agg = np.array(list(buckets.values())).sum(axis=0) if buckets else np.zeros(len(AGING_LABELS))
+    print("Aging (" + as_of + "): " + ", ".join(f"{l}: ${v:,.2f}" for l, v in zip(AGING_LABELS, agg)))
+    for rid, r in sorted(results.items(), key=lambda kv: -kv[1]["balance"])[:10]:
+        print(f"  {r['name'] or rid}: ${r['balance']:,.2f}  [{', '.join(f'{v:,.0f}' for v in buckets[rid])}]")
+
+    save_state(STATE_FILE, {"since": pb_datetime(started - CLOCK_SKEW), "as_of": as_of, "dealers": results,
+                            "aging": buckets})
+
+if __name__ == "__main__":
+    main(sys.argv)
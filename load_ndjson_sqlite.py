@@ -0,0 +1,221 @@
+# load_ndjson_sqlite.py
+# Offline generatsiya qilingan NDJSON'ni (seed_pb_from_schema.py, SEED_OUT=dir) to'g'ridan-to'g'ri
+# pb_data/data.db ga yozadi — HTTP API, hook'lar va validatsiyasiz, katta fixture'lar uchun.
+# - PocketBase TO'XTATILGAN bo'lishi kerak (fayl bilan bir vaqtda ishlamaydi)
+# - kolleksiya/field ta'riflari pb_schema.json'dan (PB_SCHEMA)
+# - har bir kolleksiya: oddiy indekslar o'chiriladi -> executemany -> indekslar qayta quriladi;
+#   UNIQUE indekslar qoladi va INSERT OR IGNORE bilan API'dagidek takrorlarni rad etadi
+# - oxirida hook'lar hisoblaydigan maydonlar qayta hisoblanadi: orders.daily_seq/human_id,
+#   products.stock_ok/stock_defect
+# Ishlatish: python load_ndjson_sqlite.py <ndjson_dir> [maxdoors_backend/pb_data/data.db]
+
+import os, sys, json, time, sqlite3, secrets
+from collections import defaultdict
+from datetime import datetime, timezone
+
+SCHEMA = os.getenv("PB_SCHEMA", "pb_schema.json")
+
+# seed_pb_from_schema.py users uchun ishlatadigan "Test1234!" parolining bcrypt hash'i (cost 10)
+DEFAULT_PASSWORD = "Test1234!"
+DEFAULT_PASSWORD_HASH = "$2b$10$X2DbuysalY3UOEQYh.nuUuBU5AZNSruVAWsNlT391TgiLsBH6OLIa"
+
+# order_items hook'lari zaxirani faqat shu statuslarda ushlab turadi (pb_hooks/order_items.js)
+ACTIVE_ORDER_STATUSES = ("created", "editable")
+
+def load_schema(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "collections" in data:
+        return data["collections"]
+    return data
+
+def pb_datetime(v):
+    """ISO sana/vaqtni PB saqlash formatiga keltiradi: 'YYYY-MM-DD HH:MM:SS.000Z'."""
+    if not v:
+        return ""
+    s = str(v).replace("T", " ").rstrip("Z")
+    if len(s) == 10:
+        s += " 00:00:00"
+    if len(s) == 19:
+        s += ".000"
+    return s[:23] + "Z"
+
+def hash_password(pw):
+    if pw == DEFAULT_PASSWORD:
+        return DEFAULT_PASSWORD_HASH
+    try:
+        import bcrypt
+    except ImportError:
+        raise SystemExit(f"'{DEFAULT_PASSWORD}' dan boshqa parollar uchun bcrypt kerak: pip install bcrypt")
+    return bcrypt.hashpw(pw.encode(), bcrypt.gensalt(10)).decode()
+
+def column_converters(coll):
+    """Kolleksiya uchun [(ustun, record -> sqlite qiymati)] — ustun turlari PB jadval DDL'iga mos."""
+    now = pb_datetime(datetime.now(timezone.utc).isoformat(timespec="milliseconds")[:23])
+    convs = []
+    for f in coll.get("fields", coll.get("schema", [])):
+        name, ftype = f["name"], f.get("type")
+        multi = (f.get("maxSelect") or (f.get("options") or {}).get("maxSelect") or 1) > 1
+        if name == "id":
+            continue
+        if ftype == "number":
+            conv = lambda r, n=name: r.get(n) or 0
+        elif ftype == "bool":
+            conv = lambda r, n=name: 1 if r.get(n) else 0
+        elif ftype in ("date", "autodate"):
+            fallback = now if ftype == "autodate" else ""
+            conv = lambda r, n=name, d=fallback: pb_datetime(r.get(n)) or d
+        elif ftype == "json":
+            conv = lambda r, n=name: None if r.get(n) is None else json.dumps(r[n], ensure_ascii=False)
+        elif ftype == "geoPoint":
+            conv = lambda r, n=name: json.dumps(r.get(n) or {"lon": 0, "lat": 0})
+        elif ftype == "password":
+            conv = lambda r, n=name: hash_password(r[n]) if r.get(n) else ""
+        elif name == "tokenKey":
+            conv = lambda r, n=name: r.get(n) or secrets.token_urlsafe(37)[:50]
+        elif ftype in ("select", "relation", "file") and multi:
+            conv = lambda r, n=name: json.dumps(r.get(n) or [])
+        else:
+            conv = lambda r, n=name: "" if r.get(n) is None else str(r[n])
+        convs.append((name, conv))
+    return convs
+
+def table_indexes(db, table):
+    return db.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    ).fetchall()
+
+def read_segments(src_dir, manifest, op):
+    """manifest segmentlarini fayl bo'yicha ketma-ket o'qiydi: (segment, yozuvlar generatori)."""
+    handles = {}
+    try:
+        for seg in manifest["segments"]:
+            if seg["op"] != op:
+                continue  # create va patch alohida fayllarda — o'tkazib yuborish bemalol
+            fh = handles.get(seg["file"])
+            if fh is None:
+                fh = handles[seg["file"]] = open(os.path.join(src_dir, seg["file"]), encoding="utf-8")
+            yield seg, (json.loads(fh.readline()) for _ in range(seg["count"]))
+    finally:
+        for fh in handles.values():
+            fh.close()
+
+def load_creates(db, src_dir, manifest, by_name):
+    dropped = {}
+    stats = defaultdict(lambda: [0, 0])  # coll -> [o'qildi, yozildi]
+    for seg, records in read_segments(src_dir, manifest, "create"):
+        coll = seg["coll"]
+        if coll not in by_name:
+            print(f"[SKIP {coll}] sxemada yo'q")
+            continue
+        if coll not in dropped:
+            # UNIQUE bo'lmagan indekslarni yuklash vaqtiga olib turamiz
+            dropped[coll] = [(n, sql) for n, sql in table_indexes(db, coll) if "UNIQUE" not in sql.upper()]
+            for n, _ in dropped[coll]:
+                db.execute(f"DROP INDEX `{n}`")
+        convs = column_converters(by_name[coll])
+        cols = ["id"] + [c for c, _ in convs]
+        sql = f"INSERT OR IGNORE INTO `{coll}` ({', '.join(f'`{c}`' for c in cols)}) VALUES ({', '.join('?' * len(cols))})"
+        before = db.total_changes
+        db.executemany(sql, ((r["id"], *(conv(r) for _, conv in convs)) for r in records))
+        stats[coll][0] += seg["count"]
+        stats[coll][1] += db.total_changes - before
+    for coll, idx in dropped.items():
+        for _, sql in idx:
+            db.execute(sql)
+    return stats
+
+def apply_patches(db, src_dir, manifest, by_name):
+    n = 0
+    for seg, records in read_segments(src_dir, manifest, "patch"):
+        coll = seg["coll"]
+        if coll not in by_name:
+            continue
+        convs = dict(column_converters(by_name[coll]))
+        groups = defaultdict(list)  # bir xil ustunlar to'plami -> executemany
+        for r in records:
+            keys = tuple(sorted(k for k in r if k != "id" and k in convs))
+            if keys:
+                groups[keys].append(tuple(convs[k](r) for k in keys) + (r["id"],))
+        for keys, rows in groups.items():
+            sets = ", ".join(f"`{k}` = ?" for k in keys)
+            db.executemany(f"UPDATE `{coll}` SET {sets} WHERE id = ?", rows)
+            n += len(rows)
+    return n
+
+def recompute_derived(db, by_name):
+    """Hook'lar API orqali yozganda hisoblaydigan maydonlarni bulk qayta hisoblaydi."""
+    if "orders" in by_name:
+        # orders.beforeCreate: kun (UTC) bo'yicha tartib raqami va NNN-dd.MM.yyyy
+        db.execute("""
+            WITH s AS (
+                SELECT id, created,
+                       ROW_NUMBER() OVER (PARTITION BY substr(created, 1, 10) ORDER BY created, id) AS seq
+                FROM orders
+            )
+            UPDATE orders SET
+                daily_seq = s.seq,
+                human_id = printf('%03d-%s.%s.%s', s.seq,
+                                  substr(s.created, 9, 2), substr(s.created, 6, 2), substr(s.created, 1, 4))
+            FROM s WHERE orders.id = s.id
+        """)
+    if "products" in by_name:
+        # kirim (+), qaytarish (+), aktiv buyurtmalardagi itemlar (-) bo'yicha zaxira
+        parts = []
+        if "stock_entry_items" in by_name:
+            parts.append("SELECT product, CASE WHEN is_defect THEN 0 ELSE qty END AS ok, "
+                         "CASE WHEN is_defect THEN qty ELSE 0 END AS defect FROM stock_entry_items")
+        if "return_entry_items" in by_name:
+            parts.append("SELECT product, CASE WHEN is_defect THEN 0 ELSE qty END, "
+                         "CASE WHEN is_defect THEN qty ELSE 0 END FROM return_entry_items")
+        if "order_items" in by_name and "orders" in by_name:
+            active = ", ".join(f"'{s}'" for s in ACTIVE_ORDER_STATUSES)
+            parts.append("SELECT oi.product, -oi.qty, 0 FROM order_items oi "
+                         f"JOIN orders o ON o.id = oi.`order` WHERE o.status IN ({active})")
+        if parts:
+            db.execute("UPDATE products SET stock_ok = 0, stock_defect = 0")
+            db.execute(f"""
+                WITH ledger AS ({' UNION ALL '.join(parts)}),
+                     agg AS (SELECT product, SUM(ok) AS ok, SUM(defect) AS defect FROM ledger GROUP BY product)
+                UPDATE products SET stock_ok = agg.ok, stock_defect = agg.defect
+                FROM agg WHERE agg.product = products.id
+            """)
+
+def main(argv):
+    if len(argv) < 2:
+        raise SystemExit("Ishlatish: python load_ndjson_sqlite.py <ndjson_dir> [pb_data/data.db]")
+    src_dir = argv[1]
+    db_path = argv[2] if len(argv) > 2 else os.path.join("maxdoors_backend", "pb_data", "data.db")
+    with open(os.path.join(src_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    by_name = {c["name"]: c for c in load_schema(SCHEMA)}
+
+    t0 = time.perf_counter()
+    db = sqlite3.connect(db_path, isolation_level=None)
+    db.execute("PRAGMA synchronous = OFF")
+    db.execute("PRAGMA temp_store = MEMORY")
+    db.execute("PRAGMA cache_size = -262144")  # ~256MB
+    db.execute("BEGIN")
+    try:
+        stats = load_creates(db, src_dir, manifest, by_name)
+        t1 = time.perf_counter()
+        patched = apply_patches(db, src_dir, manifest, by_name)
+        recompute_derived(db, by_name)
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    finally:
+        db.close()
+    t2 = time.perf_counter()
+
+    print(f"✅ {db_path} ga yuklandi (insert: {t1 - t0:.1f}s, patch + hisob: {t2 - t1:.1f}s)")
+    for coll in sorted(stats):
+        read, written = stats[coll]
+        skipped = f" ({read - written} ta takror/rad)" if written < read else ""
+        print(f"  {coll}: {written} ta yozuv{skipped}")
+    print(f"  patch: {patched} ta")
+
+if __name__ == "__main__":
+    main(sys.argv)
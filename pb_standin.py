@@ -0,0 +1,632 @@
+# pb_standin.py
+# PocketBase o'rnini bosuvchi lokal server — seeder'ning klient tomonini (concurrency, batch, retry)
+# haqiqiy PB binary'siz o'lchash va CI'da regressiya testi uchun. Faqat seeder ishlatadigan API qismi:
+# - /api/collections/{c}/records: POST (create), GET (list: filter, sort, fields, expand, page,
+#   perPage <= 1000, skipTotal/totalItems); /api/collections/{c}/records/{id}: PATCH
+# - /api/batch: bitta tranzaksiya (yiqilsa rollback), STANDIN_BATCH=0 bo'lsa 403, maxRequests = 50
+# - validatsiya pb_schema.json'dan: required maydonlar, select qiymatlari, UNIQUE indekslar
+# - rule'i null kolleksiyalar superuser-only: Authorization header'siz 403; @request.auth'li rule'lar
+#   token'siz list'da bo'sh, create/update'da 400 (token qiymati tekshirilmaydi)
+# - hook'lar (STANDIN_HOOKS=1): orders daily_seq/human_id va order_items/kirim/qaytarish zaxirasi —
+#   atomar (haqiqiy hook'lardagi poygasiz)
+# - yuklama: STANDIN_LATENCY (s) + STANDIN_JITTER ulushi, STANDIN_ERROR_RATE ulushida 503,
+#   STANDIN_MAX_INFLIGHT dan ortiq bir vaqtdagi so'rovga 429; STANDIN_SEED — id'lar va xato
+#   in'ektsiyasi uchun tasodif urug'i (bitta oqimda — to'liq takrorlanadi)
+# Ishlatish: python pb_standin.py [port]            — server (default 8090)
+#            python pb_standin.py --seed [KEY=VAL,...]  — shu jarayonda server + seed_pb_from_schema.py
+#                (SEED_* env'lar odatdagidek; har bir qo'shimcha argument — o'sha serverda yana bir
+#                ishga tushish, masalan SEED_LOAD=10), oxirida so'rovlar statistikasi
+
+import os, sys, re, json, time, random, string, runpy, threading
+from bisect import bisect_right
+from itertools import islice
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+SCHEMA = os.getenv("PB_SCHEMA", "pb_schema.json")
+LATENCY = float(os.getenv("STANDIN_LATENCY", "0"))
+JITTER = float(os.getenv("STANDIN_JITTER", "0.5"))
+ERROR_RATE = float(os.getenv("STANDIN_ERROR_RATE", "0"))
+MAX_INFLIGHT = int(os.getenv("STANDIN_MAX_INFLIGHT", "0"))
+BATCH_ON = os.getenv("STANDIN_BATCH", "1") == "1"
+BATCH_MAX = int(os.getenv("STANDIN_BATCH_MAX", "50"))
+HOOKS = os.getenv("STANDIN_HOOKS", "1") == "1"
+RNG_SEED = int(os.getenv("STANDIN_SEED", "0"))
+SEEDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_pb_from_schema.py")
+
+ID_ALPHABET = string.ascii_lowercase + string.digits
+ACTIVE_ORDER_STATUSES = ("created", "editable")
+
+class ApiError(Exception):
+    def __init__(self, status, message, data=None):
+        super().__init__(message)
+        self.status, self.message, self.data = status, message, data or {}
+
+    def body(self):
+        return {"status": self.status, "message": self.message, "data": self.data}
+
+# ---- FILTER ----
+# PB filter sintaksisining kichik qismi: (a = "x" || b >= 3) && c.d != null, operatorlar
+# = != > >= < <= ~ (o'z ichiga oladi), nuqtali maydonlar relation orqali o'qiladi.
+TOKEN = re.compile(r'\s*(?:("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')|(&&|\|\||!=|>=|<=|!~|[=<>~()])|(-?[\w.@]+))')
+
+def tokenize(s):
+    pos, out = 0, []
+    s = s.strip()
+    while pos < len(s):
+        m = TOKEN.match(s, pos)
+        if not m or m.end() == pos:
+            raise ApiError(400, "Invalid filter parameters.")
+        pos = m.end()
+        lit, op, word = m.groups()
+        if lit:
+            out.append(("lit", re.sub(r"\\(.)", r"\1", lit[1:-1])))
+        else:
+            out.append(("op", op) if op else ("word", word))
+    return out
+
+def parse_filter(s):
+    """Filtr satrini predikat daraxtiga aylantiradi: ("or"/"and", [...]) yoki ("cmp", op, chap, o'ng)."""
+    toks = tokenize(s)
+    pos = 0
+
+    def peek():
+        return toks[pos] if pos < len(toks) else (None, None)
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return toks[pos - 1]
+
+    def operand():
+        kind, v = take()
+        if kind == "lit":
+            return ("lit", v)
+        if kind == "word":
+            if v in ("true", "false", "null"):
+                return ("lit", {"true": True, "false": False, "null": None}[v])
+            try:
+                return ("lit", float(v))
+            except ValueError:
+                return ("field", v)
+        raise ApiError(400, "Invalid filter parameters.")
+
+    def term():
+        if peek() == ("op", "("):
+            take()
+            node = expr()
+            if take() != ("op", ")"):
+                raise ApiError(400, "Invalid filter parameters.")
+            return node
+        left = operand()
+        kind, op = take()
+        if kind != "op" or op not in ("=", "!=", ">", ">=", "<", "<=", "~", "!~"):
+            raise ApiError(400, "Invalid filter parameters.")
+        return ("cmp", op, left, operand())
+
+    def chain(sub, sep, tag):
+        nodes = [sub()]
+        while peek() == ("op", sep):
+            take()
+            nodes.append(sub())
+        return nodes[0] if len(nodes) == 1 else (tag, nodes)
+
+    def expr():
+        return chain(lambda: chain(term, "&&", "and"), "||", "or")
+
+    node = expr()
+    if pos != len(toks):
+        raise ApiError(400, "Invalid filter parameters.")
+    return node
+
+def compare(op, a, b):
+    if op in ("~", "!~"):
+        hit = str(b if b is not None else "").strip("%") in str(a if a is not None else "")
+        return hit if op == "~" else not hit
+    if a in (None, "") and b is None or b in (None, "") and a is None:
+        a = b = None
+    if isinstance(a, bool) or isinstance(b, bool):
+        a, b = bool(a), bool(b)
+    elif isinstance(a, (int, float)) or isinstance(b, (int, float)):
+        try:
+            a, b = float(a or 0), float(b or 0)
+        except (TypeError, ValueError):
+            a, b = str(a), str(b)
+    elif a is not None and b is not None:
+        a, b = str(a), str(b)
+    if op == "=":
+        return a == b
+    if op == "!=":
+        return a != b
+    if a is None or b is None:
+        return False
+    return {">": a > b, ">=": a >= b, "<": a < b, "<=": a <= b}[op]
+
+def keyset(node):
+    """Filtrdan `id > "x"` shartini ajratadi: (x yoki None, qolgan filtr)."""
+    is_after = lambda n: n and n[0] == "cmp" and n[1] == ">" and n[2] == ("field", "id") and n[3][0] == "lit"
+    if is_after(node):
+        return str(node[3][1]), None
+    if node and node[0] == "and" and any(map(is_after, node[1])):
+        rest = [n for n in node[1] if not is_after(n)]
+        return str(next(n for n in node[1] if is_after(n))[3][1]), rest[0] if len(rest) == 1 else ("and", rest)
+    return None, node
+
+# ---- SAQLASH ----
+class Store:
+    """Kolleksiyalar xotirada: {nom: {id: yozuv}}; barcha o'zgarishlar bitta lock ostida."""
+
+    def __init__(self, schema):
+        self.colls = {c["name"]: c for c in schema}
+        by_id = {c.get("id"): c["name"] for c in schema}
+        self.fields = {n: {f["name"]: f for f in c.get("fields", c.get("schema", []))} for n, c in self.colls.items()}
+        self.targets = {n: {f: by_id.get(d.get("collectionId"), d.get("collectionId"))
+                            for f, d in fs.items() if d.get("type") == "relation"} for n, fs in self.fields.items()}
+        self.unique = {n: [cols for cols in map(index_cols, c.get("indexes", [])) if cols] for n, c in self.colls.items()}
+        self.data = {n: {} for n in self.colls}
+        self._uniq = {n: {tuple(cols): {} for cols in u} for n, u in self.unique.items()}  # kalit -> id
+        self._sorted = {}  # coll -> saralangan id'lar keshi (keyset pagination uchun)
+        self._undo = None  # batch paytida: [(coll, id, eski yozuv)]
+        self.orders_per_day = Counter()  # orders.beforeCreate uchun (COUNT o'rniga)
+        self.lock = threading.RLock()
+        self.rng = random.Random(RNG_SEED)
+
+    def coll(self, name):
+        if name not in self.colls:
+            raise ApiError(404, "Missing collection context.")
+        return self.colls[name]
+
+    def autodate(self, coll, name):
+        """created/updated kabi autodate maydonlarni klient yubora olmaydi (PB v0.23)."""
+        return self.fields[coll][name].get("type") == "autodate"
+
+    def new_id(self):
+        return "".join(self.rng.choice(ID_ALPHABET) for _ in range(15))
+
+    def value(self, coll, rec, path):
+        """Nuqtali yo'l bo'yicha qiymat: "order.status" — relation orqali."""
+        parts = path.split(".")
+        for i, part in enumerate(parts):
+            if rec is None:
+                return None
+            v = rec.get(part)
+            if i == len(parts) - 1:
+                return v
+            target = self.targets[coll].get(part)
+            rec = self.data.get(target, {}).get(v) if target and isinstance(v, str) else None
+            coll = target
+        return None
+
+    def matches(self, coll, rec, node):
+        kind = node[0]
+        if kind == "and":
+            return all(self.matches(coll, rec, n) for n in node[1])
+        if kind == "or":
+            return any(self.matches(coll, rec, n) for n in node[1])
+        _, op, left, right = node
+        side = lambda o: o[1] if o[0] == "lit" else self.value(coll, rec, o[1])
+        return compare(op, side(left), side(right))
+
+    def sorted_ids(self, coll):
+        ids = self._sorted.get(coll)
+        if ids is None:
+            ids = self._sorted[coll] = sorted(self.data[coll])
+        return ids
+
+    def validate(self, coll, rec, rid=None):
+        errs = {}
+        for name, f in self.fields[coll].items():
+            if name in ("id", "password", "tokenKey") or f.get("type") == "autodate":
+                continue
+            v = rec.get(name)
+            if f.get("required") and f.get("type") != "bool" and v in (None, "", [], 0):
+                errs[name] = {"code": "validation_required", "message": "Cannot be blank."}
+            elif f.get("type") == "select" and v not in (None, "", []):
+                allowed = f.get("values") or (f.get("options") or {}).get("values") or []
+                if allowed and any(x not in allowed for x in (v if isinstance(v, list) else [v])):
+                    errs[name] = {"code": "validation_invalid_value", "message": "Invalid value " + json.dumps(v)}
+        for cols, idx in self._uniq[coll].items():
+            key = tuple(rec.get(c) for c in cols)
+            if all(k not in (None, "") for k in key) and idx.get(key, rid) != rid:
+                errs[cols[-1]] = {"code": "validation_not_unique", "message": "Value must be unique."}
+        if errs:
+            raise ApiError(400, "Failed to create record." if rid is None else "Failed to update record.", errs)
+
+    def create(self, coll, body):
+        self.coll(coll)
+        with self.lock:
+            rec = {k: v for k, v in body.items() if k in self.fields[coll] and not self.autodate(coll, k)}
+            if HOOKS:
+                before_create(self, coll, rec)
+            self.validate(coll, rec)
+            rid = rec.get("id") or self.new_id()
+            if rid in self.data[coll]:
+                raise ApiError(400, "Failed to create record.", {"id": {"code": "validation_not_unique",
+                                                                       "message": "Value must be unique."}})
+            now = pb_now()
+            rec.update(id=rid, created=now, updated=now)
+            self.put(coll, rid, rec)
+            if HOOKS:
+                after_write(self, coll, None, rec)
+            return dict(rec)
+
+    def update(self, coll, rid, body):
+        self.coll(coll)
+        with self.lock:
+            old = self.data[coll].get(rid)
+            if old is None:
+                raise ApiError(404, "The requested resource wasn't found.")
+            rec = {**old, **{k: v for k, v in body.items()
+                             if k in self.fields[coll] and k != "id" and not self.autodate(coll, k)}}
+            self.validate(coll, rec, rid)
+            rec["updated"] = pb_now()
+            self.put(coll, rid, rec)
+            if HOOKS:
+                after_write(self, coll, old, rec)
+            return dict(rec)
+
+    def put(self, coll, rid, rec):
+        """Yagona yozish nuqtasi: UNIQUE indekslar, saralangan kesh va batch undo jurnali shu yerda."""
+        old = self.data[coll].get(rid)
+        if self._undo is not None:
+            self._undo.append((coll, rid, old))
+        for cols, idx in self._uniq[coll].items():
+            if old is not None:
+                idx.pop(tuple(old.get(c) for c in cols), None)
+            if rec is not None:
+                idx[tuple(rec.get(c) for c in cols)] = rid
+        if coll == "orders":
+            for r, sign in ((old, -1), (rec, 1)):
+                if r is not None:
+                    self.orders_per_day[str(r.get("created", ""))[:10]] += sign
+        if rec is None:
+            del self.data[coll][rid]
+        else:
+            self.data[coll][rid] = rec
+        if old is None or rec is None:
+            self._sorted.pop(coll, None)
+
+    def begin(self):
+        self._undo = []
+
+    def commit(self):
+        self._undo = None
+
+    def rollback(self):
+        undo, self._undo = self._undo, None
+        for coll, rid, old in reversed(undo):
+            self.put(coll, rid, old)
+
+def index_cols(sql):
+    """UNIQUE indeks ustunlari (boshqa indekslar uchun None)."""
+    if "UNIQUE" not in sql.upper():
+        return None
+    m = re.search(r"\(([^)]*)\)\s*(WHERE|$)", sql.strip())
+    return [c.strip(" `\"") for c in m.group(1).split(",")] if m else None
+
+def pb_now():
+    t = time.time()
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(t)) + f".{int(t * 1000) % 1000:03d}Z"
+
+# ---- HOOK'LAR ----
+def before_create(store, coll, rec):
+    """orders.beforeCreate: status/discount default'lari va kunlik tartib raqami."""
+    if coll != "orders":
+        return
+    rec["status"] = rec.get("status") or "created"
+    rec.setdefault("discount_type", "none")
+    day = time.strftime("%Y-%m-%d", time.gmtime())
+    seq = 1 + store.orders_per_day[day]
+    rec["daily_seq"] = seq
+    rec["human_id"] = f"{seq:03d}-{time.strftime('%d.%m.%Y', time.gmtime())}"
+
+def stock_delta(store, coll, rec):
+    """Yozuvning zaxiraga ta'siri: (product, ok, defect)."""
+    if rec is None:
+        return None
+    qty = float(rec.get("qty") or 0)
+    if coll == "order_items":
+        order = store.data.get("orders", {}).get(rec.get("order")) or {}
+        if order.get("status") not in ACTIVE_ORDER_STATUSES:
+            return None
+        return rec.get("product"), -qty, 0.0
+    if coll in ("stock_entry_items", "return_entry_items"):
+        return (rec.get("product"), 0.0, qty) if rec.get("is_defect") else (rec.get("product"), qty, 0.0)
+    return None
+
+def after_write(store, coll, old, new):
+    """order_items (create/update) va kirim/qaytarish itemlari (create) bo'yicha products zaxirasi."""
+    if coll != "order_items" and old is not None:
+        return
+    for rec, sign in ((old, -1), (new, 1)):
+        d = stock_delta(store, coll, rec)
+        p = store.data.get("products", {}).get(d[0]) if d else None
+        if p is not None:
+            store.put("products", p["id"], {**p, "stock_ok": float(p.get("stock_ok") or 0) + sign * d[1],
+                                             "stock_defect": float(p.get("stock_defect") or 0) + sign * d[2],
+                                             "updated": pb_now()})
+
+# ---- HTTP ----
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()  # (metod, natija) -> soni
+        self.inflight = 0
+        self.peak = 0
+        self.rng = random.Random(RNG_SEED)  # latency/xato in'ektsiyasi (id'lar — Store.rng)
+
+    def count(self, key):
+        with self.lock:
+            self.requests[key] += 1
+
+    def enter(self):
+        with self.lock:
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            return self.inflight
+
+    def leave(self):
+        with self.lock:
+            self.inflight -= 1
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    store = stats = None
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.stats.count((self.command, status))
+
+    def handle_api(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""  # keep-alive: rad etilsa ham body o'qiladi
+        inflight = self.stats.enter()
+        try:
+            if MAX_INFLIGHT and inflight > MAX_INFLIGHT:
+                return self.send(429, {"status": 429, "message": "Too Many Requests.", "data": {}})
+            rng = self.stats.rng
+            if ERROR_RATE and rng.random() < ERROR_RATE:
+                return self.send(503, {"status": 503, "message": "Service Unavailable.", "data": {}})
+            if LATENCY:
+                time.sleep(LATENCY * (1 + JITTER * (2 * rng.random() - 1)))
+            try:
+                body = json.loads(raw or b"{}")
+                status, out = self.route(self.command, urlparse(self.path), body)
+            except ApiError as e:
+                status, out = e.status, e.body()
+            except ValueError:
+                status, out = 400, {"status": 400, "message": "Failed to read request data.", "data": {}}
+            self.send(status, out)
+        finally:
+            self.stats.leave()
+
+    do_GET = do_POST = do_PATCH = handle_api
+
+    def superuser(self):
+        return bool(self.headers.get("Authorization"))  # token tekshirilmaydi: bor bo'lsa — superuser
+
+    def check_rule(self, coll, rule):
+        """True — ruxsat. null rule: faqat superuser (403); @request.auth talab qiladigan rule token'siz
+        bajarilmaydi — list bo'sh qaytadi, create/update 400 (PB'dagidek)."""
+        expr = self.store.coll(coll).get(rule)
+        if self.superuser():
+            return True
+        if expr is None:
+            raise ApiError(403, "Only superusers can perform this action.")
+        if "@request.auth" not in expr:
+            return True
+        if rule == "listRule":
+            return False
+        raise ApiError(400, "Failed to create record." if rule == "createRule" else "Failed to update record.")
+
+    def route(self, method, url, body):
+        path = url.path.rstrip("/")
+        if path == "/api/batch" and method == "POST":
+            return 200, self.batch(body.get("requests") or [])
+        m = re.fullmatch(r"/api/collections/([^/]+)/records(?:/([^/]+))?", path)
+        if not m:
+            raise ApiError(404, "The requested resource wasn't found.")
+        coll, rid = m.groups()
+        if method == "POST" and rid is None:
+            self.check_rule(coll, "createRule")
+            return 200, self.store.create(coll, body)
+        if method == "PATCH" and rid is not None:
+            self.check_rule(coll, "updateRule")
+            return 200, self.store.update(coll, rid, body)
+        if method == "GET" and rid is None:
+            allowed = self.check_rule(coll, "listRule")
+            return 200, self.list(coll, {k: v[-1] for k, v in parse_qs(url.query).items()}, allowed)
+        raise ApiError(405, "Method Not Allowed.")
+
+    def batch(self, reqs):
+        if not BATCH_ON:
+            raise ApiError(403, "Batch requests are not allowed.")
+        if len(reqs) > BATCH_MAX:
+            raise ApiError(400, f"The allowed max number of batch requests is {BATCH_MAX}.")
+        store, out = self.store, []
+        with store.lock:
+            store.begin()
+            try:
+                for i, r in enumerate(reqs):
+                    url = urlparse(r.get("url", ""))
+                    try:
+                        if r.get("method") not in ("POST", "PATCH") or url.path.startswith("/api/batch"):
+                            raise ApiError(405, "Method Not Allowed.")
+                        out.append({"status": 200, "body": self.route(r["method"], url, r.get("body") or {})[1]})
+                    except ApiError as e:
+                        raise ApiError(400, "Batch transaction failed.", {"requests": {str(i): {
+                            "code": "batch_request_failed", "message": "Batch request failed.",
+                            "response": {"status": e.status, "body": e.body()}}}})
+            except BaseException:
+                store.rollback()
+                raise
+            store.commit()
+        return out
+
+    def list(self, coll, q, allowed=True):
+        store = self.store
+        page = max(1, int(q.get("page") or 1))
+        per_page = min(max(1, int(q.get("perPage") or 30)), 1000)
+        flt = parse_filter(q["filter"]) if q.get("filter") else None
+        sort = [s.strip() for s in (q.get("sort") or "").split(",") if s.strip()]
+        skip = str(q.get("skipTotal", "")).lower() in ("1", "true")
+        if sort == ["id"]:
+            sort, after, flt = [], *keyset(flt)
+        else:
+            after = None
+        with store.lock:
+            recs = store.data[coll]
+            if not allowed:
+                items = iter(())
+            elif after is not None or not sort:
+                ids = store.sorted_ids(coll)  # sort=id (default tartib ham id) — keyset: bisect
+                items = (recs[i] for i in islice(ids, bisect_right(ids, after) if after else 0, None))
+            else:
+                items = iter(recs.values())
+            if flt is not None:
+                items = (r for r in items if store.matches(coll, r, flt))
+            if sort:
+                items = list(items)
+                for s in reversed(sort):
+                    key = s.lstrip("-+")
+                    items.sort(key=lambda r: (r.get(key) is None, str(r.get(key)) if isinstance(r.get(key), list) else r.get(key)),
+                               reverse=s.startswith("-"))
+            if skip:  # skipTotal: sahifadan keyin to'xtaydi
+                items = list(islice(items, page * per_page))
+            else:
+                items = list(items)
+            total = len(items)
+            chunk = [self.project(coll, r, q) for r in items[(page - 1) * per_page:page * per_page]]
+        return {"page": page, "perPage": per_page, "totalItems": -1 if skip else total,
+                "totalPages": -1 if skip else (total + per_page - 1) // per_page, "items": chunk}
+
+    def project(self, coll, rec, q):
+        store = self.store
+        out = dict(rec)
+        expand = [e.strip() for e in (q.get("expand") or "").split(",") if e.strip()]
+        if expand:
+            out["expand"] = {}
+            for e in expand:
+                target = store.targets[coll].get(e)
+                v = rec.get(e)
+                if target and isinstance(v, list):
+                    out["expand"][e] = [dict(store.data[target][x]) for x in v if x in store.data.get(target, {})]
+                elif target and v in store.data.get(target, {}):
+                    out["expand"][e] = dict(store.data[target][v])
+        fields = [f.strip() for f in (q.get("fields") or "").split(",") if f.strip()]
+        if not fields or "*" in fields:
+            return out
+        picked = {}
+        for f in fields:
+            parts = f.split(".")
+            src, dst = out, picked
+            for i, part in enumerate(parts):
+                if not isinstance(src, dict) or part not in src:
+                    break
+                if i == len(parts) - 1:
+                    dst[part] = src[part]
+                else:
+                    src, dst = src[part], dst.setdefault(part, {})
+        return picked
+
+class StandIn:
+    """Fon oqimida ishlaydigan server: with StandIn() as s: ... s.url"""
+
+    def __init__(self, schema_path=SCHEMA, port=0):
+        with open(schema_path, encoding="utf-8") as f:
+            schema = json.load(f)
+        if isinstance(schema, dict) and "collections" in schema:
+            schema = schema["collections"]
+        handler = type("BoundHandler", (Handler,), {"store": Store(schema), "stats": Stats()})
+        self.store, self.stats = handler.store, handler.stats
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def report(self):
+        print(f"\nStand-in: eng ko'p bir vaqtdagi so'rov {self.stats.peak}")
+        for (method, status), n in sorted(self.stats.requests.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+            print(f"  {method:<6} {status}: {n}")
+        print("  yozuvlar: " + ", ".join(f"{k}={len(v)}" for k, v in sorted(self.store.data.items()) if v))
+
+def run_seeder(overrides):
+    """seed_pb_from_schema.py'ni shu jarayonda ishga tushiradi (env + overrides); exit kodi."""
+    saved, argv = {k: os.environ.get(k) for k in overrides}, sys.argv
+    os.environ.update(overrides)
+    sys.argv = [SEEDER]
+    try:
+        runpy.run_path(SEEDER, run_name="__main__")
+    except SystemExit as e:
+        if e.code is not None and not isinstance(e.code, int):
+            print(e.code, file=sys.stderr)
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        sys.argv = argv
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return 0
+
+def main(argv):
+    usage = "Ishlatish: python pb_standin.py [port] | --seed [KEY=VAL,KEY=VAL ...]"
+    if len(argv) >= 2 and argv[1] == "--seed":
+        # har bir qo'shimcha argument — o'sha serverda navbatdagi ishga tushish, masalan:
+        # --seed SEED_LOAD=10,SEED_CONCURRENCY=16  (avval seed, keyin yuklama testi)
+        try:
+            runs = [{}] + [dict(kv.split("=", 1) for kv in arg.split(",") if kv) for arg in argv[2:]]
+        except ValueError:
+            raise SystemExit(usage)
+        code = 0
+        with StandIn() as srv:
+            os.environ["PB_BASE"] = srv.url
+            print(f"Stand-in: {srv.url}")
+            for overrides in runs:
+                t0 = time.perf_counter()
+                code = run_seeder(overrides)
+                label = ",".join(f"{k}={v}" for k, v in overrides.items()) or "seed"
+                print(f"\n[{label}] {time.perf_counter() - t0:.1f}s, exit {code}")
+                if code:
+                    break
+            srv.report()
+        raise SystemExit(code)
+    if len(argv) > 2 or (len(argv) == 2 and not argv[1].isdigit()):
+        raise SystemExit(usage)
+    srv = StandIn(port=int(argv[1]) if len(argv) == 2 else 8090)
+    print(f"Stand-in: {srv.url} ({SCHEMA})")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.report()
+
+if __name__ == "__main__":
+    main(sys.argv)
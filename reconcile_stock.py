@@ -0,0 +1,215 @@
+# reconcile_stock.py
+# products.stock_ok / stock_defect / avg_cost_usd'ni hujjatlardan qayta hisoblab, farq qilganlarini tuzatadi.
+# Zaxira hook'larda inkremental yuritiladi (getOne + update, xato bo'lsa log qilinib yutiladi) — vaqt
+# o'tib drift yig'iladi. Bu skript "haqiqat"ni serverdagi hujjatlardan sahifalab oqim bilan yig'adi:
+# - stock_entry_items: +qty (is_defect bo'lsa stock_defect'ga); defekt bo'lmagan kirimlardan
+#   avg_cost_usd = SUM(qty * narx_usd) / SUM(qty), UZS kirimda narx_usd = price / stock_entries.rate
+# - return_entry_items: +qty (is_defect bo'lsa stock_defect'ga)
+# - order_items: -qty, faqat buyurtma statusi aktiv bo'lsa (pb_hooks/order_items.js dagidek)
+# - stock_log hisobga olinmaydi: hook'lar zaxirani faqat itemlardan yuritadi, log — audit yozuvi
+#   (load_ndjson_sqlite.py'dagi qayta hisob ham shunday)
+# Mahsulotlar bo'yicha xotirada yig'iladi, faqat farq qilganlari /api/batch PATCH bilan yoziladi
+# (batch o'chirilgan bo'lsa bittalab).
+# Inkremental rejim: RECONCILE_STATE faylida oxirgi ishga tushish vaqti saqlanadi; keyingi safar faqat
+# shundan beri `updated` o'zgargan itemlar, ularning buyurtma/kirimlari va mahsulotlarning o'zi
+# "iflos" deb olinadi va faqat shu mahsulotlar to'liq qayta hisoblanadi. Hook'i yiqilgan o'chirishlar
+# izsiz qoladi — vaqti-vaqti bilan --full bilan to'liq tekshirish kerak.
+# - Yozuvlar paytida hook'lar ham ishlayotgan bo'lsa natija poyga bo'ladi: tinch vaqtda ishga tushiring
+# - PB_TOKEN: superuser/service token (products'ni yangilash uchun)
+# Ishlatish: python reconcile_stock.py [--full] [--dry-run]
+
+import os, sys, json, time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import requests
+
+PB_BASE = os.getenv("PB_BASE", "http://127.0.0.1:8090")
+PB_TOKEN = os.getenv("PB_TOKEN", "")
+STATE_FILE = os.getenv("RECONCILE_STATE", "reconcile_state.json")
+BATCH_SIZE = max(1, int(os.getenv("RECONCILE_BATCH", "50")))  # PB default'da batch.maxRequests = 50
+
+PER_PAGE = 1000
+FILTER_IDS = 40                # bitta filtrdagi id'lar soni (URL uzunligi chegarasi)
+CLOCK_SKEW = timedelta(minutes=5)  # server va lokal soat farqi uchun zaxira
+EPS = 1e-6
+
+# order_items hook'lari zaxirani faqat shu statuslarda ushlab turadi (pb_hooks/order_items.js)
+ACTIVE_ORDER_STATUSES = ("created", "editable")
+
+session = requests.Session()
+if PB_TOKEN:
+    session.headers.update({"Authorization": f"Bearer {PB_TOKEN}"})
+
+def pb_datetime(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.000Z")
+
+def with_id(fields):
+    """Keyset kursori uchun fields'ga id qo'shiladi (chaqiruvchi so'ramagan bo'lsa ham)."""
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    return ",".join(names if "id" in names or "*" in names else ["id"] + names)
+
+def iter_records(coll, fields, flt="", expand=""):
+    """Keyset pagination (id > oxirgi, sort=id, skipTotal) bilan yozuvlarni oqim qilib o'qiydi.
+    Har bir yozuvda id bo'ladi — keyingi sahifa shundan boshlanadi."""
+    last = ""
+    while True:
+        params = {"perPage": PER_PAGE, "fields": with_id(fields), "skipTotal": 1, "sort": "id"}
+        conds = [f"({flt})"] if flt else []
+        if last:
+            conds.append(f'id > "{last}"')
+        if conds:
+            params["filter"] = " && ".join(conds)
+        if expand:
+            params["expand"] = expand
+        r = session.get(f"{PB_BASE}/api/collections/{coll}/records", params=params, timeout=120)
+        if r.status_code != 200:
+            raise RuntimeError(f"[GET {coll}] {r.status_code} {r.text}")
+        data = r.json()
+        items = data.get("items", [])
+        yield from items
+        if not items or len(items) < (data.get("perPage") or PER_PAGE):
+            return
+        last = items[-1]["id"]
+
+def any_of(field, values):
+    return " || ".join(f'{field} = "{v}"' for v in values)
+
+def id_filters(field, ids):
+    """ids None bo'lsa bitta bo'sh filtr (hammasi), aks holda FILTER_IDS talik OR filtrlari."""
+    if ids is None:
+        yield ""
+        return
+    ids = sorted(ids)
+    for i in range(0, len(ids), FILTER_IDS):
+        yield any_of(field, ids[i:i + FILTER_IDS])
+
+def both(a, b):
+    return " && ".join(f"({x})" for x in (a, b) if x)
+
+def scan_ledger(products=None):
+    """Hujjatlar bo'yicha mahsulot -> [ok, defect, kirim qty, kirim summa USD]; products None = hammasi."""
+    agg = defaultdict(lambda: [0.0, 0.0, 0.0, 0.0])
+    no_rate = 0
+    active = any_of("order.status", ACTIVE_ORDER_STATUSES)
+    for flt in id_filters("product", products):
+        for it in iter_records("stock_entry_items", "product,qty,price,is_defect,expand.entry.currency,expand.entry.rate",
+                               flt, expand="entry"):
+            a, qty = agg[it["product"]], float(it.get("qty") or 0)
+            if it.get("is_defect"):
+                a[1] += qty
+                continue
+            a[0] += qty
+            entry = (it.get("expand") or {}).get("entry") or {}
+            price, rate = float(it.get("price") or 0), float(entry.get("rate") or 0)
+            if entry.get("currency") == "UZS":
+                if not rate:
+                    no_rate += 1  # hook ham bunday kirimda tannarxni hisoblamaydi
+                    continue
+                price /= rate
+            a[2] += qty
+            a[3] += qty * price
+        for it in iter_records("return_entry_items", "product,qty,is_defect", flt):
+            agg[it["product"]][1 if it.get("is_defect") else 0] += float(it.get("qty") or 0)
+        for it in iter_records("order_items", "product,qty", both(flt, active)):
+            agg[it["product"]][0] -= float(it.get("qty") or 0)
+    if no_rate:
+        print(f"⚠️  {no_rate} ta UZS kirim itemida kurs yo'q — tannarxga qo'shilmadi")
+    return agg
+
+def dirty_products(since):
+    """since'dan beri o'zgargan hujjatlar tegadigan mahsulotlar (order/entry o'zgarsa — uning itemlari)."""
+    changed = f'updated >= "{since}"'
+    dirty = {r["id"] for r in iter_records("products", "id", changed)}
+    for coll in ("stock_entry_items", "return_entry_items", "order_items"):
+        dirty.update(r["product"] for r in iter_records(coll, "product", changed))
+    # status/kurs o'zgarishi itemlarga tegmaydi, lekin hisobni o'zgartiradi
+    dirty.update(r["product"] for r in iter_records("order_items", "product", f'order.updated >= "{since}"'))
+    dirty.update(r["product"] for r in iter_records("stock_entry_items", "product", f'entry.updated >= "{since}"'))
+    dirty.discard("")
+    return dirty
+
+def diff_products(agg, products=None):
+    """Saqlangan qiymati hisoblangandan farq qiladigan mahsulotlar: [(id, patch)]."""
+    out = []
+    for flt in id_filters("id", products):
+        for p in iter_records("products", "id,stock_ok,stock_defect,avg_cost_usd", flt):
+            ok, defect, cost_qty, cost_sum = agg.get(p["id"], (0, 0, 0, 0))
+            patch = {}
+            if abs((p.get("stock_ok") or 0) - ok) > EPS:
+                patch["stock_ok"] = round(ok, 6)
+            if abs((p.get("stock_defect") or 0) - defect) > EPS:
+                patch["stock_defect"] = round(defect, 6)
+            if cost_qty > EPS:
+                avg = round(cost_sum / cost_qty, 4)
+                if abs((p.get("avg_cost_usd") or 0) - avg) > 1e-4:
+                    patch["avg_cost_usd"] = avg
+            if patch:
+                out.append((p["id"], patch))
+    return out
+
+def write_patches(patches):
+    """/api/batch bilan BATCH_SIZE talik PATCH; batch o'chirilgan (403) bo'lsa bittalab. Yozilganlar soni."""
+    url = lambda pid: f"/api/collections/products/records/{pid}"
+    n, batch = 0, BATCH_SIZE > 1
+    for i in range(0, len(patches), BATCH_SIZE):
+        chunk = patches[i:i + BATCH_SIZE]
+        if batch:
+            r = session.post(f"{PB_BASE}/api/batch", timeout=120,
+                             json={"requests": [{"method": "PATCH", "url": url(pid), "body": b} for pid, b in chunk]})
+            if r.status_code == 200:
+                n += len(chunk)
+                continue
+            if r.status_code != 403:
+                raise RuntimeError(f"[BATCH products] {r.status_code} {r.text}")
+            batch = False
+        for pid, body in chunk:
+            r = session.patch(f"{PB_BASE}{url(pid)}", json=body, timeout=60)
+            if r.status_code != 200:
+                raise RuntimeError(f"[PATCH products/{pid}] {r.status_code} {r.text}")
+            n += 1
+    return n
+
+def load_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_state(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+def main(argv):
+    unknown = [a for a in argv[1:] if a not in ("--full", "--dry-run")]
+    if unknown:
+        raise SystemExit("Ishlatish: python reconcile_stock.py [--full] [--dry-run]")
+    dry = "--dry-run" in argv
+    since = None if "--full" in argv else load_state(STATE_FILE).get("since")
+
+    started = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    products = None
+    if since:
+        products = dirty_products(since)
+        print(f"Inkremental: {since} dan beri {len(products)} ta mahsulotga tegilgan")
+    else:
+        print("To'liq qayta hisoblash")
+    agg = scan_ledger(products) if products is None or products else {}
+    patches = diff_products(agg, products) if products is None or products else []
+    t1 = time.perf_counter()
+
+    print(f"Hisob: {len(agg)} ta mahsulot bo'yicha hujjat bor, {len(patches)} tasida farq ({t1 - t0:.1f}s)")
+    for pid, body in patches[:10]:
+        print(f"  {pid}: {json.dumps(body)}")
+    if dry:
+        print("--dry-run: hech narsa yozilmadi")
+        return
+    written = write_patches(patches)
+    save_state(STATE_FILE, {"since": pb_datetime(started - CLOCK_SKEW)})
+    print(f"✅ {written} ta mahsulot yangilandi ({time.perf_counter() - t1:.1f}s)")
+
+if __name__ == "__main__":
+    main(sys.argv)
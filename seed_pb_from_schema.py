@@ -3,26 +3,525 @@
 # - Superuser-only koleksiyalar SKIP qilinadi
 # - Required relation'lar CREATE vaqtida to'ldiriladi; pool bo'sh bo'lsa kolleksiya skip
 # - Sxemadan select values o'qiladi (masalan orders.discount_type)
-# Talablar: pip install requests faker python-dateutil
+# - fx_rates: 18 oylik kunlik random-walk (serverda bor sanalar o'tkazib yuboriladi); to'lovlar fx_rate'i
+#   va UZS narx snapshot'lari shu qatordan as-of qidiruv bilan olinadi
+# - SEED_OUT=dir: serversiz (offline) generatsiya — yozuvlar kolleksiya bo'yicha NDJSON fayllarga
+#   SEED_REPLAY=dir: shu fayllarni (manifest.json tartibida) PB_BASE serverga yuklash
+# - SEED_JOURNAL=fayl: har bir yaratilgan/patch qilingan id bosqichi bilan jurnalga yoziladi;
+#   SEED_RESUME=1 bilan qayta ishga tushirilsa serverdan list qilmasdan to'xtagan joydan davom etadi
+#   (jurnal yoqilganda create'lar mijoz id'si bilan ketadi — javobi yo'qolganlari id bo'yicha tekshiriladi)
+# - SEED_LOAD=sekund: mavjud ma'lumot ustida yuklama testi (order/order_items/status, to'lov,
+#   qaytarish, kirim) — daily_seq/human_id takrorlari va zaxira drift'i tekshiriladi
+# - Oxirida kolleksiya/op bo'yicha so'rov statistikasi (p50/p95/p99, xatolar, baytlar) va bosqich
+#   vaqtlari chiqariladi; SEED_METRICS=fayl.json — shu hisobot JSON ko'rinishida
+# - SEED_VERIFY=1 (yoki fayl.json): seed/yuklama testidan keyin yaxlitlik tekshiruvi — yetim va bo'sh
+#   required relation'lar, human_id/daily_seq takrorlari, manfiy zaxira; xato bo'lsa exit kodi 1
+# - SEED_SNAPSHOT=dir: fixture keshi. Kalit = sxema + seeder kodi + COUNTS/SKIP_SEED (+ SEED_RANDOM).
+#   Keshda bo'lsa HTTP seed o'rniga pb_data/data.db (PB_DATA) snapshot'dan tiklanadi (SQLite backup API,
+#   soniyalar); bo'lmasa seed muvaffaqiyatli tugagach snapshot + manifest yoziladi. SEED_RESEED=1 — keshsiz
+#   Tiklash uchun PocketBase TO'XTATILGAN bo'lishi kerak: PB_BASE /api/health'ga javob bersa rad etiladi
+# - SEED_TARGETS=fayl|URL,URL: fan-out — ma'lumot bir marta generatsiya qilinib, har bir PB'ga alohida
+#   jarayonda bir vaqtda yuklanadi (faylda har qatorda "URL [TOKEN]"); SEED_FANOUT — parallel target'lar;
+#   --only generatsiyaga uzatiladi, --dry-run faqat generatsiya qiladi (target'larga yozmaydi)
+# - SEED_TRACE=fayl.json: span'lar (bosqich, kolleksiya, ustun bloki, JSON kodlash/parse, har bir so'rov/
+#   batch) wall va CPU vaqti bilan Chrome trace-event formatida (ui.perfetto.dev, speedscope.app);
+#   oxirida generatsiya/relation/JSON/HTTP bo'yicha CPU yig'masi. SEED_PROFILE=bosqich (yoki "*") —
+#   shu bosqichda sampling profiler (SEED_PROFILE_HZ, default 200) stack'larni shu faylga yozadi
+#   (SEED_TRACE berilmasa seed_trace.json). O'chirilganda overhead ~0 — nightly seed'larda ham qoladi
+# - SEED_CACHE=dir (default .seed_cache): sxema fayli sha256'i bo'yicha kompilyatsiya qilingan reja keshi.
+#   requests/faker/numpy faqat kerak bo'lganda import qilinadi; modul import qilinganda seed boshlanmaydi
+# Ishlatish: python seed_pb_from_schema.py [--plan | --dry-run] [--only kolleksiya1,kolleksiya2]
+#   --plan: reja (darajalar, sonlar, relation'lar) — serverga murojaatsiz; --dry-run: yozuvlar generatsiya
+#   qilinadi, lekin hech qayerga yozilmaydi; --only: faqat shu kolleksiyalar (pool'lar serverdagi yozuvlardan)
+# Talablar: pip install requests faker (ixtiyoriy: numpy — tezroq ustunli generatsiya)
 
-import os, json, random, time
+import os, sys, re, json, math, random, string, time, threading, hashlib, shutil, sqlite3, importlib, atexit
+import subprocess, tempfile
+from bisect import bisect_left, bisect_right
 from collections import defaultdict, deque
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta, date
-from dateutil.relativedelta import relativedelta
-import requests
-from faker import Faker
+from importlib.util import find_spec
+
+class LazyModule:
+    """Og'ir modul birinchi atributga murojaatda import qilinadi (--plan/--dry-run ularsiz ishlaydi)."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+requests = LazyModule("requests")
 
 # ---- MUHIT ----
 PB_BASE   = os.getenv("PB_BASE", "http://127.0.0.1:8090")
 PB_TOKEN  = os.getenv("PB_TOKEN", "")
 SCHEMA    = os.getenv("PB_SCHEMA", "pb_schema.json")
+# Bir vaqtda serverga ketayotgan so'rovlar chegarasi (1 = eski ketma-ket rejim). SEED_ADAPTIVE=1 (default)
+# bo'lsa bu yuqori chegara: haqiqiy limit server latency/xatolariga qarab AIMD bilan moslashadi
+CONCURRENCY = max(1, int(os.getenv("SEED_CONCURRENCY", "1")))
+ADAPTIVE = os.getenv("SEED_ADAPTIVE", "1") == "1"
+RETRIES = max(0, int(os.getenv("SEED_RETRIES", "4")))  # vaqtinchalik xatolarda qayta urinishlar
+RETRY_BASE, RETRY_CAP = 0.2, 10.0                      # backoff: sekund
+# /api/batch chunk hajmi (0/1 = har bir yozuv alohida so'rov). PB default'da batch.maxRequests = 50
+BATCH_SIZE = max(0, int(os.getenv("SEED_BATCH", "0")))
+OUT_DIR    = os.getenv("SEED_OUT", "")      # offline generatsiya katalogi
+REPLAY_DIR = os.getenv("SEED_REPLAY", "")   # oldin generatsiya qilingan NDJSON'ni yuklash
+METRICS_FILE = os.getenv("SEED_METRICS", "")  # JSON metrika hisoboti
+VERIFY = os.getenv("SEED_VERIFY", "")         # "1" yoki JSON hisobot fayli: yaxlitlik tekshiruvi
+JOURNAL_FILE = os.getenv("SEED_JOURNAL", "")         # yaratilgan/patch qilingan id'lar jurnali
+RESUME = os.getenv("SEED_RESUME", "") == "1"         # jurnal bo'yicha to'xtagan joydan davom etish
+LOAD_SECONDS = float(os.getenv("SEED_LOAD", "0"))      # >0: seed o'rniga shuncha sekund yuklama testi
+LOAD_RATE    = float(os.getenv("SEED_LOAD_RATE", "0"))  # oqim/s (0 = cheklovsiz)
+VOCAB_FILE = os.getenv("SEED_VOCAB", "")    # matn lug'ati keshi (JSON); bo'sh = har safar qayta
+SNAPSHOT_DIR = os.getenv("SEED_SNAPSHOT", "")  # fixture snapshot keshi katalogi
+RESEED = os.getenv("SEED_RESEED", "") == "1"   # keshda bo'lsa ham qayta seed qilish (snapshot yangilanadi)
+PB_DATA = os.getenv("PB_DATA", os.path.join("maxdoors_backend", "pb_data", "data.db"))
+CACHE_DIR = os.getenv("SEED_CACHE", ".seed_cache")  # kompilyatsiya qilingan reja keshi; "" = o'chirilgan
+TARGETS = os.getenv("SEED_TARGETS", "")          # fan-out: bir generatsiya -> bir nechta PB (fayl yoki URL,URL)
+FANOUT = max(0, int(os.getenv("SEED_FANOUT", "0")))  # bir vaqtda yuklanadigan target'lar (0 = hammasi)
+PROFILE_PHASE = os.getenv("SEED_PROFILE", "")      # shu bosqichda sampling profiler ("*" = hammasida)
+PROFILE_HZ = max(1.0, float(os.getenv("SEED_PROFILE_HZ", "200")))
+TRACE_FILE = os.getenv("SEED_TRACE", "") or ("seed_trace.json" if PROFILE_PHASE else "")  # trace-event JSON
+# RNG urug'i: random, numpy va Faker shundan — manifest'ga yoziladi (bir xil urug' + CONCURRENCY=1 =
+# bir xil ma'lumot; SEED_TAG ham bir xil bo'lishi kerak)
+RNG_SEED = int(os.getenv("SEED_RANDOM") or random.SystemRandom().getrandbits(32))
+rnd = random.Random(RNG_SEED)  # ma'lumot generatsiyasi — modul import qilinganda global random'ga tegmaydi
+# unique qiymatlar (nom/email/barcode) hisoblagichiga qo'shiladigan run belgisi — qayta seed'da
+# oldingi yozuvlar bilan to'qnashmaslik uchun. Toza bazada SEED_TAG="" bilan qisqaroq qiymatlar.
+SEED_TAG = os.getenv("SEED_TAG")
+if SEED_TAG is None:  # default: joriy vaqt (sekund) base36'da
+    _t, SEED_TAG = int(time.time()), ""
+    while _t:
+        _t, _r = divmod(_t, 36)
+        SEED_TAG = "0123456789abcdefghijklmnopqrstuvwxyz"[_r] + SEED_TAG
+
+# requests.Session oqimlar orasida bo'lishilmaydi — har bir worker o'z session'ini oladi
+_tls = threading.local()
+_batch_off = threading.Event()  # server batch'ni o'chirgan bo'lsa — bir martalik fallback
+
+def http():
+    s = getattr(_tls, "session", None)
+    if s is None:
+        s = requests.Session()
+        if PB_TOKEN:
+            s.headers.update({"Authorization": f"Bearer {PB_TOKEN}"})
+        _tls.session = s
+    return s
+
+class AimdLimiter:
+    """Bir vaqtdagi so'rovlar chegarasi (AIMD). Latency barqaror bo'lsa limit har "oyna"da ~+1 o'sadi;
+    429/5xx/timeout'da ikki baravar, silliqlangan latency bazaviydan TOLERANCE marta oshsa 0.8 ga
+    kamayadi (bir latency davrida ko'pi bilan bir marta). Limit [1, max_limit] oralig'ida."""
+    TOLERANCE = 2.0
+
+    def __init__(self, max_limit, adaptive=True):
+        self.max = max_limit
+        self.adaptive = adaptive and max_limit > 1
+        self.limit = float(min(max_limit, 4) if self.adaptive else max_limit)
+        self.peak = self.limit
+        self.cuts = 0
+        self._inflight = 0
+        self._ewma = None     # joriy latency (EWMA)
+        self._base = None     # bazaviy latency: EWMA'ning sekin ko'tariladigan minimumi
+        self._cut_at = 0.0
+        self._cv = threading.Condition()
+
+    def acquire(self):
+        with self._cv:
+            while self._inflight >= int(self.limit):
+                self._cv.wait()
+            self._inflight += 1
+
+    def release(self, secs, overloaded=False):
+        with self._cv:
+            self._inflight -= 1
+            if self.adaptive:
+                self._adjust(secs, overloaded)
+            self._cv.notify_all()
+
+    def _adjust(self, secs, overloaded):
+        if not overloaded:
+            self._ewma = secs if self._ewma is None else self._ewma + (secs - self._ewma) * 0.1
+            b = self._base
+            self._base = self._ewma if b is None or self._ewma < b else b + (self._ewma - b) * 0.002
+        if overloaded or self._ewma > self.TOLERANCE * self._base:
+            now = time.monotonic()
+            if now - self._cut_at > max(self._ewma, 0.05):
+                self.limit = max(1.0, self.limit * (0.5 if overloaded else 0.8))
+                self._cut_at = now
+                self.cuts += 1
+        else:
+            self.limit = min(float(self.max), self.limit + 1.0 / self.limit)
+            self.peak = max(self.peak, self.limit)
+
+    def state(self):
+        return {"adaptive": self.adaptive, "max": self.max, "limit": round(self.limit, 1),
+                "peak": round(self.peak, 1), "cuts": self.cuts}
+
+# yuklama testi aynan SEED_CONCURRENCY ta virtual foydalanuvchi bilan o'lchanadi — u yerda adaptiv emas
+_limiter = AimdLimiter(CONCURRENCY, adaptive=ADAPTIVE and not LOAD_SECONDS)
+# totalItems so'rovlari (perPage=1, faqat o'qish) o'z kichik pool'ida — SEED_CONCURRENCY=1 bo'lsa ham
+# o'nlab kolleksiya sanog'i ketma-ket navbat kutmaydi va yozish chegarasidan joy olmaydi
+COUNT_CONCURRENCY = 8
+_count_limiter = AimdLimiter(COUNT_CONCURRENCY, adaptive=False)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}  # 500: PB'da ko'pincha "database is locked"
+AMBIGUOUS_STATUS = {500, 502, 504}            # server bajargan bo'lishi mumkin — POST qayta yuborilmaydi
+
+def retry_delay(attempt, resp=None):
+    """Jitter'li eksponensial kutish (full jitter); server Retry-After bersa — shuni hurmat qiladi
+    (RETRY_CAP'dan oshmagan holda: bitta javob seeder'ni soatlab to'xtatib qo'ymasin)."""
+    ra = resp.headers.get("Retry-After") if resp is not None else None
+    if ra and ra.isdigit():
+        return min(RETRY_CAP, float(ra))
+    return random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+
+def request_not_sent(e):
+    """Ulanish o'rnatilmagan (connect timeout, rad etildi, DNS) — so'rov serverga yetmagan, POST ham
+    xavfsiz qayta yuboriladi. "Connection aborted"/RemoteDisconnected body yuborilgandan keyin ham
+    bo'ladi — server yozgan bo'lishi mumkin, shuning uchun bu yerga kirmaydi."""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    from urllib3.exceptions import NewConnectionError
+    reason = getattr(e.args[0], "reason", None) if isinstance(e, requests.ConnectionError) and e.args else None
+    return isinstance(reason, NewConnectionError)
+
+def outcome_unknown(err):
+    """Yozish natijasi noma'lum: so'rov yuborilgan, lekin javob kelmagan yoki 500/502/504 — server
+    yozgan bo'lishi ham, yozmagan bo'lishi ham mumkin."""
+    if isinstance(err, requests.RequestException):
+        return not request_not_sent(err)
+    m = re.match(r"\[[^\]]*\] (\d{3}) ", str(err))
+    return m is not None and int(m.group(1)) in AMBIGUOUS_STATUS
+
+class Metrics:
+    """PB so'rovlari statistikasi: (kolleksiya, op) -> so'rovlar/yozuvlar soni, status bo'yicha xatolar,
+    yuborilgan/qabul qilingan baytlar va latency histogrammasi (log bucket'lar — xotira o'zgarmas).
+    Bosqichlar ketma-ket: phase(nom) oldingisini yopib yangisini boshlaydi."""
+    BUCKET_MIN, BUCKET_STEP, BUCKETS = 1e-4, 1.2, 90   # 0.1ms .. ~1.4 soat, ~20% aniqlik
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.phases = []   # [[nom, sekund]]
+        self._phase_t = None
+
+    def record(self, coll, op, status, sent, recv, t0, t1, items=1):
+        secs = t1 - t0
+        b = 0 if secs <= self.BUCKET_MIN else \
+            min(self.BUCKETS - 1, 1 + int(math.log(secs / self.BUCKET_MIN, self.BUCKET_STEP)))
+        with self._lock:
+            st = self._stats.get((coll, op))
+            if st is None:
+                st = self._stats[(coll, op)] = {
+                    "requests": 0, "items": 0, "errors": defaultdict(int), "sent": 0, "recv": 0,
+                    "time": 0.0, "first": t0, "last": t1, "hist": [0] * self.BUCKETS,
+                }
+            st["requests"] += 1
+            st["items"] += items
+            if status != 200:
+                st["errors"][str(status)] += 1
+            st["sent"] += sent
+            st["recv"] += recv
+            st["time"] += secs
+            st["first"], st["last"] = min(st["first"], t0), max(st["last"], t1)
+            st["hist"][b] += 1
+
+    def phase(self, name):
+        now = time.perf_counter()
+        if self.phases and self._phase_t is not None:
+            self.phases[-1][1] = now - self._phase_t
+        self._phase_t = now
+        if name:
+            self.phases.append([name, 0.0])
+        if tracer is not None:
+            tracer.phase(name)
+
+    def _bound_ms(self, b):
+        return round(self.BUCKET_MIN * self.BUCKET_STEP ** b * 1000, 3)
+
+    def _pct(self, hist, total, q):
+        """q-percentil: tegishli bucket'ning yuqori chegarasi (ms)."""
+        acc = 0
+        for b, cnt in enumerate(hist):
+            acc += cnt
+            if acc >= q * total:
+                return self._bound_ms(b)
+        return self._bound_ms(len(hist) - 1)
+
+    def report(self, path=""):
+        """Jadvalni chiqaradi; path berilsa JSON hisobot ham yoziladi."""
+        self.phase(None)
+        rows_ = []
+        for (coll, op), st in sorted(self._stats.items()):
+            n, span = st["requests"], st["last"] - st["first"]
+            rows_.append({
+                "collection": coll, "op": op, "requests": n, "items": st["items"],
+                "errors": dict(st["errors"]), "bytes_sent": st["sent"], "bytes_recv": st["recv"],
+                "mean_ms": round(st["time"] / n * 1000, 3),
+                "p50_ms": self._pct(st["hist"], n, 0.50),
+                "p95_ms": self._pct(st["hist"], n, 0.95),
+                "p99_ms": self._pct(st["hist"], n, 0.99),
+                "items_per_s": round(st["items"] / span, 1) if span > 0 else None,
+                "hist_ms": {str(self._bound_ms(b)): c for b, c in enumerate(st["hist"]) if c},
+            })
+        if rows_:
+            print(f"\n{'kolleksiya':<22}{'op':<7}{'so‘rov':>8}{'yozuv':>9}{'xato':>6}{'p50ms':>9}"
+                  f"{'p95ms':>9}{'p99ms':>9}{'yozuv/s':>10}{'KB out':>9}{'KB in':>9}")
+            for r in rows_:
+                print(f"{r['collection']:<22}{r['op']:<7}{r['requests']:>8}{r['items']:>9}"
+                      f"{sum(r['errors'].values()):>6}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                      f"{r['items_per_s'] or 0:>10.1f}{r['bytes_sent'] / 1024:>9.0f}{r['bytes_recv'] / 1024:>9.0f}")
+        if _limiter.adaptive:
+            st = _limiter.state()
+            print(f"Adaptiv concurrency: oxirgi {st['limit']}, eng yuqori {st['peak']} (max {st['max']}), "
+                  f"{st['cuts']} marta kamaytirildi")
+        if self.phases:
+            print("Bosqichlar: " + ", ".join(f"{name} {secs:.1f}s" for name, secs in self.phases))
+        trace = None
+        if tracer is not None:
+            trace = tracer.summary()
+            tracer.close()
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "generated_at": datetime.now().isoformat(timespec="seconds"),
+                    "base": PB_BASE, "concurrency": _limiter.state(), "batch": BATCH_SIZE,
+                    "phases": {name: round(secs, 3) for name, secs in self.phases},
+                    "requests": rows_,
+                    **({"trace": trace} if trace else {}),
+                }, f, ensure_ascii=False, indent=1)
+            print(f"Metrika hisobot: {path}")
+
+metrics = Metrics()
+
+# ---- TRACE / PROFILER (SEED_TRACE, SEED_PROFILE) ----
+# Mijoz CPU'si qayerga ketadi: generatsiya, relation tanlash, JSON kodlash/parse yoki server kutish.
+# Span'lar — bosqich, kolleksiya, ustun bloki, har bir HTTP so'rov/batch — wall (perf_counter) va CPU
+# (span: oqim thread_time, bosqich: butun jarayon process_time) vaqti bilan Chrome trace-event JSON'ga
+# oqim bilan yoziladi (ui.perfetto.dev, chrome://tracing, speedscope.app). SEED_PROFILE=bosqich — shu
+# bosqichda barcha oqimlarning stack'lari SEED_PROFILE_HZ chastotada olinib, shu faylga flame chart
+# (B/E event'lar) sifatida yoziladi. O'chirilganda span() umumiy no-op qaytaradi — narxi bitta tekshiruv.
+SPAN_PID, SAMPLE_PID = 1, 2   # trace'dagi "jarayon"lar: span'lar va profiler namunalari alohida qatorda
+
+class Tracer:
+    """Trace-event yozuvchi. Event'lar diskka darhol (JSON array format) — xotira o'zgarmas, jarayon
+    yiqilsa ham fayl ochiladi (yopuvchi "]" ixtiyoriy). Yig'ma: (tur, nom) -> [soni, wall, CPU]."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._sep = "["
+        self._t0 = time.perf_counter()
+        self._tids = set()
+        self.totals = defaultdict(lambda: [0, 0.0, 0.0])
+        self.phases = []            # [[nom, wall, CPU]]
+        self._phase = None          # (nom, perf_counter, process_time)
+        self._sampler = None
+        self._emit({"name": "process_name", "ph": "M", "pid": SPAN_PID, "args": {"name": "seed (span'lar)"}})
+
+    def _us(self, t):
+        return round((t - self._t0) * 1e6, 1)
+
+    def _emit(self, ev):
+        line = json.dumps(ev, ensure_ascii=False)
+        with self._lock:
+            if self._f is not None:
+                self._f.write(self._sep + "\n" + line)
+                self._sep = ","
+
+    def _add(self, name, cat, t0, t1, cpu, args, pid=SPAN_PID, tid=None):
+        tid = threading.get_ident() if tid is None else tid
+        self._emit({"name": name, "cat": cat, "ph": "X", "ts": self._us(t0), "dur": self._us(t1) - self._us(t0),
+                    "pid": pid, "tid": tid, "args": {"cpu_ms": round(cpu * 1000, 3), **args}})
+        with self._lock:
+            self._tids.add(tid)
+            tot = self.totals[(cat, name)]
+            tot[0] += 1
+            tot[1] += t1 - t0
+            tot[2] += cpu
+
+    @contextmanager
+    def span(self, name, cat, args):
+        t0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self._add(name, cat, t0, time.perf_counter(), time.thread_time() - c0, args)
+
+    def phase(self, name):
+        """Metrics.phase'dan: oldingi bosqich span'ini yopadi (CPU — barcha oqimlar), profiler'ni boshqaradi."""
+        now, cpu = time.perf_counter(), time.process_time()
+        if self._phase is not None:
+            pname, t0, c0 = self._phase
+            self._add(pname, "phase", t0, now, cpu - c0, {}, tid=0)
+            self.phases.append([pname, now - t0, cpu - c0])
+            self._phase = None
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+        if name:
+            self._phase = (name, now, cpu)
+            if PROFILE_PHASE in ("*", name):
+                self._sampler = Sampler(self, name)
+                self._sampler.start()
+
+    def summary(self):
+        """Yig'ma jadvalni chiqaradi va JSON hisobot uchun qaytaradi."""
+        self.phase(None)
+        by_cat = defaultdict(lambda: [0, 0.0, 0.0])
+        for (cat, _), (n, wall, cpu) in self.totals.items():
+            if cat != "phase":
+                acc = by_cat[cat]
+                acc[0], acc[1], acc[2] = acc[0] + n, acc[1] + wall, acc[2] + cpu
+        pct = lambda wall, cpu: f"{cpu / wall * 100:>5.0f}%" if wall > 0 else "     -"
+        print(f"\nTrace: {self.path} — wall / mijoz CPU")
+        for name, wall, cpu in self.phases:
+            print(f"  bosqich {name:<24}{wall:>9.2f}s{cpu:>9.2f}s {pct(wall, cpu)}")
+        for cat, (n, wall, cpu) in sorted(by_cat.items(), key=lambda kv: -kv[1][2]):
+            print(f"  {cat:<12}{n:>8} span{wall:>11.2f}s{cpu:>9.2f}s {pct(wall, cpu)}")
+        top = sorted(((k, v) for k, v in self.totals.items() if k[0] not in ("phase", "collection")),
+                     key=lambda kv: -kv[1][2])[:8]
+        if top:
+            print("  Eng ko'p CPU: " + ", ".join(f"{name} {cpu:.2f}s" for (_, name), (_, _, cpu) in top))
+        return {
+            "file": self.path,
+            "phases": {name: {"wall_s": round(wall, 3), "cpu_s": round(cpu, 3)} for name, wall, cpu in self.phases},
+            "categories": {cat: {"spans": n, "wall_s": round(wall, 3), "cpu_s": round(cpu, 3)}
+                           for cat, (n, wall, cpu) in by_cat.items()},
+            "spans": [{"cat": cat, "name": name, "count": n, "wall_s": round(wall, 4), "cpu_s": round(cpu, 4)}
+                      for (cat, name), (n, wall, cpu) in sorted(self.totals.items())],
+        }
+
+    def close(self):
+        self.phase(None)
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid in sorted(self._tids):
+            if tid in names:
+                self._emit({"name": "thread_name", "ph": "M", "pid": SPAN_PID, "tid": tid, "args": {"name": names[tid]}})
+        self._emit({"name": "thread_name", "ph": "M", "pid": SPAN_PID, "tid": 0, "args": {"name": "bosqichlar"}})
+        with self._lock:
+            if self._f is not None:
+                self._f.write("\n]\n" if self._sep == "," else "[]\n")
+                self._f.close()
+                self._f = None
+
+class Sampler(threading.Thread):
+    """Sampling profiler: har 1/SEED_PROFILE_HZ sekundda sys._current_frames() — barcha oqimlarning
+    stack'i. Ketma-ket namunalardagi umumiy prefiks davom etadi, qolgani E (yopildi) / B (ochildi)
+    event'lari bo'ladi — viewer'da har bir oqim uchun vaqt bo'yicha flame chart. cProfile'dan farqli
+    ravishda ishchi oqimlar ham ko'rinadi va o'lchanayotgan kod sekinlashmaydi (faqat GIL ulushi)."""
 
-session = requests.Session()
-if PB_TOKEN:
-    session.headers.update({"Authorization": f"Bearer {PB_TOKEN}"})
+    def __init__(self, tracer, phase_name):
+        super().__init__(name="seed-profiler", daemon=True)
+        self.tracer = tracer
+        self._stop_ev = threading.Event()
+        self._open = {}     # tid -> [freym nomlari]
+        self._names = {}    # code -> "funksiya (fayl:qator)"
+        tracer._emit({"name": "process_name", "ph": "M", "pid": SAMPLE_PID,
+                      "args": {"name": f"profiler ({phase_name}, {PROFILE_HZ:g} Hz)"}})
+
+    def _frame(self, code):
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return name
+
+    def _diff(self, tid, stack, ts):
+        old = self._open.get(tid, [])
+        k = 0
+        while k < len(old) and k < len(stack) and old[k] == stack[k]:
+            k += 1
+        for name in reversed(old[k:]):
+            self.tracer._emit({"name": name, "ph": "E", "ts": ts, "pid": SAMPLE_PID, "tid": tid})
+        for name in stack[k:]:
+            self.tracer._emit({"name": name, "cat": "sample", "ph": "B", "ts": ts, "pid": SAMPLE_PID, "tid": tid})
+        self._open[tid] = stack
+
+    def run(self):
+        me, interval = threading.get_ident(), 1.0 / PROFILE_HZ
+        while not self._stop_ev.wait(interval):
+            ts = self.tracer._us(time.perf_counter())
+            frames = sys._current_frames()
+            for tid, fr in frames.items():
+                if tid == me:
+                    continue
+                stack = []
+                while fr is not None:
+                    stack.append(self._frame(fr.f_code))
+                    fr = fr.f_back
+                stack.reverse()
+                self._diff(tid, stack, ts)
+            for tid in [t for t in self._open if t not in frames]:
+                self._diff(tid, [], ts)
+        ts = self.tracer._us(time.perf_counter())
+        for tid in list(self._open):
+            self._diff(tid, [], ts)
+
+    def stop(self):
+        self._stop_ev.set()
+        self.join()
+
+tracer = None   # main() SEED_TRACE bo'lsa yaratadi
+_NOOP_SPAN = nullcontext()
+
+def span(name, cat, **args):
+    """Trace span'i (with bilan); trace o'chirilgan bo'lsa umumiy no-op."""
+    return _NOOP_SPAN if tracer is None else tracer.span(name, cat, args)
+
+def rjson(r):
+    """Javob JSON'i — parse vaqti trace'da alohida ("json" span)."""
+    if tracer is None:
+        return r.json()
+    with span("parse", "json"):
+        return r.json()
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def pb_call(method, url, coll, op, items=1, limiter=None, **kw):
+    """Barcha PB so'rovlari shu yerdan o'tadi: adaptiv concurrency chegarasi, retry va metrika.
+    Vaqtinchalik xatolar (429/5xx, ulanish/timeout) jitter'li backoff bilan qayta uriniladi;
+    4xx va boshqalar doimiy — javob chaqiruvchiga qaytadi. POST (create/batch) faqat server uni
+    bajarmagani aniq bo'lganda (429/503, ulanib bo'lmadi — request_not_sent) qayta yuboriladi;
+    ulanish yuborilgandan keyin uzilsa, ReadTimeout va 500/502/504'da emas — takror yozuv bo'lmasin."""
+    idempotent = method in ("GET", "PATCH")
+    if "json" in kw:  # bir marta kodlanadi — retry'larda qayta emas
+        with span("encode", "json"):
+            kw["data"] = json.dumps(kw.pop("json"), separators=(",", ":"), allow_nan=False).encode()
+        kw["headers"] = JSON_HEADERS
+    limiter = limiter or _limiter
+    for attempt in range(RETRIES + 1):
+        limiter.acquire()
+        t0 = time.perf_counter()
+        try:
+            with span(f"{op} {coll}", "http", items=items, attempt=attempt):
+                r = http().request(method, url, **kw)
+        except requests.RequestException as e:
+            t1 = time.perf_counter()
+            limiter.release(t1 - t0, overloaded=True)
+            metrics.record(coll, op, "exc", 0, 0, t0, t1, items)
+            if attempt >= RETRIES or not (idempotent or request_not_sent(e)):
+                raise
+            time.sleep(retry_delay(attempt))
+            continue
+        t1 = time.perf_counter()
+        retryable = r.status_code in RETRYABLE_STATUS
+        limiter.release(t1 - t0, overloaded=retryable)
+        metrics.record(coll, op, r.status_code, len(r.request.body or b""), len(r.content), t0, t1, items)
+        if not retryable or attempt >= RETRIES or (not idempotent and r.status_code in AMBIGUOUS_STATUS):
+            return r
+        time.sleep(retry_delay(attempt, r))
+    return r
 
 # ---- KONFIG ----
 DEFAULT_COUNT = 30
+SCALE = float(os.getenv("SEED_SCALE", "1"))  # COUNTS ko'paytiruvchisi (benchmark'lar uchun katta hajm)
 COUNTS = {
     "users": 8,
     "regions": 8,
@@ -30,7 +529,6 @@ COUNTS = {
     "suppliers": 6,
     "products": 80,
     "dealers": 40,
-    "fx_rates": 420,          # ~14 oy
     "orders": 140,
     "order_items": 900,       # orderlarga 1..7 tadan
     "payments": 200,
@@ -60,19 +558,21 @@ SELECT_FALLBACK = {
     "payments.method": ["cash", "card", "bank"],
     "products.type": ["pg", "po"],
     "users.role": ["admin", "accountant", "manager", "warehouseman", "owner"],
-    "stock_log.reason": ["sale", "adjust", "return", "initial"],
+    "stock_log.reason": ["purchase", "return_in", "order_pack", "order_cancel", "defect_in", "defect_out", "import"],
 }
 
-fake = Faker()
+_fake = None
 
-# --------- UTIL ---------
-def load_schema(path):
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    if isinstance(data, dict) and "collections" in data:
-        return data["collections"]
-    return data
+def faker():
+    """Faker faqat lug'at tuziladigan paytda kerak (SEED_VOCAB keshi bo'lsa — umuman yo'q)."""
+    global _fake
+    if _fake is None:
+        from faker import Faker
+        _fake = Faker()
+        Faker.seed(RNG_SEED)
+    return _fake
 
+# --------- UTIL ---------
 def map_collections(colls):
     name_to = {c["name"]: c for c in colls}
     id_to_name = {}
@@ -84,552 +584,1902 @@ def map_collections(colls):
 def build_field_list(coll):
     return coll.get("fields", coll.get("schema", []))
 
-def topo_order(colls):
+def relation_target(f):
+    """Relation field'ning target kolleksiyasi (id yoki nom).
+    PB v0.23+ da collectionId field'ning o'zida turadi, eski sxemalarda options ichida."""
+    opts = f.get("options", {}) or {}
+    return f.get("collectionId") or opts.get("collection") or opts.get("collectionId")
+
+def topo_levels(colls):
+    """Relation graph'ini darajalarga bo'ladi: bitta darajadagi kolleksiyalar bir-biriga bog'liq emas,
+    faqat oldingi darajalarga. Sikl'dagi kolleksiyalar oxirida bittadan (ketma-ket) qo'shiladi."""
     name_to, id_to_name = map_collections(colls)
-    deps = defaultdict(set)
+    deps = defaultdict(set)        # kolleksiya -> u bog'liq bo'lgan targetlar
+    dependents = defaultdict(set)  # teskari indeks: target -> unga bog'liq kolleksiyalar
     for c in colls:
         for f in build_field_list(c):
             if f.get("type") == "relation":
-                opts = f.get("options", {}) or {}
-                target = opts.get("collection") or opts.get("collectionId")
+                target = relation_target(f)
                 if target:
                     tgt = id_to_name.get(target, target)
                     if tgt in name_to and tgt != c["name"]:
                         deps[c["name"]].add(tgt)
-    indeg = {c["name"]: 0 for c in colls}
-    for k, vs in deps.items():
-        for v in vs:
-            indeg[k] += 1
-    q = deque([n for n, d in indeg.items() if d == 0])
-    order = []
-    while q:
-        u = q.popleft()
-        order.append(u)
-        for k in list(deps.keys()):
-            if u in deps[k]:
-                deps[k].remove(u)
+                        dependents[tgt].add(c["name"])
+    pos = {c["name"]: i for i, c in enumerate(colls)}
+    indeg = {c["name"]: len(deps[c["name"]]) for c in colls}
+    level = [n for n, d in indeg.items() if d == 0]
+    levels, seen = [], set()
+    while level:
+        levels.append(level)
+        seen.update(level)
+        nxt = []
+        for u in level:
+            for k in dependents[u]:
                 indeg[k] -= 1
                 if indeg[k] == 0:
-                    q.append(k)
-    remain = [n for n in indeg if n not in order]
-    return order + remain
-
-def get_select_values_from_schema(name_to: dict, coll_name: str, field_name: str):
-    """Schema'dan select options.values ni o‘qib beradi."""
-    coll = name_to.get(coll_name)
-    if not coll:
-        return []
-    for f in build_field_list(coll):
-        if f.get("name") == field_name and (f.get("type") or f.get("@type")) == "select":
-            opts = f.get("options") or {}
-            vals = opts.get("values") or []
-            return list(vals)
-    return []
+                    nxt.append(k)
+        level = sorted(nxt, key=pos.get)
+    levels.extend([n] for n in indeg if n not in seen)
+    return levels
+
+def field_opt(f, key, default=None):
+    """Field sozlamasi: PB v0.23+ da field'ning o'zida, eski sxemalarda options ichida."""
+    if f.get(key) is not None:
+        return f[key]
+    return (f.get("options", {}) or {}).get(key, default)
+
+def unique_fields(coll):
+    """Kolleksiyaning bitta ustunli UNIQUE indekslari -> field nomlari to'plami."""
+    out = set()
+    for sql in coll.get("indexes") or []:
+        m = re.search(r"CREATE\s+UNIQUE\s+INDEX.*?\((.*?)\)", sql, re.I | re.S)
+        cols = [c.strip(" `\"") for c in m.group(1).split(",")] if m else []
+        if len(cols) == 1:
+            out.add(cols[0])
+    return out
+
+def select_values(cname, f):
+    """Schema'dan select values ni o‘qib beradi (bo'lmasa SELECT_FALLBACK)."""
+    return list(field_opt(f, "values") or SELECT_FALLBACK.get(f"{cname}.{f['name']}", []))
 
 def pb_post(coll, data):
-    r = session.post(f"{PB_BASE}/api/collections/{coll}/records", json=data, timeout=60)
+    r = pb_call("POST", f"{PB_BASE}/api/collections/{coll}/records", coll, "POST", json=data, timeout=60)
     if r.status_code != 200:
         raise RuntimeError(f"[POST {coll}] {r.status_code} {r.text}")
-    return r.json()
+    return rjson(r)
 
 def pb_patch(coll, rec_id, data):
-    r = session.patch(f"{PB_BASE}/api/collections/{coll}/records/{rec_id}", json=data, timeout=60)
+    r = pb_call("PATCH", f"{PB_BASE}/api/collections/{coll}/records/{rec_id}", coll, "PATCH", json=data, timeout=60)
     if r.status_code != 200:
         print(f"[WARN PATCH {coll}/{rec_id}] {r.status_code} {r.text}")
+        return None
+    return rjson(r)
 
-def pb_list_ids(coll, limit=5000, fields="id"):
-    try:
-        r = session.get(f"{PB_BASE}/api/collections/{coll}/records?page=1&perPage={limit}&fields={fields}", timeout=60)
+def iter_ids(coll, per_page=1000):
+    """Kolleksiyaning barcha id'larini sahifalab (generator) o'qiydi."""
+    return (it["id"] for it in iter_records(coll, "id", per_page))
+
+def iter_records(coll, fields="id", per_page=1000, where=""):
+    """Kolleksiya yozuvlarini (faqat fields, where filtri bo'yicha) sahifalab o'qiydi.
+    Keyset pagination (id > oxirgi, sort=id) va skipTotal — COUNT(*) ham, katta OFFSET ham yo'q.
+    Kursor uchun id har doim so'raladi. Xatolar yutilmaydi: status != 200 bo'lsa RuntimeError."""
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    fields = ",".join(names if "id" in names else ["id"] + names)
+    last = ""
+    while True:
+        params = {"perPage": per_page, "fields": fields, "skipTotal": 1, "sort": "id"}
+        cond = [f"({where})"] if where else []
+        if last:
+            cond.append(f'id > "{last}"')
+        if cond:
+            params["filter"] = " && ".join(cond)
+        r = pb_call("GET", f"{PB_BASE}/api/collections/{coll}/records", coll, "GET", params=params, timeout=60)
         if r.status_code != 200:
-            return []
-        items = r.json().get("items", [])
-        return [it["id"] for it in items]
-    except Exception:
-        return []
+            raise RuntimeError(f"[GET {coll}] {r.status_code} {r.text}")
+        data = rjson(r)
+        items = data.get("items", [])
+        yield from items
+        # server perPage'ni o'z maksimumiga qisqartirishi mumkin — javobdagisiga qaraymiz
+        if not items or len(items) < (data.get("perPage") or per_page):
+            return
+        last = items[-1]["id"]
+
+def pb_count(coll):
+    """Yozuvlar soni: bitta perPage=1 so'rov, totalItems (server COUNT(*) qiladi, id'lar yuklanmaydi)."""
+    params = {"perPage": 1, "fields": "id"}
+    r = pb_call("GET", f"{PB_BASE}/api/collections/{coll}/records", coll, "COUNT", limiter=_count_limiter,
+                params=params, timeout=60)
+    if r.status_code != 200:
+        raise RuntimeError(f"[GET {coll}] {r.status_code} {r.text}")
+    return rjson(r).get("totalItems", 0)
+
+def pb_counts(colls):
+    """Kolleksiyalar sonlari (coll, son, xato) — yozish concurrency'sidan mustaqil COUNT_CONCURRENCY ta parallel."""
+    return pb_map(pb_count, colls, limit=COUNT_CONCURRENCY)
+
+class IdList(Sequence):
+    """Id'larning ixcham ro'yxati: PB id'lari (15 ta ASCII belgi) bitta bytearray'da yonma-yon
+    saqlanadi — har biri 15 bayt (str obyekti + ko'rsatkich ~70 bayt o'rniga). Indeks bo'yicha O(1),
+    shuning uchun tasodifiy tanlash ham O(1). Boshqa uzunlikdagi id uchrasa oddiy list'ga o'tadi."""
+    WIDTH = 15
+
+    def __init__(self, ids=()):
+        self._buf = bytearray()
+        self._list = None
+        self.extend(ids)
+
+    def append(self, rid):
+        if self._list is None and len(rid) == self.WIDTH and rid.isascii():
+            self._buf += rid.encode()
+        else:
+            self._to_list().append(rid)
+
+    def extend(self, ids):
+        for rid in ids:
+            self.append(rid)
+
+    def _to_list(self):
+        if self._list is None:
+            self._list = list(self)
+            self._buf = bytearray()
+        return self._list
+
+    def __len__(self):
+        return len(self._list) if self._list is not None else len(self._buf) // self.WIDTH
+
+    def __getitem__(self, i):
+        if self._list is not None:
+            return self._list[i]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return self._buf[i * self.WIDTH:(i + 1) * self.WIDTH].decode()
+
+    def __iter__(self):
+        if self._list is not None:
+            return iter(self._list)
+        buf, w = self._buf, self.WIDTH
+        return (buf[i:i + w].decode() for i in range(0, len(buf) - len(buf) % w, w))
+
+class IdPools:
+    """Relation pool'lar uchun yagona kesh. Har bir kolleksiya serverdan faqat bir marta
+    (to'liq, sahifalab) o'qiladi; keyin yangi yaratilgan id'lar create javoblaridan qo'shiladi.
+    Resume'da (listing=False) pool'lar jurnaldan to'ldiriladi, server list qilinmaydi. Yozish natijasi
+    noma'lum qolsa invalidate(coll) — faqat shu kolleksiya keyingi get()'da serverdan qayta o'qiladi."""
+
+    def __init__(self, listing=True, offline=False):
+        self._listing = listing  # resume/offline: pool'lar bo'sh boshlanadi, add() bilan to'ldiriladi
+        self._offline = offline  # SEED_OUT: server yo'q — invalidate() ham o'qitmaydi
+        self._relist = set()
+        self._ids = {}
+        self._locks = defaultdict(threading.Lock)
+        self._guard = threading.Lock()
+
+    def get(self, coll):
+        ids = self._ids.get(coll)
+        if ids is not None:
+            return ids
+        with self._guard:
+            lock = self._locks[coll]
+        with lock:
+            if coll not in self._ids and not self._lists(coll):
+                self._ids[coll] = IdList()
+            if coll not in self._ids:
+                try:
+                    self._ids[coll] = IdList(iter_ids(coll))
+                except RuntimeError as e:
+                    # list qoidasi yopiq (403) yoki kolleksiya yo'q — pool bo'sh hisoblanadi
+                    print(f"[WARN POOL {coll}] {e}")
+                    self._ids[coll] = IdList()
+            return self._ids[coll]
+
+    def _lists(self, coll):
+        return self._listing or coll in self._relist
+
+    def add(self, coll, ids):
+        # hali o'qilmagan bo'lsa qo'shmaymiz — keyingi get() ularni serverdan baribir oladi
+        if coll in self._ids or not self._lists(coll):
+            self._ids.setdefault(coll, IdList()).extend(ids)
+
+    def invalidate(self, coll=None):
+        if self._offline:
+            return
+        colls = list(self._ids) if coll is None else [coll]
+        self._relist.update(colls)
+        for c in colls:
+            self._ids.pop(c, None)
+
+def pb_batch(coll, reqs):
+    """PocketBase /api/batch — bitta tranzaksiya. (bodies, None) yoki (None, {idx: xabar}) qaytaradi.
+    Bitta so'rov yiqilsa butun chunk rollback bo'ladi; PB birinchi yiqilganini ko'rsatadi."""
+    r = pb_call("POST", f"{PB_BASE}/api/batch", coll, "BATCH", items=len(reqs), json={"requests": reqs}, timeout=120)
+    if r.status_code == 200:
+        return [it.get("body") for it in rjson(r)], None
+    failed = {}
+    try:
+        per_req = (r.json().get("data") or {}).get("requests") or {}
+    except ValueError:
+        per_req = {}
+    for k, v in per_req.items():
+        if not k.isdigit():
+            continue
+        resp = (v or {}).get("response") or {}
+        body = resp.get("body", resp)
+        status = resp.get("status", r.status_code)
+        failed[int(k)] = f"[{reqs[int(k)]['method']} {reqs[int(k)]['url']}] {status} {json.dumps(body, ensure_ascii=False)}"
+    if not failed:
+        raise RuntimeError(f"[BATCH] {r.status_code} {r.text}")
+    return None, failed
+
+def chunked(items, n):
+    buf = []
+    for it in items:
+        buf.append(it)
+        if len(buf) >= n:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+def write_one(coll, rid, body, fix=None):
+    """Bitta yozuvni yaratadi (rid None) yoki PATCH qiladi; fix(body, xabar) bo'lsa bir marta tuzatib qayta urinadi.
+    Superuser-only 403 va natijasi noma'lum xato (5xx — server yozgan bo'lishi mumkin) tuzatilmaydi."""
+    if rid is not None:
+        return pb_patch(coll, rid, body)
+    try:
+        return pb_post(coll, body)
+    except RuntimeError as e:
+        if fix is None or is_superuser_only(e) or outcome_unknown(e):
+            raise
+        fix(body, str(e))
+        return pb_post(coll, body)
+
+def write_chunk(coll, pairs, fix=None):
+    """(rid|None, body) juftliklarini bitta /api/batch bilan yozadi; [(natija, xato), ...] qaytaradi.
+    Yiqilgan item'lar alohida xabar qilinadi va faqat ular fix bilan tuzatiladi (bir marta);
+    rollback bo'lgan qolganlari keyingi batch'da qayta yuboriladi."""
+    out = [(None, None)] * len(pairs)
+    if _batch_off.is_set():
+        for i, (rid, body) in enumerate(pairs):
+            try:
+                out[i] = (write_one(coll, rid, body, fix), None)
+            except Exception as e:
+                out[i] = (None, e)
+        return out
+
+    retried = set()
+    pending = list(range(len(pairs)))
+    while pending:
+        reqs = []
+        for i in pending:
+            rid, body = pairs[i]
+            if rid is None:
+                reqs.append({"method": "POST", "url": f"/api/collections/{coll}/records", "body": body})
+            else:
+                reqs.append({"method": "PATCH", "url": f"/api/collections/{coll}/records/{rid}", "body": body})
+        try:
+            bodies, failed = pb_batch(coll, reqs)
+        except RuntimeError as e:
+            if "403" in str(e) and not is_superuser_only(e):
+                # batch server sozlamalarida o'chirilgan — oddiy so'rovlarga o'tamiz
+                if not _batch_off.is_set():
+                    print(f"[WARN BATCH] /api/batch ruxsat etilmagan, alohida so'rovlarga o'tildi: {e}")
+                _batch_off.set()
+                return write_chunk(coll, pairs, fix)
+            raise
+        if failed is None:
+            for i, b in zip(pending, bodies):
+                out[i] = (b, None)
+            break
+        keep = []
+        for k, i in enumerate(pending):
+            msg = failed.get(k)
+            if msg is None:
+                keep.append(i)
+                continue
+            err = RuntimeError(msg)
+            if fix is not None and i not in retried and not is_superuser_only(err):
+                retried.add(i)
+                fix(pairs[i][1], msg)
+                keep.append(i)
+            else:
+                print(f"[WARN BATCH {coll}] item #{i}: {msg}")
+                out[i] = (None, err)
+        pending = keep
+    return out
+
+def write_stream(coll, items, body=lambda it: it, rid=lambda it: None, fix=None):
+    """items'ni yozadi va (item, natija, xato) ni kirish tartibida qaytaradi.
+    BATCH_SIZE > 1 bo'lsa chunk'lar /api/batch orqali, aks holda har bir yozuv alohida ketadi.
+    Offline rejimda (SEED_OUT) hammasi NDJSON sink'ka yoziladi. Muvaffaqiyatlilari jurnalga tushadi;
+    jurnal yoqilgan bo'lsa create'lar mijoz id'si bilan ketadi — natijasi noma'lum create ham
+    (U qatori) resume'da id bo'yicha topiladi. Noma'lum natijada kolleksiya pool'i invalidate qilinadi."""
+    if sink is not None:
+        yield from sink.write(coll, items, body, rid)
+        return
+    if journal is not None:
+        items = with_client_ids(items, body, rid)
+    for it, r, e in _write_results(coll, items, body, rid, fix):
+        if e is not None and outcome_unknown(e):
+            if pools is not None:
+                pools.invalidate(coll)
+            if journal is not None and rid(it) is None:
+                journal.unknown(coll, body(it))
+        elif journal is not None and r is not None:
+            journal.record(coll, rid(it), r)
+        yield it, r, e
+
+def with_client_ids(items, body, rid):
+    for it in items:
+        if rid(it) is None:
+            body(it).setdefault("id", new_id())
+        yield it
+
+def _write_results(coll, items, body, rid, fix):
+    if BATCH_SIZE <= 1:
+        yield from pb_map(lambda it: write_one(coll, rid(it), body(it), fix), items)
+        return
+    pairs_of = lambda ch: [(rid(it), body(it)) for it in ch]
+    for chunk, res, err in pb_map(lambda ch: write_chunk(coll, pairs_of(ch), fix), chunked(items, BATCH_SIZE)):
+        if err is not None:
+            res = [(None, err)] * len(chunk)
+        for it, (r, e) in zip(chunk, res):
+            yield it, r, e
+
+# Jurnalda create yozuvi bilan birga saqlanadigan "ota" field va uning kolleksiyasi — resume'da itemlar
+# faqat hali itemi yo'q parent'larga taqsimlanadi (free_parents)
+JOURNAL_PARENT = {"order_items": ("order", "orders"), "return_entry_items": ("entry", "return_entries"),
+                  "stock_entry_items": ("entry", "stock_entries")}
+
+@dataclass
+class JournalState:
+    created: dict = field(default_factory=lambda: defaultdict(IdList))     # coll -> [id]
+    created_in: dict = field(default_factory=lambda: defaultdict(IdList))  # (bosqich, coll) -> [id]
+    patched: dict = field(default_factory=lambda: defaultdict(set))      # (bosqich, coll) -> {id}
+    parents: dict = field(default_factory=lambda: defaultdict(set))      # coll -> {parent id}
+    unknown: dict = field(default_factory=lambda: defaultdict(dict))     # coll -> {id: (bosqich, parent)}
+    done: set = field(default_factory=set)                               # tugagan bosqichlar
+
+class Journal:
+    """Seed jurnali (append-only, TSV) — har bir yaratilgan/patch qilingan id bosqichi bilan:
+      C <bosqich> <kolleksiya> <id> [<parent>]   create
+      U <bosqich> <kolleksiya> <id> [<parent>]   create yuborilgan, natijasi noma'lum (javob yo'qolgan)
+      P <bosqich> <kolleksiya> <id>              patch
+      D <bosqich>                                bosqich to'liq tugadi
+    Har bir qator darhol flush qilinadi (jarayon yiqilsa ham OS'da qoladi), bosqich chegarasida fsync."""
+
+    def __init__(self, path):
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.phase = ""
+
+    def record(self, coll, rid, res):
+        if rid is None:
+            parent = res.get(JOURNAL_PARENT.get(coll, ("",))[0]) or ""
+            line = f"C\t{self.phase}\t{coll}\t{res['id']}\t{parent}\n"
+        else:
+            line = f"P\t{self.phase}\t{coll}\t{rid}\n"
+        self._write(line)
+
+    def unknown(self, coll, body):
+        parent = body.get(JOURNAL_PARENT.get(coll, ("",))[0]) or ""
+        self._write(f"U\t{self.phase}\t{coll}\t{body['id']}\t{parent}\n")
+
+    def recovered(self, phase, coll, rid, parent):
+        """Resume'da serverda topilgan U yozuvi — endi oddiy create (keyingi resume ham biladi)."""
+        self._write(f"C\t{phase}\t{coll}\t{rid}\t{parent}\n")
+
+    def _write(self, line):
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+
+    def begin(self, phase):
+        """Oldingi bosqichni tugagan deb belgilaydi va yangisini boshlaydi."""
+        with self._lock:
+            if self.phase:
+                self._f.write(f"D\t{self.phase}\n")
+            self.phase = phase
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self):
+        self.begin("")
+        self._f.close()
+
+    @staticmethod
+    def load(path):
+        st = JournalState()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # yozilayotganda uzilgan oxirgi qator
+                parts = line.rstrip("\n").split("\t")
+                if parts[0] == "C" and len(parts) == 5:
+                    _, phase, coll, rid, parent = parts
+                    st.created[coll].append(rid)
+                    st.created_in[(phase, coll)].append(rid)
+                    if parent:
+                        st.parents[coll].add(parent)
+                elif parts[0] == "U" and len(parts) == 5:
+                    st.unknown[parts[2]][parts[3]] = (parts[1], parts[4])
+                elif parts[0] == "P" and len(parts) == 4:
+                    st.patched[(parts[1], parts[2])].add(parts[3])
+                elif parts[0] == "D" and len(parts) == 2:
+                    st.done.add(parts[1])
+        for coll, ids in st.unknown.items():
+            for rid in set(st.created[coll]) & set(ids):
+                del ids[rid]  # oldingi resume'da topilgan
+        return st
+
+    def recover(self, st):
+        """U yozuvlari: faqat shu id'lar serverdan so'raladi; topilganlari yaratilgan deb hisoblanadi
+        (sonlar, parent'lar, pool'lar) va jurnalga C qatori bo'lib yoziladi."""
+        for coll, want in st.unknown.items():
+            found = []
+            for chunk in chunked(list(want), 50):
+                where = " || ".join(f'id = "{rid}"' for rid in chunk)
+                found += [r["id"] for r in iter_records(coll, "id", where=where)]
+            for rid in found:
+                phase, parent = want.pop(rid)
+                st.created[coll].append(rid)
+                st.created_in[(phase, coll)].append(rid)
+                if parent:
+                    st.parents[coll].add(parent)
+                self.recovered(phase, coll, rid, parent)
+            if found or want:
+                print(f"Resume: {coll} — javobi yo'qolgan create'lardan {len(found)} tasi serverda bor, "
+                      f"{len(want)} tasi yo'q")
+
+ID_ALPHABET = string.ascii_lowercase + string.digits
+
+def new_id():
+    """PocketBase formatidagi id: 15 ta [a-z0-9]."""
+    return "".join(rnd.choices(ID_ALPHABET, k=15))
+
+class NdjsonSink:
+    """Offline rejim: yozuvlar serverga emas, kolleksiya bo'yicha NDJSON fayllarga oqim bilan yoziladi
+    (<coll>.ndjson — create, <coll>.patch.ndjson — patch). Xotirada faqat id'lar qoladi.
+    manifest.json yozish tartibini segmentlar ko'rinishida saqlaydi — replay aynan shu tartibda yuklaydi.
+    out_dir bo'sh (--dry-run) bo'lsa hech narsa yozilmaydi — faqat generatsiya va sanash."""
+
+    def __init__(self, out_dir):
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        self.dir = out_dir
+        self.segments = []
+        self.counts = defaultdict(int)
+        self._files = {}
+        self._lines = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def write(self, coll, items, body, rid):
+        seg = None
+        for it in items:
+            rec, r = body(it), rid(it)
+            if r is None:
+                op, name = "create", f"{coll}.ndjson"
+                r = rec.setdefault("id", new_id())
+            else:
+                op, name = "patch", f"{coll}.patch.ndjson"
+                rec = {"id": r, **rec}
+            if not self.dir:
+                if op == "create":
+                    with self._lock:
+                        self.counts[coll] += 1
+                yield it, {"id": r}, None
+                continue
+            line = json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+            with self._lock:
+                if seg is None or seg["file"] != name:
+                    seg = {"coll": coll, "op": op, "file": name, "start": self._lines[name], "count": 0}
+                    self.segments.append(seg)
+                f = self._files.get(name)
+                if f is None:
+                    f = self._files[name] = open(os.path.join(self.dir, name), "w", encoding="utf-8")
+                f.write(line)
+                self._lines[name] += 1
+                seg["count"] += 1
+                if op == "create":
+                    self.counts[coll] += 1
+            yield it, {"id": r}, None
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        if not self.dir:
+            return
+        manifest = {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "schema": SCHEMA,
+            "counts": dict(self.counts),
+            "segments": self.segments,
+        }
+        with open(os.path.join(self.dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+def replay_ndjson(src_dir):
+    """SEED_OUT bilan yozilgan fayllarni serverga yuklaydi (id'lar saqlanadi).
+    Segmentlar manifest tartibida ketadi; har bir segment ichida parallel/batch yo'li ishlaydi.
+    (yuklangan, jami) yozuvlar sonini qaytaradi."""
+    with open(os.path.join(src_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    handles = {}
+
+    def lines(name, n):
+        fh = handles.get(name)
+        if fh is None:
+            fh = handles[name] = open(os.path.join(src_dir, name), encoding="utf-8")
+        for _ in range(n):
+            yield json.loads(fh.readline())
+
+    strip_id = lambda it: {k: v for k, v in it.items() if k != "id"}
+    done = total = 0
+    try:
+        for seg in manifest["segments"]:
+            coll, items = seg["coll"], lines(seg["file"], seg["count"])
+            if seg["op"] == "create":
+                stream = write_stream(coll, items)
+            else:
+                stream = write_stream(coll, items, body=strip_id, rid=lambda it: it["id"])
+            with span(f"replay {seg['op']} {coll}", "collection", count=seg["count"]):
+                ok = sum(1 for _, res, err in stream if err is None and res is not None)
+            print(f"  {seg['op']:6} {coll}: {ok}/{seg['count']}")
+            done, total = done + ok, total + seg["count"]
+    finally:
+        for fh in handles.values():
+            fh.close()
+    return done, total
+
+def pb_map(fn, items, limit=None):
+    """fn(item) ni CONCURRENCY tagacha parallel bajaradi.
+    Natijalar kirish tartibida (item, natija, xato) ko'rinishida qaytadi; items generator bo'lsa
+    yozuvlar asosiy oqimda, so'rovlar ketishi bilan birga yasaladi (xotira chegaralangan)."""
+    limit = limit or CONCURRENCY
+    if limit <= 1:
+        for it in items:
+            try:
+                yield it, fn(it), None
+            except Exception as e:
+                yield it, None, e
+        return
+
+    def done(pair):
+        it, fut = pair
+        try:
+            return it, fut.result(), None
+        except Exception as e:
+            return it, None, e
+
+    ex = ThreadPoolExecutor(max_workers=limit)
+    window = deque()
+    try:
+        for it in items:
+            window.append((it, ex.submit(fn, it)))
+            if len(window) >= limit * 2:
+                yield done(window.popleft())
+        while window:
+            yield done(window.popleft())
+    finally:
+        # iste'molchi erta to'xtasa (masalan 403) — navbatdagilarni bekor qilamiz
+        for _, fut in window:
+            fut.cancel()
+        ex.shutdown(wait=True)
+
+def is_superuser_only(err):
+    msg = str(err)
+    return "403" in msg and ("Only superusers" in msg or "forbidden" in msg.lower())
 
 def ensure_min_pool(coll_name, n=5):
-    pool = pb_list_ids(coll_name)
+    pool = pools.get(coll_name)
     if len(pool) >= n:
         return pool
     # oddiy placeholderlarga urinish (rule/required bo’lsa tushmasligi mumkin)
-    for _ in range(max(0, n - len(pool))):
-        try:
-            pb_post(coll_name, {})
-        except Exception:
-            pass
-    return pb_list_ids(coll_name)
+    post_all(coll_name, ({} for _ in range(n - len(pool))))
+    return pools.get(coll_name)
+
+# ---- USTUNLI GENERATSIYA ----
+# Qiymatlar yozuvma-yozuv emas, butun ustun bo'yicha hosil qilinadi: har bir ustun generatori
+# n -> list. numpy bo'lsa vektorlashtirilgan, bo'lmasa oddiy random bilan (natija formati bir xil).
+np = LazyModule("numpy") if find_spec("numpy") else None
+
+GEN_BLOCK = 10000  # rows() bir martada shuncha yozuvni ustunlardan yig'adi
+_RNG_BITS = rnd.getrandbits(64)  # numpy generatori urug'i — rnd oqimidagi o'rni o'zgarmasin
+_rng = None
+
+def np_rng():
+    global _rng
+    if _rng is None:
+        _rng = np.random.default_rng(_RNG_BITS)
+    return _rng
 
-def pick_select(cname, fname, field_def):
-    vals = field_def.get("values") or field_def.get("options", {}).get("values") or []
+def months_ago(dt, months):
+    """dt'dan months oy oldin (oy oxiri kesiladi: 31-avgust - 6 oy = 28/29-fevral)."""
+    y, m = divmod(dt.year * 12 + dt.month - 1 - months, 12)
+    m += 1
+    last = (date(y + m // 12, m % 12 + 1, 1) - timedelta(days=1)).day
+    return dt.replace(year=y, month=m, day=min(dt.day, last))
+
+_NOW_18M = months_ago(datetime.now().replace(microsecond=0), 18)
+DATES_18M = [(_NOW_18M + timedelta(days=i)).date().isoformat() for i in range(541)]
+
+def c_uniform(lo, hi, nd=2):
+    if np is not None:
+        return lambda n: np.round(np_rng().uniform(lo, hi, n), nd).tolist()
+    return lambda n: [round(rnd.uniform(lo, hi), nd) for _ in range(n)]
+
+def c_int(lo, hi):
+    """[lo, hi] oralig'idagi butun sonlar (ikkala chegara ham kiradi)."""
+    if np is not None:
+        return lambda n: np_rng().integers(lo, hi + 1, n).tolist()
+    return lambda n: [rnd.randint(lo, hi) for _ in range(n)]
+
+def c_choice(vals):
+    vals = vals if isinstance(vals, IdList) else list(vals)
     if not vals:
-        vals = SELECT_FALLBACK.get(f"{cname}.{fname}", [])
-    return random.choice(vals) if vals else None
+        return lambda n: [None] * n
+    if np is not None:
+        return lambda n: [vals[i] for i in np_rng().integers(0, len(vals), n).tolist()]
+    return lambda n: rnd.choices(vals, k=n)
+
+def c_bool():
+    if np is not None:
+        return lambda n: (np_rng().integers(0, 2, n) == 1).tolist()
+    return lambda n: [bool(rnd.getrandbits(1)) for _ in range(n)]
 
-def rand_date_18m():
-    start = datetime.now() - relativedelta(months=18)
-    dt = start + timedelta(days=random.randint(0, 540))
-    return dt.date().isoformat()
+def c_date_18m():
+    """Oxirgi 18 oy ichidagi sana (YYYY-MM-DD) — tayyor jadvaldan tanlanadi."""
+    return c_choice(DATES_18M)
 
-def rand_dt_18m():
-    start = datetime.now() - relativedelta(months=18)
-    dt = start + timedelta(days=random.randint(0, 540), seconds=random.randint(0, 86400))
-    return dt.isoformat(timespec="seconds")
+def c_dt_18m():
+    """Oxirgi 18 oy ichidagi sana-vaqt (YYYY-MM-DDTHH:MM:SS)."""
+    if np is not None:
+        return lambda n: np.datetime_as_string(np.datetime64(_NOW_18M, "s") + np_rng().integers(
+            0, 541 * 86400, n).astype("timedelta64[s]"), unit="s").tolist()
+    return lambda n: [(_NOW_18M + timedelta(seconds=rnd.randint(0, 541 * 86400 - 1))).isoformat()
+                      for _ in range(n)]
+
+def c_scale(base, lo, hi, nd=2):
+    """Hosila ustun: base[i] * U(lo, hi) (masalan cost = price * U(0.5, 0.9))."""
+    if np is not None:
+        return np.round(np.asarray(base, dtype=float) * np_rng().uniform(lo, hi, len(base)), nd).tolist()
+    return [round(b * rnd.uniform(lo, hi), nd) for b in base]
+
+def c_fmt(fmt, col):
+    return lambda n: [fmt.format(v) for v in col(n)]
+
+def c_maybe(col, p=0.08):
+    """Optional field: ~p ulushi None bo'ladi."""
+    if np is not None:
+        return lambda n: [None if m else v for v, m in zip(col(n), (np_rng().random(n) < p).tolist())]
+    return lambda n: [None if rnd.random() < p else v for v in col(n)]
+
+def rows(n, cols, block=GEN_BLOCK, label="", rels=()):
+    """cols: {field: ustun generatori yoki tayyor list}. Ustunlar blok-blok hosil qilinib,
+    yozuvlar (dict) ketma-ket qaytariladi — 1M+ yozuvda ham xotira blok hajmida qoladi.
+    Trace yoqilgan bo'lsa har bir ustun bloki span: "<label>.<field>" (rels'dagilar — "rel" turi)."""
+    keys = list(cols)
+    for off in range(0, n, block):
+        m = min(block, n - off)
+        if tracer is None:
+            mats = [c(m) if callable(c) else c[off:off + m] for c in cols.values()]
+        else:
+            mats = []
+            for k, c in cols.items():
+                with span(f"{label}.{k}", "rel" if k in rels else "gen", n=m):
+                    mats.append(c(m) if callable(c) else c[off:off + m])
+        for vals in zip(*mats):
+            yield dict(zip(keys, vals))
 
-def rand_fx_value():
-    return round(random.uniform(12500, 14000), 2)
+# ---- FX KURSLARI ----
+# usd_to_uzs — kunlik random-walk (log-o'sish: kichik drift + volatillik), bitta vektor o'tishda.
+# To'lovlar fx_rate'i va UZS narx snapshot'lari shu qatordan as-of qidiruv bilan olinadi — seed
+# ma'lumotlari balans/FX hisobotlari uchun o'zaro izchil bo'ladi.
+FX_START = 12500.0                # qator boshidagi kurs (serverda oldingi kurs bo'lmasa)
+FX_DRIFT, FX_VOL = 0.0003, 0.003  # kunlik log-o'sish o'rtachasi va standart og'ishi
+
+def fx_walk(n, start=FX_START):
+    """start'dan boshlanadigan n kunlik kurs qatori."""
+    if np is not None:
+        steps = np_rng().normal(FX_DRIFT, FX_VOL, n)
+        steps[:1] = 0
+        return np.round(start * np.exp(np.cumsum(steps)), 2).tolist()
+    out, x = [], math.log(start)
+    for i in range(n):
+        if i:
+            x += rnd.gauss(FX_DRIFT, FX_VOL)
+        out.append(round(math.exp(x), 2))
+    return out
+
+class FxSeries:
+    """Sanasi bo'yicha saralangan kurslar: asof(sana) — shu kun yoki undan oldingi eng yaqin kurs
+    (qator boshidan oldingi sanalar uchun birinchi kurs)."""
+
+    def __init__(self, rates):
+        self.dates = sorted(rates)
+        self.rates = [rates[d] for d in self.dates]
+
+    def asof(self, day):
+        return self.rates[max(bisect_right(self.dates, str(day)[:10]) - 1, 0)]
+
+    def today(self):
+        return self.asof(date.today().isoformat())
+
+# ---- MATN LUG'ATI ----
+# Faker har yozuv uchun chaqirilmaydi: har bir tur bo'yicha pool bir marta tayyorlanadi
+# (SEED_VOCAB berilsa diskka yoziladi/o'qiladi), ustunlar shu pool'lardan tanlaydi.
+# Unique qiymatlar fake.unique o'rniga hisoblagich bilan: "<so'z> <tag>-<n>".
+VOCAB_SIZE = 2000
+VOCAB_KINDS = {
+    "word": lambda: faker().word(),
+    "title": lambda: faker().sentence(nb_words=2).replace(".", ""),
+    "sentence4": lambda: faker().sentence(nb_words=4),
+    "sentence6": lambda: faker().sentence(nb_words=6),
+    "city": lambda: faker().city(),
+    "color": lambda: faker().color_name(),
+    "msisdn": lambda: faker().msisdn(),
+    "user": lambda: faker().user_name(),
+    "domain": lambda: faker().free_email_domain(),
+}
+_vocab = None
+_vocab_lock = threading.Lock()
+_seq = defaultdict(int)
+_seq_lock = threading.Lock()
+_seq_synced = set()          # serverdagi qiymatlardan keyinga surilgan hisoblagichlar
+_seq_sync_lock = threading.Lock()
+
+def vocab(kind):
+    global _vocab
+    with _vocab_lock:
+        if _vocab is None:
+            _vocab = load_vocab(VOCAB_FILE)
+    return _vocab[kind]
+
+def load_vocab(path):
+    data = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    missing = [k for k in VOCAB_KINDS if not data.get(k)]
+    for k in missing:
+        data[k] = list(dict.fromkeys(VOCAB_KINDS[k]() for _ in range(VOCAB_SIZE)))
+    if path and missing:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    return data
+
+def c_vocab(kind):
+    """Lug'at birinchi ustun hosil qilinganda yuklanadi — reja tuzish (compile_plan) uni talab qilmaydi."""
+    col = None
+
+    def gen(n):
+        nonlocal col
+        if col is None:
+            col = c_choice(vocab(kind))
+        return col(n)
+    return gen
+
+def next_seq(key, n):
+    """key bo'yicha n ta ketma-ket raqamni band qiladi (oqimlar orasida xavfsiz)."""
+    with _seq_lock:
+        start = _seq[key]
+        _seq[key] += n
+    return range(start + 1, start + n + 1)
+
+def uniq_suffix(i):
+    return f"{SEED_TAG}-{i}" if SEED_TAG else str(i)
+
+def sync_seq(coll, fname):
+    """coll.fname hisoblagichini serverdagi shu SEED_TAG'li eng katta suffix'dan keyinga suradi (bir marta).
+    Bir xil SEED_TAG bilan qayta seed'da hisoblagich 1 dan boshlanib mavjud yozuvlarga urilmasin."""
+    key = f"{coll}.{fname}"
+    with _seq_sync_lock:
+        if key in _seq_synced:
+            return
+        _seq_synced.add(key)
+        pat = re.compile((re.escape(f"{SEED_TAG}-") if SEED_TAG else r"[ .-]") + r"(\d+)(?:@|$)")
+        top = 0
+        try:
+            for r in iter_records(coll, f"id,{fname}"):
+                m = pat.search(str(r.get(fname) or ""))
+                if m:
+                    top = max(top, int(m.group(1)))
+        except RuntimeError as e:
+            print(f"[WARN {key}] mavjud qiymatlarni o'qib bo'lmadi: {e}")
+        with _seq_lock:
+            _seq[key] = max(_seq[key], top)
+
+def c_unique(col, key):
+    """col qiymatlariga hisoblagich suffix'i: "<qiymat> <tag>-<n>" — takrorlanmaydi."""
+    return lambda n: [f"{v} {uniq_suffix(i)}" for v, i in zip(col(n), next_seq(key, n))]
+
+def c_unique_email(key):
+    users, domains = c_vocab("user"), c_vocab("domain")
+    return lambda n: [f"{u}.{uniq_suffix(i)}@{d}" for u, d, i in zip(users(n), domains(n), next_seq(key, n))]
 
 def ensure_users_minimal(name_to):
     if "users" not in name_to:
         return []
     want_roles = SELECT_FALLBACK["users.role"]
-    created = []
-    for role in want_roles:
-        email = f"{role}@example.com"
-        body = {
-            "email": email,
-            "password": "Test1234!",
-            "passwordConfirm": "Test1234!",
-            "name": role.capitalize() + " User",
-            "role": role,
-            "emailVisibility": True,
-            "verified": True,
-            "is_active": True,
-        }
-        try:
-            rec = pb_post("users", body)
-            created.append(rec["id"])
-        except Exception:
-            pass
-    pool = pb_list_ids("users")
-    return pool or created
+    bodies = ({
+        "email": f"{role}@example.com",
+        "password": "Test1234!",
+        "passwordConfirm": "Test1234!",
+        "name": role.capitalize() + " User",
+        "role": role,
+        "emailVisibility": True,
+        "verified": True,
+        "is_active": True,
+    } for role in want_roles)
+    post_all("users", bodies)
+    return pools.get("users")
 
-def gen_by_type(cname, fdef):
+def field_col(cname, fdef, unique=False):
+    """Field uchun ustun generatori (n -> list) qaytaradi — tur/nom/required tekshiruvlari
+    bir marta shu yerda hal qilinadi. Har doim None beradigan field'lar uchun None qaytaradi.
+    unique=True (sxemada UNIQUE indeks) bo'lsa qiymatlar hisoblagich bilan takrorlanmas qilinadi."""
     fname = fdef["name"]
     ftype = fdef.get("type") or fdef.get("@type")
     req = fdef.get("required", False)
+    key = f"{cname}.{fname}"
 
-    def maybe(v):
-        return v if req or random.random() > 0.08 else None
+    def maybe(col):
+        return col if req else c_maybe(col)
 
     if ftype in ("text", "editor", "json"):
         ln = fname.lower()
         if "email" in ln:
-            return maybe(fake.unique.email())
+            return maybe(c_unique_email(key))
         if "name" in ln or "title" in ln:
-            return maybe(fake.sentence(nb_words=2).replace(".", ""))
+            col = c_vocab("title")
+            return maybe(c_unique(col, key) if unique else col)
         if "phone" in ln or "tel" in ln:
-            return maybe(fake.msisdn())
+            return maybe(c_vocab("msisdn"))
         if "human_id" in ln:
-            return maybe(f"ORD-{random.randint(100000,999999)}")
+            return maybe(c_fmt("ORD-{}", c_int(100000, 999999)))
         if "barcode" in ln:
-            return maybe(f"MD-{random.randint(10**9, 10**10-1)}")
+            if unique:
+                return maybe(lambda n: [f"MD-{uniq_suffix(i)}" for i in next_seq(key, n)])
+            return maybe(c_fmt("MD-{}", c_int(10**9, 10**10 - 1)))
         if "note" in ln or "reason" in ln:
-            return maybe(fake.sentence(nb_words=6))
-        return maybe(fake.word())
+            return maybe(c_vocab("sentence6"))
+        col = c_vocab("word")
+        return maybe(c_unique(col, key) if unique else col)
     if ftype == "number":
-        return round(random.uniform(1, 9999), 2)
+        return c_uniform(1, 9999)
     if ftype == "bool":
-        return bool(random.getrandbits(1))
+        return c_bool()
     if ftype in ("date",):
-        return rand_date_18m()
+        return c_date_18m()
     if ftype in ("datetime", "autodate"):
-        return rand_dt_18m()
+        return c_dt_18m()
     if ftype == "select":
-        return pick_select(cname, fname, fdef)
-    if ftype in ("file", "password", "relation", "email"):
-        if ftype == "email":
-            return maybe(fake.unique.email())
-        return None
+        vals = select_values(cname, fdef)
+        return c_choice(vals) if vals else None
+    if ftype == "email":
+        return maybe(c_unique_email(key))
     return None
 
-# --------- BOSHLAYMIZ ---------
-collections = load_schema(SCHEMA)
-name_to, id_to = map_collections(collections)
-order = topo_order(collections)
-print("Topologik tartib:", " -> ".join(order))
-
-generated = defaultdict(list)
-cached_ids = defaultdict(list)
-
-# orders.discount_type ni schema'dan o'qib olaylik (fallback: none/percent)
-ORDER_DISCOUNT_TYPES = get_select_values_from_schema(name_to, "orders", "discount_type")
-if not ORDER_DISCOUNT_TYPES:
-    ORDER_DISCOUNT_TYPES = list(SELECT_FALLBACK["orders.discount_type"])
-# Amount schema ruxsat bermasa, ro‘yxatdan olib tashlaymiz
-ORDER_DISCOUNT_TYPES = [v for v in ORDER_DISCOUNT_TYPES if v in ("none", "percent", "amount")]
-
-# 0) users minimal
-if "users" in name_to:
-    ensure_users_minimal(name_to)
-    cached_ids["users"] = pb_list_ids("users")
-
-# 1) FX rates (oldindan) — 14 oy, kunma-kun (re-run’da unique xatolarini yutamiz)
-if "fx_rates" in name_to and "fx_rates" not in SKIP_SEED:
-    print("Seeding fx_rates ...")
-    start = date.today() - relativedelta(months=14)
-    days = (date.today() - start).days
-    for i in range(days):
-        d = start + timedelta(days=i)
-        payload = {"date": d.isoformat(), "usd_to_uzs": rand_fx_value()}
+@dataclass
+class RelSpec:
+    name: str
+    target: str        # target kolleksiya nomi (id emas)
+    required: bool
+    min_select: int
+    max_select: int
+
+    def column(self, pool):
+        """CREATE uchun: required relation ustuni pool'dan."""
+        if self.max_select > 1:
+            k = min(max(1, self.min_select), len(pool))
+            return lambda n: [rnd.sample(pool, k) if k > 0 else [] for _ in range(n)]
+        return c_choice(pool)
+
+    def optional_column(self, pool):
+        """PATCH uchun: optional relation ustuni; bo'sh qolganlari None."""
+        if self.max_select > 1:
+            lo, hi = max(0, self.min_select), min(self.max_select, len(pool))
+            return lambda n: [rnd.sample(pool, k) or None for k in c_int(lo, hi)(n)]
+        return c_choice(pool)
+
+@dataclass
+class CollectionPlan:
+    """Kolleksiya uchun oldindan hisoblangan seed rejasi: hot loop faqat shuni bajaradi."""
+    name: str
+    cols: dict = field(default_factory=dict)           # field_name -> ustun generatori
+    required_rels: list = field(default_factory=list)  # [RelSpec]
+    optional_rels: list = field(default_factory=list)  # [RelSpec]
+    selects: dict = field(default_factory=dict)        # field_name -> values
+    required_selects: list = field(default_factory=list)
+    unique: set = field(default_factory=set)           # UNIQUE indeksli field'lar
+
+def compile_plan(colls):
+    """Sxemani bir marta kompilyatsiya qiladi: relation target'lari nomga o'giriladi,
+    min/maxSelect va select values jadvallari, field ustun generatorlari tayyorlanadi."""
+    name_to, id_to_name = map_collections(colls)
+    plans = {}
+    for c in colls:
+        cname = c["name"]
+        plan = CollectionPlan(cname, unique=unique_fields(c))
+        for f in build_field_list(c):
+            if f.get("primaryKey"):
+                continue
+            ftype = f.get("type") or f.get("@type")
+            if ftype == "relation":
+                target = relation_target(f)
+                tname = id_to_name.get(target, target)
+                if tname not in name_to:
+                    continue
+                spec = RelSpec(f["name"], tname, bool(f.get("required")),
+                               int(field_opt(f, "minSelect", 0) or 0), int(field_opt(f, "maxSelect", 1) or 1))
+                (plan.required_rels if spec.required else plan.optional_rels).append(spec)
+                continue
+            if ftype == "select":
+                plan.selects[f["name"]] = select_values(cname, f)
+                if f.get("required"):
+                    plan.required_selects.append(f["name"])
+            col = field_col(cname, f, f["name"] in plan.unique)
+            if col is not None:
+                plan.cols[f["name"]] = col
+        plans[cname] = plan
+    return plans
+
+def not_unique_fields(msg):
+    """Xato xabaridagi PB javobidan (data) validation_not_unique bo'lgan field'lar."""
+    try:
+        body = json.loads(msg[msg.index("{"):])
+    except ValueError:
+        return ["name"] if "validation_not_unique" in msg and "name" in msg else []
+    data = body.get("data") if isinstance(body, dict) else None
+    return [f for f, e in (data or {}).items() if isinstance(e, dict) and e.get("code") == "validation_not_unique"]
+
+def record_fixer(plan):
+    """CREATE xatosidan keyin yozuvni tuzatuvchi funksiya (unique/select xatolari uchun)."""
+    def fix(record, msg):
+        # required select/text fallback
+        for fname in plan.required_selects:
+            if not record.get(fname):
+                vals = plan.selects.get(fname)
+                record[fname] = rnd.choice(vals) if vals else "none"
+        # unique xatosi (name, email, barcode, ...): hisoblagich serverdagi qiymatlardan keyinga surilib,
+        # field yangi qiymat bilan qayta hosil qilinadi
+        for fname in not_unique_fields(msg):
+            if fname == "id":
+                continue
+            sync_seq(plan.name, fname)
+            col = plan.cols.get(fname) if fname in plan.unique else None
+            if col is not None:
+                record[fname] = col(1)[0]
+            else:
+                base = record.get(fname) or rnd.choice(vocab("word")).title()
+                record[fname] = f"{base} {uniq_suffix(next_seq(f'{plan.name}.{fname}', 1)[0])}"
+    return fix
+
+def plan_columns(plan):
+    """Reja ustunlari + REQUIRED relation'lar (pool'dan) — CREATE body'lari uchun."""
+    cols = dict(plan.cols)
+    for spec in plan.required_rels:
+        pool = pools.get(spec.target) or ensure_min_pool(spec.target, n=5)
+        cols[spec.name] = spec.column(pool)
+    return cols
+
+def post_all(coll, bodies):
+    """bodies'ni yaratadi (parallel/batch), xatolarni yutadi; yangi id'lar pool'ga qo'shiladi.
+    Muvaffaqiyatli yaratilganlar sonini qaytaradi."""
+    ids = [rec["id"] for _, rec, err in write_stream(coll, bodies) if err is None]
+    pools.add(coll, ids)
+    return len(ids)
+
+def free_parents(cname):
+    """Item kolleksiyasi uchun parent pool'i. Resume'da jurnal bo'yicha itemi bor parent'lar chiqariladi:
+    bitta order/hujjatning itemlari ikki ishga tushishga bo'linmaydi, mavjudlariga qo'shilmaydi."""
+    pool = pools.get(JOURNAL_PARENT[cname][1])
+    done = resumed.parents[cname] if resumed is not None else None
+    return IdList(p for p in pool if p not in done) if done else pool
+
+def c_per_parent(parents, per, count):
+    """Bola kolleksiya uchun parent ustuni: har bir parent'ga per=(lo, hi) tadan, count'ga yetguncha
+    (parent'lar tugasa boshidan aylanadi)."""
+    out = []
+    while parents and len(out) < count:
+        for p, k in zip(parents, c_int(*per)(len(parents))):
+            out.extend([p] * k)
+    return out[:count]
+
+def domain_columns(cname, count):
+    """Kolleksiyaga xos ustunlar (reja ustunlari ustiga yoziladi) va yozuvni yakunlovchi finish(record).
+    Yozuvlar CREATE paytida to'liq va izchil bo'ladi — keyin PATCH bilan tuzatish kerak emas.
+    Ustun nomi rejada (sxemada) bo'lmasa SystemExit; "_" bilan boshlanganlari — finish uchun oraliq."""
+    cols, finish = {}, None
+    if cname == "categories":
+        # maxsus nomlar: lug'atdan + hisoblagich (unique indeksga urilmaydi)
+        cols["name"] = c_unique(lambda n: [w.title() for w in c_vocab("word")(n)], "categories.name")
+    elif cname == "dealers":
+        cols["name"] = c_unique(c_fmt("{} Diller", c_vocab("city")), "dealers.name")
+        if "tin" in plans[cname].cols:
+            cols["tin"] = c_fmt("{}", c_int(100000000, 999999999))
+    elif cname == "products":
+        cols["name"] = c_unique(c_fmt("{} Door", c_vocab("color")), "products.name")
+        cols["is_active"] = [True] * count
+        price = c_uniform(50, 500)(count)
+        cols["price_usd"] = price
+        cols["cost_price_usd"] = c_scale(price, 0.5, 0.9)
+        if fx is not None:
+            rate = fx.today()
+            cols["price_uzs"] = [round(p * rate) for p in price]
+    elif cname == "orders":
+        cols.update(
+            status=c_choice(SELECT_FALLBACK["orders.status"]),
+            # discount_type — faqat schema ruxsat bergan qiymatlardan
+            discount_type=c_choice(ORDER_DISCOUNT_TYPES or ["none"]),
+            _percent=c_uniform(0, 10),
+            _amount=c_uniform(0, 50),
+        )
+        for fname, src in (("manager", "users"), ("dealer", "dealers"), ("region", "regions")):
+            if pools.get(src):
+                cols[fname] = c_choice(pools.get(src))
+
+        def finish_order(r):
+            pct, amt = r.pop("_percent"), r.pop("_amount")
+            dct = r["discount_type"]
+            r["discount_value"] = pct if dct == "percent" else amt if dct == "amount" else 0
+        finish = finish_order
+    elif cname == "order_items":
+        # har bir order'ga 1..7 ta item
+        cols.update(order=c_per_parent(free_parents(cname), (1, 7), count), product=c_choice(pools.get("products")),
+                    qty=c_uniform(1, 20), unit_price_usd=c_uniform(50, 500))
+        if fx is not None:
+            rate = fx.today()  # order'lar hozir yaratiladi — snapshot bugungi kurs bilan
+
+            def finish_item(r):
+                r["unit_price_uzs_snapshot"] = round(r["unit_price_usd"] * rate)
+            finish = finish_item
+    elif cname == "payments":
+        cols.update(
+            dealer=c_choice(pools.get("dealers")),
+            currency=c_choice(SELECT_FALLBACK["payments.currency"]),
+            method=c_choice(SELECT_FALLBACK["payments.method"]),
+            amount=c_uniform(50, 3000),
+            date=c_date_18m(),
+            fx_rate=c_uniform(12500, 14000),
+        )
+
+        def finish_payment(r):
+            if r["currency"] != "UZS":
+                del r["fx_rate"]
+            elif fx is not None:
+                r["fx_rate"] = fx.asof(r["date"])
+        finish = finish_payment
+    elif cname in ("return_entries", "stock_entries"):
+        cols.update(date=c_date_18m(), note=c_vocab("sentence4"))
+    elif cname == "return_entry_items":
+        cols.update(entry=c_per_parent(free_parents(cname), (1, 2), count),
+                    product=c_choice(pools.get("products")), qty=c_uniform(1, 5))
+    elif cname == "stock_entry_items":
+        cols.update(entry=c_per_parent(free_parents(cname), (1, 4), count),
+                    product=c_choice(pools.get("products")), qty=c_uniform(1, 20), price=c_uniform(10, 150))
+    elif cname == "stock_log":
+        cols.update(delta_ok=c_int(-10, 10), delta_defect=c_int(-2, 2),
+                    reason=c_choice(SELECT_FALLBACK["stock_log.reason"]), ts=c_dt_18m())
+    plan = plans.get(cname)
+    if plan is not None:
+        known = set(plan.cols) | {s.name for s in plan.required_rels + plan.optional_rels}
+        unknown = sorted(k for k in cols if k not in known and not (k.startswith("_") and finish))
+        if unknown:
+            raise SystemExit(f"domain_columns({cname}): sxemada yo'q field(lar): {', '.join(unknown)}")
+    # bo'sh pool'dan olingan ustunlar reja ustunini (required relation) bosib ketmasin
+    return {k: v for k, v in cols.items() if not (isinstance(v, list) and not v and count)}, finish
+
+# ---- YUKLAMA TESTI (SEED_LOAD) ----
+# Mavjud pool'lar ustida real biznes oqimlarini takrorlaydi: order -> 1..7 order_items -> status
+# o'tishlari, to'lovlar (USD/UZS), qaytarish va kirim hujjatlari. SEED_CONCURRENCY ta virtual
+# foydalanuvchi, SEED_LOAD_RATE oqim/s (0 = imkon qadar tez). Oxirida: daily_seq/human_id
+# takrorlari va order_items/kirim/qaytarish hook'lari bo'yicha products zaxirasi og'ishi (drift).
+LOAD_FLOWS = [("order", 0.6), ("payment", 0.25), ("return", 0.08), ("stock", 0.07)]
+LOAD_STATUS_PATHS = [["packed", "shipped"], ["edit_requested", "editable", "packed"], ["reserved"]]
+
+class Pacer:
+    """Umumiy tezlik: oqimlar 1/rate oraliqdagi slotlarga taqsimlanadi (open-loop)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class LoadLedger:
+    """Yuklama davomida yaratilganlar: order raqamlari va product bo'yicha kutilgan zaxira o'zgarishi."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.orders = []                                 # [(created, daily_seq, human_id)]
+        self.expected = defaultdict(lambda: [0.0, 0.0])  # product -> [ok, defect]
+
+    def order(self, rec):
+        with self._lock:
+            self.orders.append((str(rec.get("created", ""))[:10], rec.get("daily_seq"), rec.get("human_id")))
+
+    def stock(self, rec, sign):
+        qty = float(rec.get("qty") or 0)
+        if not rec.get("product") or qty <= 0:
+            return
+        with self._lock:
+            self.expected[rec["product"]][1 if rec.get("is_defect") else 0] += sign * qty
+
+def load_bodies(coll, **override):
+    """coll rejasidan cheksiz body oqimi (ustunlar blok-blok) — seed'dagi domen ustunlari va finish bilan,
+    ustiga override. Tayyor list ustunlar (count'ga bog'liq, masalan parent taqsimoti) oqimga olinmaydi."""
+    cols = plan_columns(plans[coll]) if coll in plans else {}
+    dcols, finish = domain_columns(coll, 0)
+    cols.update({k: v for k, v in dcols.items() if callable(v)})
+    cols.update(override)
+    for record in rows(1 << 62, cols, block=256):
+        if finish is not None:
+            finish(record)
+        yield record
+
+def run_load(seconds, rate):
+    dids, uids, rids = pools.get("dealers"), pools.get("users"), pools.get("regions")
+    pids, sids = pools.get("products"), pools.get("suppliers")
+    if not pids or not dids:
+        raise SystemExit("Yuklama testi uchun products va dealers bo'sh bo'lmasligi kerak — avval seed qiling.")
+    before = {r["id"]: (r.get("stock_ok") or 0, r.get("stock_defect") or 0)
+              for r in iter_records("products", fields="id,stock_ok,stock_defect")}
+    ledger, pacer = LoadLedger(), Pacer(rate)
+    names, weights = zip(*LOAD_FLOWS)
+    deadline = time.perf_counter() + seconds
+
+    def vu():
+        order_b = load_bodies("orders", status=lambda n: ["created"] * n, dealer=c_choice(dids),
+                              manager=c_choice(uids), region=c_choice(rids))
+        item_b = load_bodies("order_items", product=c_choice(pids), qty=c_uniform(1, 20),
+                             unit_price_usd=c_uniform(50, 500))
+        pay_b = load_bodies("payments", dealer=c_choice(dids), currency=c_choice(SELECT_FALLBACK["payments.currency"]),
+                            amount=c_uniform(50, 3000), date=c_date_18m(), fx_rate=c_uniform(12500, 14000))
+        ret_b = load_bodies("return_entries", dealer=c_choice(dids), date=c_date_18m())
+        reti_b = load_bodies("return_entry_items", product=c_choice(pids), qty=c_uniform(1, 5))
+        se_b = load_bodies("stock_entries", supplier=c_choice(sids), date=c_date_18m())
+        sei_b = load_bodies("stock_entry_items", product=c_choice(pids), qty=c_uniform(1, 20))
+
+        def order_flow():
+            order = pb_post("orders", next(order_b))
+            ledger.order(order)
+            for _ in range(rnd.randint(1, 7)):
+                ledger.stock(pb_post("order_items", {**next(item_b), "order": order["id"]}), -1)
+            for status in rnd.choice(LOAD_STATUS_PATHS):
+                pb_patch("orders", order["id"], {"status": status})
+
+        def payment_flow():
+            pb_post("payments", next(pay_b))
+
+        def entry_flow(coll, item_coll, bodies, item_bodies, per_entry):
+            entry = pb_post(coll, next(bodies))
+            for _ in range(rnd.randint(*per_entry)):
+                ledger.stock(pb_post(item_coll, {**next(item_bodies), "entry": entry["id"]}), +1)
+
+        flows = {
+            "order": order_flow,
+            "payment": payment_flow,
+            "return": lambda: entry_flow("return_entries", "return_entry_items", ret_b, reti_b, (1, 2)),
+            "stock": lambda: entry_flow("stock_entries", "stock_entry_items", se_b, sei_b, (1, 4)),
+        }
+        while time.perf_counter() < deadline:
+            pacer.wait()
+            name = rnd.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                flows[name]()
+                status = 200
+            except Exception as e:
+                status = "err"
+                print(f"[WARN LOAD {name}] {e}")
+            metrics.record("flow", name, status, 0, 0, t0, time.perf_counter())
+
+    print(f"Yuklama: {seconds:.0f}s, {CONCURRENCY} virtual foydalanuvchi, "
+          f"{f'{rate:g} oqim/s' if rate > 0 else 'cheklovsiz tezlik'}")
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as ex:
+        for fut in [ex.submit(vu) for _ in range(CONCURRENCY)]:
+            fut.result()
+    return check_load(ledger, before)
+
+def check_load(ledger, before):
+    """daily_seq/human_id takrorlari va zaxira drift'ini tekshiradi (muammo bo'lsa exit kodi 1)."""
+    problems = 0
+    seqs = defaultdict(int)
+    hids = defaultdict(int)
+    for day, seq, hid in ledger.orders:
+        seqs[(day, seq)] += 1
+        hids[hid] += 1
+    dup_seq = {k: n for k, n in seqs.items() if n > 1}
+    dup_hid = {k: n for k, n in hids.items() if k and n > 1}
+    print(f"\nOrders: {len(ledger.orders)} ta; takror daily_seq: {len(dup_seq)}, takror human_id: {len(dup_hid)}")
+    for hid, n in sorted(dup_hid.items())[:10]:
+        print(f"  ⚠️  human_id {hid} x{n}")
+    problems += len(dup_seq) + len(dup_hid)
+
+    touched = set(ledger.expected)
+    after = {r["id"]: (r.get("stock_ok") or 0, r.get("stock_defect") or 0)
+             for r in iter_records("products", fields="id,stock_ok,stock_defect") if r["id"] in touched}
+    drift = []
+    for pid, (d_ok, d_def) in ledger.expected.items():
+        b_ok, b_def = before.get(pid, (0, 0))
+        a_ok, a_def = after.get(pid, (0, 0))
+        ok, defect = a_ok - (b_ok + d_ok), a_def - (b_def + d_def)
+        if abs(ok) > 1e-6 or abs(defect) > 1e-6:
+            drift.append((pid, round(ok, 4), round(defect, 4)))
+    print(f"Products: {len(touched)} ta zaxirasi o'zgardi; drift: {len(drift)} ta")
+    for pid, ok, defect in sorted(drift, key=lambda d: -abs(d[1]))[:10]:
+        print(f"  ⚠️  {pid}: stock_ok {ok:+}, stock_defect {defect:+}")
+    problems += len(drift)
+    return problems
+
+# ---- TEKSHIRUV (SEED_VERIFY) ----
+# Sonlar perPage=1 + totalItems bilan (parallel). Keyin har bir kolleksiyaning relation ustunlari
+# oqim bilan o'qiladi: target id'lari sort=id bilan keladi — tartiblangan IdList'da bisect bilan
+# qidiriladi (set'siz, ~15 bayt/id). Xatolar: yetim havola, bo'sh required relation, orders.human_id
+# va kun bo'yicha daily_seq takrorlari. Ogohlantirish: manfiy zaxira.
+VERIFY_ERRORS = ("orphans", "missing_required", "duplicates")
+VERIFY_WARNINGS = ("negative_stock",)
+VERIFY_SAMPLE = 10  # har bir muammo uchun hisobotga misol id'lar
+VERIFY_EXTRA = {"orders": ["created", "daily_seq", "human_id"], "products": ["stock_ok", "stock_defect"]}
+
+def sorted_has(ids, rid):
+    i = bisect_left(ids, rid)
+    return i < len(ids) and ids[i] == rid
+
+def verify_collection(cname, targets):
+    """Bitta kolleksiyani oqim bilan tekshiradi: {tur: {"coll.field": {"count", "sample"}}}."""
+    found = {kind: {} for kind in VERIFY_ERRORS + VERIFY_WARNINGS}
+
+    def note(kind, key, rid):
+        f = found[kind].setdefault(key, {"count": 0, "sample": []})
+        f["count"] += 1
+        if len(f["sample"]) < VERIFY_SAMPLE:
+            f["sample"].append(rid)
+
+    plan = plans[cname]
+    rels = plan.required_rels + plan.optional_rels
+    extra = VERIFY_EXTRA.get(cname, [])
+    seqs, hids = set(), set()
+    for r in iter_records(cname, fields=",".join(["id"] + [s.name for s in rels] + extra)):
+        rid = r["id"]
+        for spec in rels:
+            v = r.get(spec.name)
+            vals = v if isinstance(v, list) else [v] if v else []
+            if not vals:
+                if spec.required:
+                    note("missing_required", f"{cname}.{spec.name}", rid)
+                continue
+            ids = targets.get(spec.target)
+            if ids is not None and not all(sorted_has(ids, x) for x in vals):
+                note("orphans", f"{cname}.{spec.name}", rid)
+        if cname == "orders":
+            seq, hid = (str(r.get("created") or "")[:10], r.get("daily_seq")), r.get("human_id")
+            if seq[1]:
+                if seq in seqs:
+                    note("duplicates", "orders.daily_seq", rid)
+                seqs.add(seq)
+            if hid:
+                if hid in hids:
+                    note("duplicates", "orders.human_id", rid)
+                hids.add(hid)
+        elif cname == "products":
+            for fname in extra:
+                if (r.get(fname) or 0) < 0:
+                    note("negative_stock", f"products.{fname}", rid)
+    return found
+
+def verify(report_path=""):
+    """Sonlar + yaxlitlik tekshiruvi; hisobotni chiqaradi (report_path bo'lsa JSON ham). Xatolar sonini qaytaradi."""
+    t0 = time.perf_counter()
+    colls = sorted(k for k in set(COUNTS) | set(name_to) if k not in SKIP_SEED)
+    report = {"counts": {}, "unreadable": {}}
+    for k, n, err in pb_counts(colls):
+        if err is None:
+            report["counts"][k] = n
+        else:
+            report["unreadable"][k] = str(err)[:200]
+    checked = [c for c in colls if c in plans and report["counts"].get(c)]
+    needed = sorted({s.target for c in checked for s in plans[c].required_rels + plans[c].optional_rels})
+    targets = {t: ids for t, ids, err in pb_map(lambda t: IdList(iter_ids(t)), needed) if err is None}
+    for kind in VERIFY_ERRORS + VERIFY_WARNINGS:
+        report[kind] = {}
+    for c, found, err in pb_map(lambda c: verify_collection(c, targets), checked):
+        if err is not None:
+            report["unreadable"][c] = str(err)[:200]
+            continue
+        for kind, items in found.items():
+            report[kind].update(items)
+    errors = sum(f["count"] for kind in VERIFY_ERRORS for f in report[kind].values())
+    warnings = sum(f["count"] for kind in VERIFY_WARNINGS for f in report[kind].values())
+    report.update(errors=errors, warnings=warnings, seconds=round(time.perf_counter() - t0, 3))
+
+    print("\nTekshiruv:")
+    for k, n in report["counts"].items():
+        print(f"  {k}: {n} ta yozuv")
+    for k, msg in report["unreadable"].items():
+        print(f"  {k}: ? ({msg})")
+    for kind in VERIFY_ERRORS + VERIFY_WARNINGS:
+        for key, f in sorted(report[kind].items()):
+            mark = "❌" if kind in VERIFY_ERRORS else "⚠️ "
+            print(f"  {mark} {kind} {key}: {f['count']} ta (masalan {', '.join(f['sample'][:3])})")
+    print(f"  xatolar: {errors}, ogohlantirishlar: {warnings} ({report['seconds']:.1f}s)")
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    return errors
+
+# ---- SNAPSHOT (SEED_SNAPSHOT) ----
+# Seed qilingan holat PB'ning SQLite bazasidan backup API bilan olinadi (server ishlayotgan bo'lsa
+# ham izchil nusxa) va katalogga kalit bo'yicha yoziladi: <dir>/<kalit>/data.db + manifest.json.
+# Tiklash ham backup API bilan (teskari yo'nalishda) va faqat PocketBase to'xtatilgan holda: ishlayotgan
+# server o'z keshlari va ochiq tranzaksiyalari bilan bazani ustidan yozilgandan keyin nomuvofiq ma'lumot beradi.
+# Fayl maydonlari (pb_data/storage) seed qilinmaydi, shuning uchun snapshot'ga kirmaydi.
+SNAPSHOT_VERSION = 1
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fixture_key():
+    """Kesh kaliti va uning tarkibi: shu qiymatlar bir xil bo'lsa qayta seed shart emas."""
+    parts = {
+        "version": SNAPSHOT_VERSION,
+        "schema_sha256": file_sha256(SCHEMA),
+        "seeder_sha256": file_sha256(os.path.abspath(__file__)),
+        "counts": COUNTS,
+        "scale": SCALE,
+        "skip": sorted(SKIP_SEED),
+        "rng_seed": int(os.environ["SEED_RANDOM"]) if os.getenv("SEED_RANDOM") else None,
+    }
+    key = hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:16]
+    return key, parts
+
+def sqlite_copy(src, dst):
+    """src bazani dst'ga SQLite backup API bilan ko'chiradi (WAL'dagi o'zgarishlar ham kiradi)."""
+    s, d = sqlite3.connect(src), sqlite3.connect(dst)
+    try:
+        s.backup(d)
+    finally:
+        s.close()
+        d.close()
+
+def snapshot_save(key, parts, counts):
+    path = os.path.join(SNAPSHOT_DIR, key)
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    t0 = time.perf_counter()
+    sqlite_copy(PB_DATA, os.path.join(tmp, "data.db"))
+    manifest = {**parts, "key": key, "created_at": datetime.now().isoformat(timespec="seconds"),
+                "rng_seed": RNG_SEED, "seed_tag": SEED_TAG, "pb_data": PB_DATA, "records": counts}
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    print(f"📦 Snapshot: {path} ({os.path.getsize(os.path.join(path, 'data.db')) >> 20} MB, "
+          f"{time.perf_counter() - t0:.1f}s)")
+
+def server_running():
+    """PB_BASE javob beradimi (/api/health; har qanday HTTP javob — server ishlayapti)."""
+    try:
+        requests.get(f"{PB_BASE}/api/health", timeout=2)
+    except requests.RequestException:
+        return False
+    return True
+
+def snapshot_restore(key):
+    """Keshdagi snapshot'ni PB_DATA ga tiklaydi; manifest yoki None (keshda yo'q).
+    PocketBase ishlab turgan bo'lsa tiklamaydi — SystemExit."""
+    path = os.path.join(SNAPSHOT_DIR, key)
+    try:
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if server_running():
+        raise SystemExit(f"Snapshot {key} bor, lekin PocketBase ishlab turibdi ({PB_BASE}): tiklash uchun uni "
+                         f"to'xtating yoki SEED_RESEED=1 bilan HTTP orqali seed qiling")
+    t0 = time.perf_counter()
+    sqlite_copy(os.path.join(path, "data.db"), PB_DATA)
+    print(f"♻️  Snapshot tiklandi: {path} -> {PB_DATA} ({time.perf_counter() - t0:.1f}s, "
+          f"{manifest['created_at']}, RNG {manifest['rng_seed']})")
+    return manifest
+
+# ---- REJA KESHI (SEED_CACHE) ----
+# Sxema parse'i, topologik darajalar va kompilyatsiya qilingan reja (relation target'lari, select
+# values, UNIQUE field'lar) JSON'da saqlanadi. Kalit — sxema fayli mazmunining sha256'i (+ reja
+# formati versiyasi va SELECT_FALLBACK): sxema o'zgarsa kesh o'z-o'zidan eskiradi. Ustun
+# generatorlari (funksiyalar) keshlanmaydi — ular keshdagi field ta'riflaridan field_col bilan quriladi.
+PLAN_CACHE_VERSION = 1
+COLLECTION_KEYS = ("id", "name", "type", "fields", "schema", "indexes")  # seeder o'qiydigan qismi
+
+def plan_cache_key(raw):
+    h = hashlib.sha256(raw)
+    h.update(json.dumps([PLAN_CACHE_VERSION, SELECT_FALLBACK], sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+def plan_to_json(plan):
+    return {
+        "cols": list(plan.cols),
+        "required_rels": [asdict(s) for s in plan.required_rels],
+        "optional_rels": [asdict(s) for s in plan.optional_rels],
+        "selects": plan.selects,
+        "required_selects": plan.required_selects,
+        "unique": sorted(plan.unique),
+    }
+
+def plan_from_json(coll, d):
+    fields = {f["name"]: f for f in build_field_list(coll)}
+    unique = set(d["unique"])
+    return CollectionPlan(
+        coll["name"],
+        cols={f: field_col(coll["name"], fields[f], f in unique) for f in d["cols"]},
+        required_rels=[RelSpec(**s) for s in d["required_rels"]],
+        optional_rels=[RelSpec(**s) for s in d["optional_rels"]],
+        selects=d["selects"],
+        required_selects=d["required_selects"],
+        unique=unique,
+    )
+
+def load_plan(path):
+    """(collections, plans, levels, keshdanmi) — keshda bo'lsa sxema qayta parse/kompilyatsiya qilinmaydi."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    cache = os.path.join(CACHE_DIR, f"plan-{plan_cache_key(raw)}.json") if CACHE_DIR else ""
+    if cache and os.path.exists(cache):
         try:
-            rec = pb_post("fx_rates", payload)
-            generated["fx_rates"].append(rec["id"])
-        except Exception:
-            # validation_not_unique bo'lsa ham davom etamiz
-            pass
-        if (i + 1) % 60 == 0:
-            time.sleep(0.02)
-    cached_ids["fx_rates"] = generated["fx_rates"] or pb_list_ids("fx_rates")
+            with open(cache, encoding="utf-8") as f:
+                data = json.load(f)
+            colls = data["collections"]
+            name_to_ = {c["name"]: c for c in colls}
+            plans_ = {n: plan_from_json(name_to_[n], d) for n, d in data["plans"].items()}
+            return colls, plans_, data["levels"], True
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[WARN cache] {cache} o'qilmadi ({e}) — qayta kompilyatsiya")
+    data = json.loads(raw)
+    if isinstance(data, dict) and "collections" in data:
+        data = data["collections"]
+    colls = [{k: c[k] for k in COLLECTION_KEYS if k in c} for c in data]
+    plans_, levels_ = compile_plan(colls), topo_levels(colls)
+    if cache:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{cache}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": PLAN_CACHE_VERSION, "schema": path, "collections": colls, "levels": levels_,
+                           "plans": {n: plan_to_json(p) for n, p in plans_.items()}}, f, ensure_ascii=False)
+            os.replace(tmp, cache)
+        except OSError as e:
+            print(f"[WARN cache] {cache} yozilmadi: {e}")
+    return colls, plans_, levels_, False
+
+def seed_count(cname):
+    return max(1, round(COUNTS.get(cname, DEFAULT_COUNT) * SCALE))
+
+def print_plan(only=None):
+    """--plan: darajalar bo'yicha kolleksiyalar, yozuvlar soni, relation'lar (* — PATCH bosqichida)."""
+    for i, level in enumerate(levels):
+        for cname in level:
+            if only and cname not in only:
+                continue
+            plan = plans[cname]
+            if cname in SKIP_SEED:
+                print(f"  [{i}] {cname:<28} {'skip':>7}")
+                continue
+            later = deferred.get(cname) or []
+            rels = [f"{s.name}->{s.target}" for s in plan.required_rels] + \
+                   [f"{s.name}->{s.target}?" + ("*" if s in later else "") for s in plan.optional_rels]
+            n = len(DATES_18M) if cname == "fx_rates" else seed_count(cname)  # fx: kunlik qator
+            print(f"  [{i}] {cname:<28} {n:>7}  {len(plan.cols):>2} ustun"
+                  + (f"  {', '.join(rels)}" if rels else ""))
 
-# 2) Birinchi pass: required relation'lar CREATE vaqtida, optional'lar keyin PATCH
-optional_rel_tracker = {cn: [] for cn in order}
+# ---- ISH HOLATI ----
+# main() to'ldiradi; modul import qilinganda bo'sh (funksiyalar shu global'larni o'qiydi)
+collections, name_to, id_to, plans, levels, order = [], {}, {}, {}, [], []
+level_of, deferred, optional_rel_tracker = {}, {}, {}
+sink = journal = resumed = pools = fx = None
+ORDER_DISCOUNT_TYPES = None
 
-for cname in order:
+def phase(name):
+    """Yangi bosqich (metrika + jurnal). Resume'da oldin tugagan bosqich uchun False."""
+    metrics.phase(name)
+    if journal is not None:
+        journal.begin(name)
+    return not (resumed is not None and name in resumed.done)
+
+def deferred_rels(cname):
+    """CREATE paytida hali pool'i yo'q optional relation'lar (sikldagi yoki o'ziga havola)."""
+    lv = level_of[cname]
+    return [s for s in plans[cname].optional_rels if level_of.get(s.target, lv) >= lv]
+
+def seed_collection(cname):
     if cname in SKIP_SEED:
         print(f"Skipping {cname} (blacklisted)")
-        continue
-    if cname == "users":
-        continue
+        return
+    if cname in ("users", "fx_rates"):  # alohida bosqichlarda seed qilinadi
+        return
 
-    coll = name_to[cname]
-    fields = build_field_list(coll)
-    count = COUNTS.get(cname, DEFAULT_COUNT)
+    plan = plans[cname]
+    count = seed_count(cname)
+    if resumed is not None:
+        count -= len(resumed.created_in[("create", cname)])
+        if count <= 0:
+            return
+        if cname in JOURNAL_PARENT and not free_parents(cname):
+            print(f"[SKIP {cname}] resume: barcha {JOURNAL_PARENT[cname][1]} yozuvlarida item bor")
+            return
 
     print(f"Seeding {cname} ({count}) ...")
-    forbidden = False  # 403 superuser-only bo'lsa, kolleksiyani tashlab ketamiz
 
     # CREATE vaqtida kerak bo‘ladigan REQUIRED relation’lar uchun target pool'lar bo‘sh bo‘lmasligi kerak
-    required_targets = []
-    for rf in fields:
-        if rf.get("type") == "relation" and rf.get("required"):
-            opts = rf.get("options", {}) or {}
-            target = opts.get("collection") or opts.get("collectionId")
-            # target nomini topamiz
-            tname = None
-            for _c in collections:
-                if _c.get("id") == target or _c.get("name") == target:
-                    tname = _c["name"]
-                    break
-            if tname:
-                required_targets.append(tname)
-
     # Agar required relation target kolleksiyalarida yozuv bo'lmasa — skip
-    pool_missing = False
-    for tname in required_targets:
-        pool = cached_ids.get(tname) or pb_list_ids(tname)
-        if not pool:
-            print(f"[SKIP {cname}] required pool '{tname}' is empty — skipping this collection seeding.")
-            pool_missing = True
-            break
-    if pool_missing:
-        continue
+    for spec in plan.required_rels:
+        if not pools.get(spec.target):
+            print(f"[SKIP {cname}] required pool '{spec.target}' is empty — skipping this collection seeding.")
+            return
 
-    for i in range(count):
-        if forbidden:
-            break
+    later = deferred[cname]
+    rel_names = {s.name for s in plan.required_rels + plan.optional_rels}
 
-        record = {}
-        opt_rels_for_this_record = []
+    def records():
+        # 2.1: non-relation fieldlar va REQUIRED relation'lar
+        cols = plan_columns(plan)
+        # 2.2: OPTIONAL relation'lar — target'lar oldingi darajalarda allaqachon seed qilingan
+        for spec in plan.optional_rels:
+            pool = pools.get(spec.target) if spec not in later else None
+            if pool:
+                cols[spec.name] = spec.optional_column(pool)
+        # 2.3: domen ustunlari (nomlar, narx/tannarx, status/chegirma, itemlar taqsimoti, ...)
+        dcols, finish = domain_columns(cname, count)
+        cols.update(dcols)
+        for record in rows(count, cols, label=cname, rels=rel_names):
+            if finish is not None:
+                finish(record)
+            yield record
 
-        # 2.1: non-relation fieldlar
-        for f in fields:
-            if f.get("primaryKey"):
-                continue
-            if f.get("type") == "relation":
-                continue
-            record[f["name"]] = gen_by_type(cname, f)
-
-        # maxsus defaultlar (unique friendly)
-        if cname == "categories":
-            record["name"] = (record.get("name") or fake.word().title()) + f" {random.randint(1000,9999)}"
-
-        if cname == "dealers":
-            record["name"] = (record.get("name") or f"{fake.city()} Diller") + f" {random.randint(1000,9999)}"
-            record.setdefault("tin", str(random.randint(100000000, 999999999)))
-
-        if cname == "products":
-            record["name"] = (record.get("name") or f"{fake.color_name()} Door") + f" {random.randint(1000,9999)}"
-            record["is_active"] = True
-            price = round(random.uniform(50, 500), 2)
-            cost  = round(price * random.uniform(0.5, 0.9), 2)
-            record["price_usd"] = price
-            record.setdefault("cost_price_usd", cost)
-
-        # 2.2: REQUIRED relation'lar – CREATE paytida
-        for rf in fields:
-            if rf.get("type") != "relation":
-                continue
-            rname = rf["name"]
-            opts  = rf.get("options", {}) or {}
-            target = opts.get("collection") or opts.get("collectionId")
-
-            tname = None
-            for _c in collections:
-                if _c.get("id") == target or _c.get("name") == target:
-                    tname = _c["name"]
+    # 2.4: CREATE (unique errors va select fallback'ni yutish) — natijalar yaratish tartibida keladi
+    pools.get(cname)  # mavjudlari bir marta o'qiladi, keyin create javoblaridan to'ldiriladi
+    with span(f"create {cname}", "collection", count=count):
+        for record, created, err in write_stream(cname, records(), fix=record_fixer(plan)):
+            if err is not None:
+                # superuser-only kolleksiya bo'lsa — skip (generator yopilib, navbatdagilar bekor qilinadi)
+                if is_superuser_only(err):
+                    print(f"[SKIP {cname}] superuser-only collection. Skipping the rest.")
                     break
-            if not tname:
-                continue
+                raise err
+            rid = created["id"]
+            pools.add(cname, [rid])
+            if later:
+                optional_rel_tracker[cname].append(rid)
 
-            if rf.get("required"):
-                pool = cached_ids.get(tname) or pb_list_ids(tname)
-                if not pool:
-                    pool = ensure_min_pool(tname, n=5)
-                maxSel = opts.get("maxSelect", 1)
-                minSel = opts.get("minSelect", 0)
-                if (maxSel or 1) > 1:
-                    k = max(1, minSel)
-                    k = min(k, len(pool)) if len(pool) > 0 else 0
-                    record[rname] = random.sample(pool, k) if k > 0 else []
-                else:
-                    record[rname] = random.choice(pool) if pool else None
-            else:
-                opt_rels_for_this_record.append(rf)
+def seed_level(level):
+    """Bitta darajadagi kolleksiyalar bir-biriga bog'liq emas — parallel rejimda birga seed qilinadi."""
+    if CONCURRENCY <= 1 or len(level) <= 1:
+        for cname in level:
+            seed_collection(cname)
+        return
+    with ThreadPoolExecutor(max_workers=len(level)) as ex:
+        for fut in [ex.submit(seed_collection, cname) for cname in level]:
+            fut.result()
 
-        # 2.3: CREATE (unique errors va select fallback'ni yutish)
-        created = None
-        try:
-            created = pb_post(cname, record)
-        except RuntimeError as e:
-            msg = str(e)
-            # superuser-only kolleksiya bo'lsa — skip
-            if "403" in msg and ("Only superusers" in msg or "forbidden" in msg.lower()):
-                print(f"[SKIP {cname}] superuser-only collection. Skipping the rest.")
-                forbidden = True
-                break
-
-            # required select/text fallback
-            for f in fields:
-                if f.get("type") == "select" and f.get("required") and not record.get(f["name"]):
-                    record[f["name"]] = pick_select(cname, f["name"], f) or "none"
-            # unique name xatolariga oddiy suffix qo'yib qayta urinish
-            if "validation_not_unique" in msg and "name" in msg:
-                record["name"] = (record.get("name") or fake.word().title()) + f" {random.randint(10000,99999)}"
-            created = pb_post(cname, record)
-
-        rid = created["id"]
-        generated[cname].append(rid)
-        optional_rel_tracker[cname].append((rid, opt_rels_for_this_record))
-
-    cached_ids[cname] = generated[cname] or pb_list_ids(cname)
-
-# 3) OPTIONAL relation'larni PATCH
-for cname in order:
-    if cname in SKIP_SEED or cname == "users":
-        continue
-    pairs = optional_rel_tracker.get(cname, [])
-    if not pairs:
-        continue
-
-    for rid, opt_rels in pairs:
-        patch = {}
-        for rf in opt_rels:
-            rname = rf["name"]
-            opts  = rf.get("options", {}) or {}
-            target = opts.get("collection") or opts.get("collectionId")
-            tname = None
-            for _c in collections:
-                if _c.get("id") == target or _c.get("name") == target:
-                    tname = _c["name"]
-                    break
-            if not tname:
-                continue
-            pool = cached_ids.get(tname) or pb_list_ids(tname)
-            if not pool:
-                continue
-            maxSel = opts.get("maxSelect", 1)
-            minSel = opts.get("minSelect", 0)
-            if (maxSel or 1) > 1:
-                k = random.randint(max(0, minSel), min(maxSel, len(pool)))
-                if k > 0:
-                    patch[rname] = random.sample(pool, k)
-            else:
-                patch[rname] = random.choice(pool)
-        if patch:
-            pb_patch(cname, rid, patch)
-
-# 4) Domain tweaks: orders (+ optional order_items), payments, returns, stock, stock_log
-print("Tweaking orders & (optional) order_items ...")
-oids = cached_ids.get("orders", []) or pb_list_ids("orders")
-cached_ids["orders"] = oids
-dids = cached_ids.get("dealers", []) or pb_list_ids("dealers")
-uids = cached_ids.get("users", [])   or pb_list_ids("users")
-rids = cached_ids.get("regions", []) or pb_list_ids("regions")
-cached_ids["dealers"], cached_ids["users"], cached_ids["regions"] = dids, uids, rids
-
-for oid in oids:
-    patch = {"status": random.choice(SELECT_FALLBACK["orders.status"])}
-
-    # discount_type — faqat schema ruxsat bergan qiymatlardan
-    dct = random.choice(ORDER_DISCOUNT_TYPES) if ORDER_DISCOUNT_TYPES else "none"
-    patch["discount_type"] = dct
-    if dct == "percent":
-        patch["discount_value"] = round(random.uniform(0, 10), 2)
-    elif dct == "amount":
-        if "amount" in ORDER_DISCOUNT_TYPES:
-            patch["discount_value"] = round(random.uniform(0, 50), 2)
-        else:
-            patch["discount_type"] = "none"
-            patch["discount_value"] = 0
-    else:
-        patch["discount_value"] = 0
-
-    if uids: patch["manager"] = random.choice(uids)
-    if dids: patch["dealer"]  = random.choice(dids)
-    if rids: patch["region"]  = random.choice(rids)
-    pb_patch("orders", oid, patch)
-
-# order_items — ixtiyoriy (agar mavjud bo'lmasa, bir oz yaratamiz)
-have_items = pb_list_ids("order_items")
-if "order_items" in name_to and "order_items" not in SKIP_SEED:
-    target_items = COUNTS.get("order_items", 900)
-    if len(have_items) < target_items * 0.6 and oids:
-        pids = cached_ids.get("products", []) or pb_list_ids("products")
-        for oid in oids:
-            n = random.randint(1, 7)
-            for _ in range(n):
-                body = {
-                    "order": oid,
-                    "product": random.choice(pids) if pids else None,
-                    "qty": round(random.uniform(1, 20), 2),
-                    "unit_price_usd": round(random.uniform(50, 500), 2),
-                }
-                try:
-                    pb_post("order_items", body)
-                except Exception:
-                    pass
-            time.sleep(0.004)
-
-# payments (dealer required)
-if "payments" in name_to and "payments" not in SKIP_SEED:
-    print("Tweaking payments ...")
-    dids = cached_ids.get("dealers", []) or pb_list_ids("dealers")
-    pm_target = COUNTS.get("payments", 200)
-    pm_existing = pb_list_ids("payments")
-    to_create = max(0, pm_target - len(pm_existing))
-    for _ in range(to_create):
-        curr = random.choice(SELECT_FALLBACK["payments.currency"])
-        body = {
-            "dealer": random.choice(dids) if dids else None,
-            "currency": curr,
-            "method": random.choice(SELECT_FALLBACK["payments.method"]),
-            "amount": round(random.uniform(50, 3000), 2),
-            "date": rand_date_18m(),
-        }
-        if curr == "UZS":
-            body["fx_rate"] = rand_fx_value()
-        try:
-            pb_post("payments", body)
-        except Exception:
-            pass
+def patch_collection(cname):
+    """3) Sikldagi optional relation'larni PATCH (CREATE paytida target pool'i yo'q edi)."""
+    todo = optional_rel_tracker.get(cname) or IdList()
+    if resumed is not None:
+        done_ids = resumed.patched[("optional_patch", cname)]
+        todo = IdList(rid for rid in todo if rid not in done_ids)
+    if not todo:
+        return
 
-# return_entries + return_entry_items
-if "return_entries" in name_to and "return_entries" not in SKIP_SEED:
-    re_existing = pb_list_ids("return_entries")
-    dids = cached_ids.get("dealers", []) or pb_list_ids("dealers")
-    to_create = max(0, COUNTS.get("return_entries", 30) - len(re_existing))
-    for _ in range(to_create):
-        body = {
-            "dealer": random.choice(dids) if dids else None,
-            "date": rand_date_18m(),
-            "note": fake.sentence(nb_words=4)
-        }
-        try:
-            pb_post("return_entries", body)
-        except Exception:
-            pass
+    def patches():
+        cols = {"id": todo}
+        for spec in deferred[cname]:
+            pool = pools.get(spec.target)
+            if pool:
+                cols[spec.name] = spec.optional_column(pool)
+        for row in rows(len(todo), cols, label=cname, rels=set(cols) - {"id"}):
+            rid = row.pop("id")
+            patch = {k: v for k, v in row.items() if v is not None}
+            if patch:
+                yield rid, patch
 
-if ("return_entry_items" in name_to and "return_entry_items" not in SKIP_SEED
-        and "return_entries" in name_to and "return_entries" not in SKIP_SEED):
-    eids = pb_list_ids("return_entries")
-    pids = cached_ids.get("products", []) or pb_list_ids("products")
-    rei_existing = pb_list_ids("return_entry_items")
-    need = max(0, COUNTS.get("return_entry_items", 60) - len(rei_existing))
-    idx = 0
-    while need > 0 and eids:
-        eid = eids[idx % len(eids)]
-        n = random.randint(1, 2)
-        for _ in range(n):
-            body = {
-                "entry": eid,
-                "product": random.choice(pids) if pids else None,
-                "qty": round(random.uniform(1, 5), 2),
-                "price_usd": round(random.uniform(10, 180), 2),
-            }
-            try:
-                pb_post("return_entry_items", body)
-                need -= 1
-                if need <= 0:
-                    break
-            except Exception:
-                pass
-        idx += 1
-
-# stock_entries + stock_entry_items
-if "stock_entries" in name_to and "stock_entries" not in SKIP_SEED:
-    sids = cached_ids.get("suppliers", []) or pb_list_ids("suppliers")
-    se_existing = pb_list_ids("stock_entries")
-    to_create = max(0, COUNTS.get("stock_entries", 30) - len(se_existing))
-    for _ in range(to_create):
-        body = {
-            "supplier": random.choice(sids) if sids else None,
-            "date": rand_date_18m(),
-            "note": fake.sentence(nb_words=4),
-        }
-        try:
-            pb_post("stock_entries", body)
-        except Exception:
+    with span(f"patch {cname}", "collection", count=len(todo)):
+        for _ in write_stream(cname, patches(), body=lambda it: it[1], rid=lambda it: it[0]):
             pass
 
-if ("stock_entry_items" in name_to and "stock_entry_items" not in SKIP_SEED
-        and "stock_entries" in name_to and "stock_entries" not in SKIP_SEED):
-    eids = pb_list_ids("stock_entries")
-    pids = cached_ids.get("products", []) or pb_list_ids("products")
-    sei_existing = pb_list_ids("stock_entry_items")
-    need = max(0, COUNTS.get("stock_entry_items", 90) - len(sei_existing))
-    idx = 0
-    while need > 0 and eids:
-        eid = eids[idx % len(eids)]
-        n = random.randint(1, 4)
-        for _ in range(n):
-            body = {
-                "entry": eid,
-                "product": random.choice(pids) if pids else None,
-                "qty": round(random.uniform(1, 20), 2),
-                "unit_cost_usd": round(random.uniform(10, 150), 2),
-            }
-            try:
-                pb_post("stock_entry_items", body)
-                need -= 1
-                if need <= 0:
-                    break
-            except Exception:
-                pass
-        idx += 1
-
-# stock_log (product required)
-if "stock_log" in name_to and "stock_log" not in SKIP_SEED:
-    pids = cached_ids.get("products", []) or pb_list_ids("products")
-    sl_existing = pb_list_ids("stock_log")
-    need = max(0, COUNTS.get("stock_log", 30) - len(sl_existing))
-    for _ in range(need):
-        body = {
-            "product": random.choice(pids) if pids else None,
-            "delta": random.randint(-10, 10),
-            "reason": random.choice(SELECT_FALLBACK["stock_log.reason"]),
-            "date": rand_date_18m(),
-        }
+# ---- FAN-OUT (SEED_TARGETS) ----
+# Bitta generatsiya — ko'p server: ma'lumot bir marta (SEED_RANDOM bilan deterministik) NDJSON'ga
+# generatsiya qilinadi (SEED_OUT yo'li), keyin har bir target'ga alohida jarayonda SEED_REPLAY bilan
+# bir vaqtda yuklanadi. Har bir jarayonning o'z session'lari (connection pool), adaptiv limiteri va
+# retry'lari bor: sekin yoki yiqilgan server boshqalarini to'xtatmaydi, umumiy vaqt ~ eng sekin target.
+# --only generatsiya jarayoniga uzatiladi; --dry-run'da faqat generatsiya (yozuvsiz) ishlaydi — target'larga
+# hech narsa yuborilmaydi. SEED_REPLAY bilan ikkalasi ham rad etiladi (tayyor manifest to'liq yuklanadi).
+FANOUT_DROP_ENV = ("SEED_TARGETS", "SEED_OUT", "SEED_REPLAY", "SEED_SNAPSHOT", "SEED_JOURNAL",
+                   "SEED_RESUME", "SEED_LOAD", "SEED_METRICS", "SEED_TRACE")
+_print_lock = threading.Lock()
+
+def parse_targets(spec):
+    """[(url, token)]: fayl (har qatorda "URL [TOKEN]", # — izoh) yoki vergul bilan URL'lar (PB_TOKEN)."""
+    if os.path.isfile(spec):
+        with open(spec, encoding="utf-8") as f:
+            rows_ = [line.split("#", 1)[0].split() for line in f]
+        targets = [(r[0].rstrip("/"), r[1] if len(r) > 1 else PB_TOKEN) for r in rows_ if r]
+    else:
+        targets = [(u.strip().rstrip("/"), PB_TOKEN) for u in spec.split(",") if u.strip()]
+    if not targets:
+        raise SystemExit(f"SEED_TARGETS: target topilmadi ({spec})")
+    return targets
+
+def run_child(label, env, args=()):
+    """Seeder'ni alohida jarayonda ishga tushiradi, chiqishini [label] bilan oqim qiladi; (exit, oxirgi qator)."""
+    p = subprocess.Popen([sys.executable, os.path.abspath(__file__), *args], env=env, text=True, bufsize=1,
+                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    last = status = ""
+    for line in p.stdout:
+        line = line.rstrip()
+        if line:
+            last = line.strip()
+            if last.startswith(("✅", "❌")) or "Error" in last:  # yakun yoki xato qatori
+                status = last
+            with _print_lock:
+                print(f"[{label}] {line}", flush=True)
+    return p.wait(), status or last
+
+def child_trace(label):
+    """Har bir bola jarayonning o'z trace fayli: seed_trace.json -> seed_trace.<label>.json."""
+    if not TRACE_FILE:
+        return {}
+    root, ext = os.path.splitext(TRACE_FILE)
+    return {"SEED_TRACE": f"{root}.{label}{ext or '.json'}"}
+
+def fanout(spec, dry_run=False, only=None):
+    targets = parse_targets(spec)
+    if REPLAY_DIR and (dry_run or only):
+        raise SystemExit("SEED_TARGETS + SEED_REPLAY: --dry-run/--only ishlatilmaydi (manifest to'liq yuklanadi)")
+    env = {k: v for k, v in os.environ.items() if k not in FANOUT_DROP_ENV}
+    env.update(SEED_RANDOM=str(RNG_SEED), SEED_TAG=SEED_TAG, PYTHONUNBUFFERED="1")
+    gen_args = ["--only", ",".join(sorted(only))] if only else []
+    if dry_run:
+        code, last = run_child("gen", {**env, **child_trace("gen")}, ["--dry-run", *gen_args])
+        print(f"\nDry-run: {len(targets)} ta target'ga hech narsa yuborilmadi")
+        raise SystemExit(code)
+    src, tmp = REPLAY_DIR, None
+    t0 = time.perf_counter()
+    if not src:
+        src = OUT_DIR or tempfile.mkdtemp(prefix="seed_fanout_")
+        tmp = None if OUT_DIR else src
+        code, last = run_child("gen", {**env, "SEED_OUT": src, **child_trace("gen")}, gen_args)
+        if code:
+            if tmp:
+                shutil.rmtree(tmp, ignore_errors=True)
+            raise SystemExit(f"Generatsiya yiqildi (exit {code}): {last}")
+    print(f"\nFan-out: {src} -> {len(targets)} ta server (RNG {RNG_SEED}, generatsiya "
+          f"{time.perf_counter() - t0:.1f}s, bir vaqtda {FANOUT or len(targets)})")
+
+    def one(i, url, token):
+        t = time.perf_counter()
+        code, last = run_child(f"{i + 1}:{url.split('//', 1)[-1]}",
+                               {**env, "PB_BASE": url, "PB_TOKEN": token, "SEED_REPLAY": src,
+                                **child_trace(str(i + 1))})
+        return url, code, time.perf_counter() - t, last
+
+    try:
+        with ThreadPoolExecutor(max_workers=FANOUT or len(targets)) as ex:
+            results = list(ex.map(lambda a: one(*a), [(i, u, tok) for i, (u, tok) in enumerate(targets)]))
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+    print(f"\n{'target':<32}{'exit':>5}{'vaqt':>8}  natija")
+    for url, code, secs, last in results:
+        print(f"{url:<32}{code:>5}{secs:>7.1f}s  {last[:80]}")
+    failed = sum(1 for r in results if r[1])
+    print(f"Jami: {time.perf_counter() - t0:.1f}s, {len(results) - failed}/{len(results)} server muvaffaqiyatli")
+    raise SystemExit(1 if failed else 0)
+
+USAGE = "Ishlatish: python seed_pb_from_schema.py [--plan | --dry-run] [--only kolleksiya1,kolleksiya2]"
+
+def parse_args(argv):
+    opts, args = {"plan": False, "dry_run": False, "only": None}, list(argv[1:])
+    while args:
+        a = args.pop(0)
+        if a in ("--plan", "--dry-run"):
+            opts[a[2:].replace("-", "_")] = True
+        elif a == "--only" and args:
+            opts["only"] = {x.strip() for x in args.pop(0).split(",") if x.strip()}
+        elif a.startswith("--only="):
+            opts["only"] = {x.strip() for x in a.split("=", 1)[1].split(",") if x.strip()}
+        else:
+            raise SystemExit(USAGE)
+    if opts["plan"] and opts["dry_run"]:
+        raise SystemExit(USAGE)
+    return opts
+
+def main(argv):
+    global collections, name_to, id_to, plans, levels, order, level_of, deferred, optional_rel_tracker
+    global sink, journal, resumed, pools, fx, ORDER_DISCOUNT_TYPES, tracer
+    opts = parse_args(argv)
+    only = opts["only"]
+    t_start = time.perf_counter()
+    if TRACE_FILE and not opts["plan"] and not TARGETS:
+        tracer = Tracer(TRACE_FILE)
+        atexit.register(tracer.close)  # xato/SystemExit bilan chiqilsa ham fayl yopiladi
+    if opts["dry_run"]:
+        sink = NdjsonSink("")
+    elif OUT_DIR:
+        sink = NdjsonSink(OUT_DIR)
+
+    if TARGETS and not opts["plan"]:
+        fanout(TARGETS, opts["dry_run"], only)
+    if REPLAY_DIR and not opts["plan"]:
+        print(f"Replay: {REPLAY_DIR} -> {PB_BASE}")
+        metrics.phase("replay")
+        done, total = replay_ndjson(REPLAY_DIR)
+        print(f"\n{'✅' if done == total else '❌'} Yuklandi: {done}/{total} yozuv. Vaqt: {time.perf_counter() - t_start:.1f}s")
+        metrics.report(METRICS_FILE)
+        raise SystemExit(0 if done == total else 1)
+
+    collections, plans, levels, cached = load_plan(SCHEMA)
+    name_to, id_to = map_collections(collections)
+    if only and only - set(name_to):
+        raise SystemExit(f"--only: sxemada yo'q kolleksiya(lar): {', '.join(sorted(only - set(name_to)))}")
+    order = [n for level in levels for n in level]
+    # 2) CREATE paytida target'i keyingi darajada bo'lgan optional relation'lar (sikl/o'ziga havola) — keyin PATCH
+    level_of = {n: i for i, level in enumerate(levels) for n in level}
+    deferred = {cn: deferred_rels(cn) for cn in order if cn in plans}
+    if opts["plan"]:
+        print(f"Reja: {SCHEMA} ({'keshdan' if cached else 'kompilyatsiya'}, "
+              f"{(time.perf_counter() - t_start) * 1000:.0f}ms), SEED_SCALE={SCALE:g}")
+        print_plan(only)
+        return
+    print("Topologik tartib:", " -> ".join(", ".join(level) for level in levels))
+    if only:
+        levels = [lv for lv in ([n for n in level if n in only] for level in levels) if lv]
+        print(f"Faqat: {', '.join(n for level in levels for n in level)}")
+    if sink is None and CONCURRENCY > 1:
+        print(f"Parallel rejim: {CONCURRENCY} ta so'rov bir vaqtda" + (" (adaptiv chegara)" if _limiter.adaptive else ""))
+    if sink is None and BATCH_SIZE > 1:
+        print(f"Batch rejim: /api/batch, {BATCH_SIZE} tadan yozuv")
+
+    # fixture keshi: shu sxema/konfiguratsiya uchun snapshot bo'lsa — seed o'rniga tiklash
+    snapshot = None
+    if SNAPSHOT_DIR and sink is None and not LOAD_SECONDS and not RESUME and not only:
+        if not os.path.exists(PB_DATA):
+            print(f"[WARN snapshot] {PB_DATA} topilmadi (PB_DATA) — snapshot o'chirilgan")
+        else:
+            snapshot = fixture_key()
+            manifest = None if RESEED else snapshot_restore(snapshot[0])
+            if manifest is not None:
+                for k, n in sorted(manifest["records"].items()):
+                    print(f"  {k}: {n} ta yozuv")
+                raise SystemExit(0)
+            print(f"Snapshot keshi: {snapshot[0]} yo'q — seed qilinadi")
+
+    # resume: pool'lar jurnaldan tiklanadi, server list qilinmaydi (javobi yo'qolgan create'lar — id bo'yicha)
+    if RESUME and JOURNAL_FILE and os.path.exists(JOURNAL_FILE) and sink is None and not LOAD_SECONDS:
+        resumed = Journal.load(JOURNAL_FILE)
+        print(f"Resume: {JOURNAL_FILE} — {sum(len(v) for v in resumed.created.values())} ta yozuv, "
+              f"tugagan bosqichlar: {', '.join(sorted(resumed.done)) or '-'}")
+    pools = IdPools(listing=sink is None and resumed is None, offline=sink is not None)
+    if JOURNAL_FILE and sink is None and not LOAD_SECONDS:
+        journal = Journal(JOURNAL_FILE)
+    if resumed is not None:
+        journal.recover(resumed)
+        for coll, ids in resumed.created.items():
+            pools.add(coll, ids)
+
+    # orders.discount_type ni schema'dan o'qib olaylik (fallback: none/percent)
+    ORDER_DISCOUNT_TYPES = plans["orders"].selects.get("discount_type") if "orders" in plans else None
+    if not ORDER_DISCOUNT_TYPES:
+        ORDER_DISCOUNT_TYPES = list(SELECT_FALLBACK["orders.discount_type"])
+    # Amount schema ruxsat bermasa, ro‘yxatdan olib tashlaymiz
+    ORDER_DISCOUNT_TYPES = [v for v in ORDER_DISCOUNT_TYPES if v in ("none", "percent", "amount")]
+
+    # FX qatori — 18 oy (DATES_18M), kunma-kun. Serverdagi sanalar bir marta o'qiladi: ular qayta
+    # yuborilmaydi (uq_fx_date) va as-of qidiruvda saqlangan kurs ishlatiladi
+    fx_new, fx_have = {}, {}
+    if "fx_rates" in name_to and "fx_rates" not in SKIP_SEED:
         try:
-            pb_post("stock_log", body)
-        except Exception:
-            pass
+            fx_have = {} if sink is not None else {
+                str(r["date"])[:10]: float(r["usd_to_uzs"] or 0) for r in iter_records("fx_rates", fields="id,date,usd_to_uzs")}
+        except RuntimeError as e:
+            print(f"[WARN fx_rates] mavjud kurslarni o'qib bo'lmadi: {e}")
+        missing = [d for d in DATES_18M if d not in fx_have]
+        if missing:
+            # yangi kunlar oldingi saqlangan kursdan davom etadi
+            start = FxSeries(fx_have).asof(missing[0]) if fx_have else FX_START
+            fx_new = dict(zip(missing, fx_walk(len(missing), start)))
+        fx = FxSeries({**fx_new, **fx_have})
+
+    if LOAD_SECONDS > 0:
+        metrics.phase("load")
+        problems = run_load(LOAD_SECONDS, LOAD_RATE)
+        if VERIFY:
+            problems += verify("" if VERIFY == "1" else VERIFY)
+        metrics.report(METRICS_FILE)
+        raise SystemExit(1 if problems else 0)
+
+    # 0) users minimal
+    if phase("users") and "users" in name_to and (not only or "users" in only):
+        ensure_users_minimal(name_to)
+
+    # 1) FX kurslari (qator yuqorida tayyorlangan)
+    if phase("fx_rates") and fx_new and (not only or "fx_rates" in only):
+        print(f"Seeding fx_rates ({len(fx_new)} kun, {len(fx_have)} tasi serverda bor) ...")
+        post_all("fx_rates", ({"date": d, "usd_to_uzs": v} for d, v in fx_new.items()))
+
+    # 2) Bitta pass: har bir yozuv CREATE paytida to'liq — required va optional relation'lar, domen
+    # maydonlari. Optional relation target'i keyingi darajada bo'lsa (sikl/o'ziga havola) — keyin PATCH.
+    two_phase = [f"{cn}.{s.name}->{s.target}" for cn, specs in deferred.items() if not only or cn in only for s in specs]
+    if two_phase:
+        print("Ikki bosqichli (PATCH) relation'lar:", ", ".join(two_phase))
+    # PATCH kutayotgan yozuvlar: faqat id'lar (relation'lar ro'yxati kolleksiya uchun bitta — deferred[cn])
+    optional_rel_tracker = {cn: IdList() for cn in order}
+    if resumed is not None:
+        for cn, specs in deferred.items():
+            if specs:
+                optional_rel_tracker[cn] = resumed.created_in[("create", cn)]
+
+    if phase("create"):
+        for level in levels:
+            seed_level(level)
+
+    # 3) Faqat sikldagi optional relation'larni PATCH
+    if phase("optional_patch"):
+        for cname in order:
+            if cname not in SKIP_SEED and cname != "users":
+                patch_collection(cname)
+
+    if sink is not None:
+        sink.close()
+        label = "Dry-run" if opts["dry_run"] else f"Offline generatsiya tayyor: {OUT_DIR}"
+        print(f"\n✅ {label} (vaqt: {time.perf_counter() - t_start:.1f}s)")
+        for k in sorted(sink.counts):
+            print(f"  {k}: {sink.counts[k]} ta yozuv")
+        metrics.report(METRICS_FILE)
+        raise SystemExit(0)
+
+    print(f"\n✅ Tayyor (vaqt: {time.perf_counter() - t_start:.1f}s). Qisqa hisob:")
+    phase("summary")
+    if journal is not None:
+        journal.close()
+        journal = None
+    keys = sorted(set(k for k in (list(COUNTS.keys()) + list(name_to.keys()))
+                      if k not in SKIP_SEED and (not only or k in only)))
+    counts = {}
+    if VERIFY:
+        problems = verify("" if VERIFY == "1" else VERIFY)
+    else:
+        # qayta hisob (ba’zilar skip bo’lgani uchun) — faqat sonlar
+        problems = 0
+        for k, cnt, err in pb_counts(keys):
+            print(f"  {k}: {cnt} ta yozuv" if err is None else f"  {k}: ? ({err})")
+            if err is None:
+                counts[k] = cnt
+    if snapshot is not None and not problems:
+        snapshot_save(*snapshot, counts or {k: n for k, n, err in pb_counts(keys) if err is None})
+    metrics.report(METRICS_FILE)
 
-print("\n✅ Tayyor. Qisqa hisob:")
-# qayta hisob (ba’zilar skip bo’lgani uchun)
-keys = set(k for k in (list(COUNTS.keys()) + list(name_to.keys())) if k not in SKIP_SEED)
-for k in sorted(keys):
-    cnt = len(pb_list_ids(k)) if k != "users" else len(pb_list_ids("users"))
-    print(f"  {k}: {cnt} ta yozuv")
+    if not PB_TOKEN:
+        print("⚠️  PB_TOKEN topilmadi. Admin yoki service token (PB_TOKEN) ber.")
+    if problems:
+        raise SystemExit(1)
 
-if not PB_TOKEN:
-    print("⚠️  PB_TOKEN topilmadi. Admin yoki service token (PB_TOKEN) ber.")
+if __name__ == "__main__":
+    main(sys.argv)
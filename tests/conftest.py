@@ -0,0 +1,38 @@
+# Testlar pb_standin.StandIn'ga qarshi shu jarayonda ishlaydi: haqiqiy PB binary'si va tarmoq kerak emas.
+import os, sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pb_standin
+
+SCHEMA = os.path.join(ROOT, "pb_schema.json")
+TOKEN = "test"  # stand-in token qiymatini tekshirmaydi — bor bo'lsa superuser
+
+@pytest.fixture
+def standin(monkeypatch, tmp_path):
+    """Toza stand-in server; seeder env'i unga yo'naltirilgan, ishchi katalog — tmp_path."""
+    for k in list(os.environ):
+        if k.startswith(("SEED_", "PB_", "RECONCILE_", "BALANCE_")):
+            monkeypatch.delenv(k)
+    monkeypatch.chdir(tmp_path)
+    with pb_standin.StandIn(SCHEMA) as srv:
+        monkeypatch.setenv("PB_BASE", srv.url)
+        monkeypatch.setenv("PB_TOKEN", TOKEN)
+        monkeypatch.setenv("PB_SCHEMA", SCHEMA)
+        monkeypatch.setenv("SEED_CACHE", "")
+        yield srv
+
+@pytest.fixture
+def reconcile(standin, monkeypatch):
+    """reconcile_stock moduli stand-in'ga ulangan (PB_BASE/session import paytida o'qiladi)."""
+    import reconcile_stock
+    monkeypatch.setattr(reconcile_stock, "PB_BASE", standin.url)
+    monkeypatch.setitem(reconcile_stock.session.headers, "Authorization", f"Bearer {TOKEN}")
+    return reconcile_stock
+
+@pytest.fixture
+def seed(standin):
+    """seed(SEED_SCALE=2, ...) — seed_pb_from_schema.py shu jarayonda stand-in'ga; exit kodi."""
+    return lambda **env: pb_standin.run_seeder({k: str(v) for k, v in env.items()})
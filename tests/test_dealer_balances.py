@@ -0,0 +1,70 @@
+from collections import defaultdict
+import pytest
+
+@pytest.fixture
+def balances(reconcile):
+    import dealer_balances
+    return dealer_balances
+
+def expected_orders(store, cancelled):
+    """Dilerlar bo'yicha buyurtmalar summasi (USD) — to'g'ridan-to'g'ri stand-in ma'lumotidan."""
+    totals = defaultdict(float)
+    for it in store.data["order_items"].values():
+        totals[it["order"]] += float(it.get("qty") or 0) * float(it.get("unit_price_usd") or 0)
+    out = defaultdict(float)
+    for oid, o in store.data["orders"].items():
+        if o.get("status") in cancelled:
+            continue
+        t, v = totals[oid], float(o.get("discount_value") or 0)
+        if o.get("discount_type") == "percent":
+            t *= 1 - v / 100
+        elif o.get("discount_type") == "amount":
+            t -= v
+        out[o["dealer"]] += max(t, 0)
+    return out
+
+def test_full_run_pages_past_per_page(standin, seed, balances, reconcile):
+    assert seed(SEED_SCALE=2, SEED_BATCH=50) == 0
+    data = standin.store.data
+    assert len(data["order_items"]) > reconcile.PER_PAGE and len(data["fx_rates"]) > 0
+
+    results, _ = balances.compute(balances.FxIndex.load())
+    assert set(results) == set(data["dealers"])
+    want = expected_orders(standin.store, balances.CANCELLED_STATUSES)
+    for rid, r in results.items():
+        assert r["orders"] == pytest.approx(want[rid], abs=0.01)
+
+    touched = balances.touched_dealers("2000-01-01 00:00:00.000Z")
+    assert touched == set(data["dealers"])
+    assert balances.touched_dealers("2999-01-01 00:00:00.000Z") == set()
+
+def test_main_writes_state(standin, seed, balances, capsys):
+    assert seed(SEED_BATCH=50) == 0
+    balances.main(["dealer_balances.py", "--full", "--as-of", "2026-01-01"])
+    state = balances.load_state(balances.STATE_FILE)
+    assert state["as_of"] == "2026-01-01"
+    assert set(state["dealers"]) == set(standin.store.data["dealers"])
+    assert f"{len(state['dealers'])} ta diler" in capsys.readouterr().out
+
+def test_aging_buckets_fifo(standin, balances, capsys):
+    """To'lov eng eski debetlardan yopadi; qolgani yoshi bo'yicha — chegaradagi kun quyi guruhda (30 -> 0-30)."""
+    store = standin.store
+    owes = store.create("dealers", {"name": "Qarzdor", "opening_balance_amount": 100,
+                                    "opening_balance_date": "2025-09-01 00:00:00.000Z"})["id"]
+    paid = store.create("dealers", {"name": "Avans", "opening_balance_amount": 10,
+                                    "opening_balance_date": "2025-12-01 00:00:00.000Z"})["id"]
+    for day, usd in (("2025-10-03", 40), ("2025-11-02", 50), ("2025-12-02", 30)):  # 90 / 60 / 30 kun
+        store.create("dealer_balance_adjustments", {"dealer": owes, "date": f"{day} 00:00:00.000Z", "amount_usd": usd})
+    for dealer, usd in ((owes, 120), (paid, 50)):
+        store.create("payments", {"dealer": dealer, "date": "2025-12-25 00:00:00.000Z", "amount": usd,
+                                  "currency": "USD", "method": "cash"})
+
+    balances.main(["dealer_balances.py", "--full", "--as-of", "2026-01-01"])
+    state = balances.load_state(balances.STATE_FILE)
+    assert state["aging"][owes] == [30, 50, 20, 0]  # 100 (122 kun) va 40 dan 20 to'lov bilan yopilgan
+    assert sum(state["aging"][owes]) == state["dealers"][owes]["balance"] == 100
+    assert state["aging"][paid] == [0, 0, 0, 0] and state["dealers"][paid]["balance"] == -40
+    assert "Aging (2026-01-01): 0-30: $30.00, 31-60: $50.00, 61-90: $20.00, 90+: $0.00" in capsys.readouterr().out
+
+    later = balances.aging(state["dealers"], "2026-03-03")  # eng yangisi ham 91 kun — hammasi 90+
+    assert later[owes] == [0, 0, 0, 100]
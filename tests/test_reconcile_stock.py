@@ -0,0 +1,103 @@
+import pytest
+
+def rid(prefix, i=0):
+    return f"{prefix}{i:0{15 - len(prefix)}d}"
+
+def consistent_fixture(store, n_items):
+    """Zaxirasi hook'lar bilan yuritilgan (0 dan boshlangan) izchil ma'lumot; stock_log ham bor.
+    avg_cost_usd'ni stand-in hisoblamaydi — kutilgan qiymat mahsulotga oldindan yoziladi."""
+    p1, p2, p3 = (rid("prod", i) for i in range(3))
+    avg = {p1: (10 * 5 + 20 * 2) / 30, p2: 7.0, p3: 1.0}  # UZS kirim: 25000 / 12500 = $2
+    for i, p in enumerate((p1, p2, p3)):
+        store.create("products", {"id": p, "name": f"P{i}", "barcode": f"B{i}", "category": rid("cat"),
+                                  "price_usd": 10, "is_active": True, "stock_ok": 0, "stock_defect": 0,
+                                  "avg_cost_usd": avg[p]})
+    usd = store.create("stock_entries", {"supplier": rid("sup"), "date": "2026-01-05", "currency": "USD", "rate": 1})
+    uzs = store.create("stock_entries", {"supplier": rid("sup"), "date": "2026-01-06", "currency": "UZS", "rate": 12500})
+    for entry, p, qty, price, defect in ((usd, p1, 10, 5, False), (uzs, p1, 20, 25000, False),
+                                         (usd, p2, 4, 7, False), (usd, p2, 3, 1, True),
+                                         (usd, p3, n_items + 5, 1, False)):
+        store.create("stock_entry_items", {"entry": entry["id"], "product": p, "qty": qty, "price": price,
+                                           "is_defect": defect})
+    active = store.create("orders", {"dealer": rid("dlr"), "manager": rid("usr"), "region": rid("reg"),
+                                     "status": "created", "discount_type": "none"})
+    shipped = store.create("orders", {"dealer": rid("dlr"), "manager": rid("usr"), "region": rid("reg"),
+                                      "status": "shipped", "discount_type": "none"})
+    for order, p, qty in ((active, p1, 6), (active, p2, 1), (shipped, p1, 9)):
+        store.create("order_items", {"order": order["id"], "product": p, "qty": qty, "unit_price_usd": 10})
+    for _ in range(n_items):  # bitta sahifadan (PER_PAGE) ko'p
+        store.create("order_items", {"order": active["id"], "product": p3, "qty": 1, "unit_price_usd": 10})
+    ret = store.create("return_entries", {"dealer": rid("dlr"), "date": "2026-01-07"})
+    for p, qty, defect in ((p1, 2, False), (p2, 1, True)):
+        store.create("return_entry_items", {"entry": ret["id"], "product": p, "qty": qty, "is_defect": defect})
+    # audit yozuvlari — zaxiraga hook'lar qo'shmaydi, hisobga ham kirmasligi kerak
+    for p, reason, ok, defect in ((p1, "import", 50, 0), (p2, "defect_in", 0, 3), (p3, "defect_out", 0, -1)):
+        store.create("stock_log", {"ts": "2026-01-08 10:00:00.000Z", "product": p, "reason": reason,
+                                   "delta_ok": ok, "delta_defect": defect})
+    return p1, p2, p3
+
+def test_consistent_data_has_no_diffs(standin, reconcile):
+    n = reconcile.PER_PAGE + 100
+    p1, p2, p3 = consistent_fixture(standin.store, n)
+    products = standin.store.data["products"]
+    assert (products[p1]["stock_ok"], products[p2]["stock_defect"], products[p3]["stock_ok"]) == (10 + 20 - 6 + 2, 3 + 1, 5)
+
+    agg = reconcile.scan_ledger()
+    assert agg[p3][0] == 5
+    assert reconcile.diff_products(agg) == []
+
+def test_drift_is_found_and_fixed(standin, reconcile, capsys):
+    p1, _, _ = consistent_fixture(standin.store, 10)
+    standin.store.update("products", p1, {"stock_ok": 999})
+
+    reconcile.main(["reconcile_stock.py", "--full"])
+    assert "1 tasida farq" in capsys.readouterr().out
+    assert standin.store.data["products"][p1]["stock_ok"] == 26
+    assert reconcile.diff_products(reconcile.scan_ledger()) == []
+
+def test_incremental_only_touches_dirty_products(standin, reconcile, capsys):
+    """Inkremental rejim: since'dan beri tegilgan mahsulot tuzatiladi, tegilmagani (hook'siz drift) — yo'q."""
+    p1, p2, _ = consistent_fixture(standin.store, 10)
+    reconcile.main(["reconcile_stock.py", "--full"])
+    assert "since" in reconcile.load_state(reconcile.STATE_FILE)
+    for records in standin.store.data.values():  # pb_datetime soniyagacha — fixture'ni "eski" qilamiz
+        for r in records.values():
+            r["updated"] = "2026-01-01 00:00:00.000Z"
+    since = "2026-02-01 00:00:00.000Z"
+    reconcile.save_state(reconcile.STATE_FILE, {"since": since})
+    standin.store.update("products", p1, {"stock_ok": 999})
+    standin.store.data["products"][p2]["stock_ok"] = 555  # updated o'zgarmaydi — inkrementalda ko'rinmaydi
+    capsys.readouterr()
+
+    reconcile.main(["reconcile_stock.py", "--dry-run"])
+    out = capsys.readouterr().out
+    assert f"Inkremental: {since} dan beri 1 ta mahsulotga tegilgan" in out and "1 tasida farq" in out
+    assert standin.store.data["products"][p1]["stock_ok"] == 999
+    assert reconcile.load_state(reconcile.STATE_FILE) == {"since": since}
+
+    reconcile.main(["reconcile_stock.py"])
+    assert standin.store.data["products"][p1]["stock_ok"] == 26
+    assert standin.store.data["products"][p2]["stock_ok"] == 555
+    assert reconcile.load_state(reconcile.STATE_FILE)["since"] != since
+
+    reconcile.main(["reconcile_stock.py", "--full"])
+    assert standin.store.data["products"][p2]["stock_ok"] == 3
+
+def test_dirty_products(standin, reconcile):
+    p1, p2, _ = consistent_fixture(standin.store, 10)
+    assert reconcile.dirty_products("2000-01-01 00:00:00.000Z") >= {p1, p2}
+    assert reconcile.dirty_products("2999-01-01 00:00:00.000Z") == set()
+
+@pytest.mark.parametrize("fields", ["product,qty", "id,product", "expand.order.status"])
+def test_iter_records_pages_without_id_in_fields(standin, reconcile, fields):
+    consistent_fixture(standin.store, reconcile.PER_PAGE + 50)
+    got = list(reconcile.iter_records("order_items", fields, expand="order"))
+    assert len(got) == len(standin.store.data["order_items"])
+    assert len({r["id"] for r in got}) == len(got)
+
+def test_seeded_data_is_reconciled(standin, seed, reconcile):
+    """Seeder ma'lumoti (boshlang'ich zaxiralar tasodifiy) — bitta --full o'tishdan keyin farq qolmaydi."""
+    assert seed(SEED_SCALE=2, SEED_BATCH=50) == 0
+    assert len(standin.store.data["order_items"]) > reconcile.PER_PAGE
+    reconcile.main(["reconcile_stock.py", "--full"])
+    assert reconcile.diff_products(reconcile.scan_ledger()) == []
@@ -0,0 +1,321 @@
+import os, re
+from datetime import date, timedelta
+import pytest
+
+import pb_standin
+
+def test_existing_fx_rates_past_one_page(standin, seed, capsys):
+    store = standin.store
+    old = date(2000, 1, 1)
+    for i in range(1100):  # serverda bitta sahifadan (perPage=1000) ko'p kurs
+        store.create("fx_rates", {"date": (old + timedelta(days=i)).isoformat(), "usd_to_uzs": 10000 + i})
+    assert seed(SEED_BATCH=50) == 0
+    n = len(store.data["fx_rates"])
+    assert n > 1100
+    capsys.readouterr()
+
+    # ikkinchi ishga tushish: serverdagi sanalar o'qiladi va qayta yuborilmaydi
+    assert seed(SEED_BATCH=50) == 0
+    assert len(store.data["fx_rates"]) == n
+    out = capsys.readouterr().out
+    assert "Seeding fx_rates" not in out and "[WARN fx_rates]" not in out
+
+def test_rerun_with_same_seed_tag(standin, seed):
+    """Bir xil SEED_TAG bilan qayta seed: name/barcode/email hisoblagichlari mavjud qiymatlarga urilmaydi."""
+    assert seed(SEED_TAG="t", SEED_BATCH=50) == 0
+    first = {k: len(v) for k, v in standin.store.data.items()}
+    assert seed(SEED_TAG="t", SEED_BATCH=50, SEED_CONCURRENCY=4) == 0
+    assert seed(SEED_TAG="t") == 0
+    data = standin.store.data
+    for coll in ("products", "categories", "dealers", "regions", "suppliers"):
+        assert len(data[coll]) == 3 * first[coll], coll
+    barcodes = [p.get("barcode") for p in data["products"].values() if p.get("barcode")]
+    assert len(barcodes) == len(set(barcodes))
+
+def crash_after(monkeypatch, store, coll, n):
+    """coll'da n ta yozuvdan keyin doimiy 400 — seeder RuntimeError bilan yiqiladi (jarayon uzilishi)."""
+    create = store.create
+
+    def flaky(c, body):
+        if c == coll and len(store.data[coll]) >= n:
+            raise pb_standin.ApiError(400, "Failed to create record.",
+                                      {"qty": {"code": "validation_invalid", "message": "injected"}})
+        return create(c, body)
+    monkeypatch.setattr(store, "create", flaky)
+
+def test_resume_does_not_split_parents(standin, seed, monkeypatch):
+    store = standin.store
+    env = dict(SEED_SCALE=3, SEED_BATCH=50, SEED_JOURNAL="seed.journal")
+    with monkeypatch.context() as m:
+        crash_after(m, store, "order_items", 1100)
+        with pytest.raises(RuntimeError):
+            seed(**env)
+    first = {rid: it["order"] for rid, it in store.data["order_items"].items()}
+    assert 1000 < len(first) <= 1100
+    counts = {k: len(v) for k, v in store.data.items()}
+
+    assert seed(SEED_RESUME=1, **env) == 0
+    items = store.data["order_items"]
+    assert len(items) == 3 * 900
+    # oldingi ishga tushishdagi order'larga yangi item qo'shilmagan
+    old_orders = set(first.values())
+    assert not [rid for rid, it in items.items() if rid not in first and it["order"] in old_orders]
+    # tugagan kolleksiyalar qayta yaratilmagan
+    for coll in ("orders", "products", "dealers", "payments"):
+        assert len(store.data[coll]) == counts[coll], coll
+
+def test_import_has_no_side_effects():
+    import importlib, random, sys
+    random.seed(123)
+    want = random.random()
+    random.seed(123)
+    sys.modules.pop("seed_pb_from_schema", None)
+    seeder = importlib.import_module("seed_pb_from_schema")
+    assert random.random() == want
+    assert seeder.collections == [] and seeder.pools is None
+
+def test_same_seed_gives_same_data(standin, seed, tmp_path):
+    for out in ("a", "b"):
+        assert seed(SEED_OUT=str(tmp_path / out), SEED_RANDOM=7, SEED_TAG="x") == 0
+    files = sorted(p.name for p in (tmp_path / "a").iterdir())
+    assert "orders.ndjson" in files
+    # sana-vaqt ustunlari "hozir"dan hisoblanadi — ishga tushishlar orasida soniyaga siljiydi
+    read = lambda p: re.sub(r'"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d"', '"T"', p.read_text())
+    for name in files:
+        assert read(tmp_path / "a" / name) == read(tmp_path / "b" / name), name
+
+def listed_collections(monkeypatch):
+    """Stand-in'dagi to'liq list so'rovlari (id bo'yicha qidiruv va perPage=1 sanoqdan tashqari)."""
+    seen = set()
+    orig = pb_standin.Handler.list
+
+    def spy(self, coll, q, allowed=True):
+        flt = q.get("filter") or ""
+        if 'id = "' not in flt and str(q.get("perPage")) != "1":
+            seen.add(coll)
+        return orig(self, coll, q, allowed)
+    monkeypatch.setattr(pb_standin.Handler, "list", spy)
+    return seen
+
+def test_resume_recovers_creates_with_lost_response(standin, seed, monkeypatch):
+    """Create serverda bajarilgan, lekin javob 500 bo'lib qaytgan: resume uni id bo'yicha topadi —
+    son maqsaddan oshmaydi, order item oladi, kolleksiyalar list qilinmaydi."""
+    store = standin.store
+    env = dict(SEED_SCALE=3, SEED_JOURNAL="seed.journal")
+    create = store.create
+
+    def lost(c, body):
+        rec = create(c, body)
+        if c == "orders" and len(store.data["orders"]) >= 200:
+            raise pb_standin.ApiError(500, "Something went wrong while processing your request.")
+        return rec
+    with monkeypatch.context() as m:
+        m.setattr(store, "create", lost)
+        with pytest.raises(RuntimeError):
+            seed(**env)
+    assert len(store.data["orders"]) >= 200 and not store.data["order_items"]
+    assert "\nU\tcreate\torders\t" in open("seed.journal").read()
+
+    listed = listed_collections(monkeypatch)
+    assert seed(SEED_RESUME=1, **env) == 0
+    assert len(store.data["orders"]) == 3 * 140
+    with_items = {it["order"] for it in store.data["order_items"].values()}
+    assert set(store.data["orders"]) <= with_items
+    assert not listed & {"orders", "products", "dealers", "users", "regions", "order_items"}, listed
+
+class FlakySession:
+    """Birinchi so'rov exc bilan yiqiladi; sent=True bo'lsa avval serverga yetib boradi (server yozadi,
+    javob yo'qoladi). Keyingi so'rovlar haqiqiy session orqali."""
+    def __init__(self, exc, sent):
+        import requests
+        self.exc, self.sent, self.session, self.calls = exc, sent, requests.Session(), 0
+
+    def request(self, *a, **kw):
+        self.calls += 1
+        if self.calls == 1:
+            if self.sent:
+                self.session.request(*a, **kw)
+            raise self.exc
+        return self.session.request(*a, **kw)
+
+def refused():
+    """Haqiqiy "connection refused" xatosi (yopiq port)."""
+    import requests
+    try:
+        requests.get("http://127.0.0.1:1/", timeout=5)
+    except requests.ConnectionError as e:
+        return e
+    pytest.skip("127.0.0.1:1 ochiq")
+
+def aborted():
+    """requests body yuborilgandan keyin uzilgan ulanishni shunday beradi."""
+    import requests
+    from http.client import RemoteDisconnected
+    from urllib3.exceptions import ProtocolError
+    return requests.ConnectionError(ProtocolError("Connection aborted.", RemoteDisconnected("closed")))
+
+@pytest.mark.parametrize("make, sent, retried", [
+    (refused, False, True),
+    (lambda: __import__("requests").ConnectTimeout("injected"), False, True),
+    (aborted, True, False),
+    (lambda: __import__("requests").ReadTimeout("injected"), True, False),
+])
+def test_post_retried_only_when_not_sent(standin, monkeypatch, make, sent, retried):
+    """POST faqat so'rov serverga yetmagani aniq bo'lsa qayta yuboriladi — aks holda takror yozuv bo'lardi."""
+    import requests
+    import seed_pb_from_schema as seeder
+    exc = make()
+    flaky = FlakySession(exc, sent)
+    monkeypatch.setattr(seeder, "http", lambda: flaky)
+    monkeypatch.setattr(seeder, "retry_delay", lambda attempt, resp=None: 0)
+    url = f"{standin.url}/api/collections/regions/records"
+    call = lambda: seeder.pb_call("POST", url, "regions", "POST", json={"name": "R"})
+    if retried:
+        assert call().status_code == 200
+    else:
+        with pytest.raises(type(exc)):
+            call()
+    assert flaky.calls == 1 + retried
+    assert len(standin.store.data["regions"]) == 1
+
+def test_retry_after_is_capped():
+    import seed_pb_from_schema as seeder
+    resp = lambda ra: type("R", (), {"headers": {"Retry-After": ra}})()
+    assert seeder.retry_delay(0, resp("2")) == 2.0
+    assert seeder.retry_delay(0, resp("3600")) == seeder.RETRY_CAP
+    assert 0 <= seeder.retry_delay(0, resp("soon")) <= seeder.RETRY_BASE
+
+def test_load_bodies_follow_domain_rules(standin, seed):
+    """SEED_LOAD oqimlari seed bilan bir xil domen qoidalarida: chegirma turi/qiymati, UZS snapshot."""
+    assert seed(SEED_BATCH=50) == 0
+    data = standin.store.data
+    before = set(data["orders"])
+    assert seed(SEED_LOAD=1, SEED_CONCURRENCY=2) == 0
+    new = [o for rid, o in data["orders"].items() if rid not in before]
+    assert new
+    limit = {"none": 0, "percent": 10, "amount": 50}
+    for o in new:
+        assert 0 <= (o.get("discount_value") or 0) <= limit[o["discount_type"]], o
+    items = [it for it in data["order_items"].values() if it["order"] in {o["id"] for o in new}]
+    assert items and all(it.get("unit_price_uzs_snapshot") for it in items)
+
+def test_counts_run_in_parallel_with_concurrency_one(standin, monkeypatch):
+    """SEED_CONCURRENCY=1 bo'lsa ham sanoq (totalItems) so'rovlari o'z pool'ida parallel ketadi."""
+    import seed_pb_from_schema as seeder
+    monkeypatch.setattr(seeder, "PB_BASE", standin.url)
+    monkeypatch.setattr(seeder, "CONCURRENCY", 1)
+    monkeypatch.setattr(seeder, "_limiter", seeder.AimdLimiter(1, adaptive=False))
+    monkeypatch.setattr(pb_standin, "LATENCY", 0.05)
+    monkeypatch.setattr(pb_standin, "JITTER", 0)
+    colls = ["orders", "order_items", "products", "dealers", "payments", "regions", "users", "suppliers"]
+    got = {k: n for k, n, err in seeder.pb_counts(colls) if err is None}
+    assert got == {k: 0 for k in colls}
+    assert standin.stats.peak > 1
+
+def ndjson_ids(path):
+    import json
+    return {json.loads(line)["id"] for line in path.read_text().splitlines() if line}
+
+def test_replay_past_per_page(standin, seed, tmp_path):
+    """SEED_OUT -> SEED_REPLAY: barcha yozuvlar id'lari bilan yuklanadi (order_items > perPage)."""
+    out = tmp_path / "gen"
+    assert seed(SEED_OUT=str(out), SEED_SCALE=2) == 0
+    assert not standin.store.data["orders"]
+    assert seed(SEED_REPLAY=str(out), SEED_BATCH=50, SEED_CONCURRENCY=4) == 0
+    data = standin.store.data
+    assert len(data["order_items"]) == 2 * 900
+    for coll in ("orders", "order_items", "products", "payments"):
+        assert set(data[coll]) == ndjson_ids(out / f"{coll}.ndjson"), coll
+
+@pytest.mark.parametrize("batch", [50, 1])
+def test_seed_with_injected_faults(standin, seed, monkeypatch, tmp_path, batch):
+    """503'lar (va inflight chegarasidagi 429'lar) retry bilan yutiladi: sonlar to'liq, verify xatosiz."""
+    import json
+    monkeypatch.setattr(pb_standin, "ERROR_RATE", 0.05)
+    monkeypatch.setattr(pb_standin, "MAX_INFLIGHT", 3)
+    report = tmp_path / "verify.json"
+    assert seed(SEED_SCALE=2, SEED_BATCH=batch, SEED_CONCURRENCY=8, SEED_VERIFY=str(report)) == 0
+    data = standin.store.data
+    assert (len(data["orders"]), len(data["order_items"])) == (2 * 140, 2 * 900)
+    # 429 vaqtga bog'liq (bir vaqtdagi so'rovlar) — faqat 503'lar albatta bo'ladi
+    assert any(status == 503 for _, status in standin.stats.requests)
+    got = json.loads(report.read_text())
+    assert got["errors"] == 0 and got["counts"]["order_items"] == 2 * 900
+
+def test_batch_disabled_falls_back(standin, seed, monkeypatch):
+    monkeypatch.setattr(pb_standin, "BATCH_ON", False)
+    assert seed(SEED_SCALE=2, SEED_BATCH=50, SEED_CONCURRENCY=4) == 0
+    assert len(standin.store.data["order_items"]) == 2 * 900
+    assert standin.stats.requests[("POST", 403)] >= 1
+
+def run_fanout(targets, *args, **env):
+    import subprocess, sys
+    env = {**os.environ, "SEED_TARGETS": ",".join(t.url for t in targets), **env}
+    return subprocess.run([sys.executable, pb_standin.SEEDER, *args], env=env, text=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=300)
+
+def test_fanout_passes_only_to_generation(standin):
+    with pb_standin.StandIn(os.environ["PB_SCHEMA"]) as other:
+        r = run_fanout([standin, other], "--only", "regions,categories")
+        assert r.returncode == 0, r.stdout
+        for srv in (standin, other):
+            filled = {k for k, v in srv.store.data.items() if v}
+            assert filled == {"regions", "categories"}, filled
+
+def test_fanout_dry_run_writes_nothing(standin, tmp_path):
+    r = run_fanout([standin], "--dry-run")
+    assert r.returncode == 0, r.stdout
+    assert "[gen]" in r.stdout
+    assert not any(standin.store.data.values())
+
+def test_fanout_replay_rejects_only(standin, tmp_path):
+    r = run_fanout([standin], "--only", "regions", SEED_REPLAY=str(tmp_path))
+    assert r.returncode != 0 and "--only" in r.stdout
+
+def test_snapshot_restore_refuses_running_server(standin, seed, tmp_path):
+    import sqlite3
+    db = tmp_path / "data.db"
+    with sqlite3.connect(db) as c:
+        c.execute("create table t (v)")
+        c.execute("insert into t values ('seeded')")
+    env = dict(SEED_SNAPSHOT=str(tmp_path / "snap"), PB_DATA=str(db))
+    assert seed(**env) == 0  # kesh yo'q — HTTP seed, keyin snapshot
+    with sqlite3.connect(db) as c:
+        c.execute("update t set v = 'live'")
+
+    # server ishlayapti — baza ustidan yozilmaydi
+    assert seed(**env) != 0
+    with sqlite3.connect(db) as c:
+        assert c.execute("select v from t").fetchone() == ("live",)
+
+    # server to'xtatilgan (PB_BASE javob bermaydi) — tiklanadi
+    assert seed(PB_BASE="http://127.0.0.1:1", **env) == 0
+    with sqlite3.connect(db) as c:
+        assert c.execute("select v from t").fetchone() == ("seeded",)
+
+def read_ndjson(path):
+    import json
+    return [json.loads(line) for line in path.read_text().splitlines() if line]
+
+def test_domain_columns_use_schema_fields(standin, seed, tmp_path):
+    out = tmp_path / "gen"
+    assert seed(SEED_OUT=str(out)) == 0
+    items = read_ndjson(out / "stock_entry_items.ndjson")
+    assert items and all(10 <= it["price"] <= 150 and "unit_cost_usd" not in it for it in items)
+    assert not any("price_usd" in it for it in read_ndjson(out / "return_entry_items.ndjson"))
+    log = read_ndjson(out / "stock_log.ndjson")
+    assert log and all({"delta_ok", "delta_defect", "ts"} <= set(r) and "delta" not in r for r in log)
+
+def test_domain_column_missing_from_schema_fails(standin, seed, tmp_path, monkeypatch, capsys):
+    import json
+    data = json.load(open(os.environ["PB_SCHEMA"], encoding="utf-8"))
+    colls = data["collections"] if isinstance(data, dict) else data
+    for c in colls:
+        if c["name"] == "stock_entry_items":
+            key = "fields" if "fields" in c else "schema"
+            c[key] = [f for f in c[key] if f["name"] != "price"]
+    schema = tmp_path / "schema.json"
+    schema.write_text(json.dumps(data))
+    monkeypatch.setenv("PB_SCHEMA", str(schema))
+    assert seed(SEED_OUT=str(tmp_path / "gen")) != 0
+    assert "domain_columns(stock_entry_items)" in capsys.readouterr().err